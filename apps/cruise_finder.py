@@ -2,14 +2,19 @@
 import sys
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 # Add src to path so we can import our modules
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from deep_researcher.core import load_domain_config, create_domain_ui
+from deep_researcher.core.email_outbox import drain_before_exit
 
 if __name__ == "__main__":
+    load_dotenv(override=True)
     # Load cruise domain configuration and launch
     domain_config = load_domain_config('cruise')
     ui = create_domain_ui(domain_config)
     print(f"Launching {domain_config['display_name']}...")
-    ui.launch(inbrowser=True)
\ No newline at end of file
+    ui.launch(inbrowser=True)
+    drain_before_exit()
\ No newline at end of file
@@ -1,29 +1,36 @@
 import gradio as gr
 from dotenv import load_dotenv
 import sys
+from contextlib import aclosing
 from pathlib import Path
 
 # Add src to path so we can import our modules
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from deep_researcher.core import ResearchManager
+from deep_researcher.core.email_outbox import drain_before_exit
 
 load_dotenv(override=True)
 
 
-async def run(query: str):
-    async for chunk in ResearchManager().run(query):
-        yield chunk
+async def run(query: str, refresh: bool):
+    async with aclosing(ResearchManager().run(query, refresh=refresh)) as updates:
+        async for chunk in updates:
+            yield chunk
 
 
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# Deep Research")
     query_textbox = gr.Textbox(label="What topic would you like to research?")
     run_button = gr.Button("Run", variant="primary")
+    stop_button = gr.Button("Stop", variant="stop")
+    refresh_checkbox = gr.Checkbox(label="Refresh (ignore cached reports)", value=False)
     report = gr.Markdown(label="Report")
     
-    run_button.click(fn=run, inputs=query_textbox, outputs=report)
-    query_textbox.submit(fn=run, inputs=query_textbox, outputs=report)
+    run_event = run_button.click(fn=run, inputs=[query_textbox, refresh_checkbox], outputs=report)
+    submit_event = query_textbox.submit(fn=run, inputs=[query_textbox, refresh_checkbox], outputs=report)
+    stop_button.click(fn=None, cancels=[run_event, submit_event])
 
 ui.launch(inbrowser=True)
+drain_before_exit()
 
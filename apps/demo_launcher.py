@@ -2,34 +2,51 @@
 import gradio as gr
 from dotenv import load_dotenv
 import sys
+from contextlib import aclosing
 from pathlib import Path
 
 # Add src to path so we can import our modules
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from deep_researcher.core import ResearchManager, load_domain_config
+from deep_researcher.core import ResearchManager, get_domain_registry
+from deep_researcher.core.email_outbox import drain_before_exit
+from deep_researcher.core.progress import ProgressView
 
 load_dotenv(override=True)
 
-# Load domain configurations
-cruise_config = load_domain_config('cruise')
-job_config = load_domain_config('job')
+GENERAL = "general"
 
-async def run_research(query: str, domain: str):
+def domain_choices():
+    """Radio choices for General plus every registered domain, as (label, value) pairs."""
+    return [("General 🔍", GENERAL)] + [
+        (entry.config['display_name'], entry.name) for entry in get_domain_registry().entries()
+    ]
+
+def domain_examples():
+    """Markdown listing a couple of example queries per domain."""
+    lines = ["**🔍 General Research:**", "- Climate change impact on agriculture", "- Latest AI breakthroughs 2024"]
+    for entry in get_domain_registry().entries():
+        lines.append(f"\n**{entry.config['display_name']}:**")
+        lines.extend(f"- {example}" for example in entry.config['ui'].get('examples', [])[:2])
+    return "\n".join(lines)
+
+async def run_research(query: str, domain: str, refresh: bool = False):
     """Run research based on selected domain."""
-    if domain == "Cruises 🚢":
-        manager = ResearchManager(domain_config=cruise_config)
-        prefix = "🚢 Searching for cruise options..."
-    elif domain == "Jobs 💼":
-        manager = ResearchManager(domain_config=job_config)
-        prefix = "💼 Analyzing job market..."
-    else:  # General
+    if domain == GENERAL:
         manager = ResearchManager()  # No domain config = general research
         prefix = "🔍 Conducting general research..."
+    else:
+        # Resolved per request, so domains added or edited on disk apply without a restart
+        entry = get_domain_registry().get(domain)
+        manager = ResearchManager(domain_config=entry.config, agents=entry.agents)
+        prefix = f"{entry.config['display_name']}: researching..."
     
     yield prefix
-    async for chunk in manager.run(query):
-        yield chunk
+    # Render each search summary as soon as it finishes, then the report as it is written
+    view = ProgressView(status=prefix)
+    async with aclosing(manager.run_events(query, refresh=refresh)) as events:
+        async for event in events:
+            yield view.update(event)
 
 # Create multi-domain UI
 with gr.Blocks(theme=gr.themes.Default(primary_hue="purple")) as ui:
@@ -40,9 +57,9 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="purple")) as ui:
     with gr.Row():
         with gr.Column(scale=2):
             domain_selector = gr.Radio(
-                choices=["General 🔍", "Cruises 🚢", "Jobs 💼"],
+                choices=domain_choices(),
                 label="Choose Research Domain",
-                value="General 🔍"
+                value=GENERAL
             )
         with gr.Column(scale=4):
             query_input = gr.Textbox(
@@ -52,22 +69,11 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="purple")) as ui:
             )
         with gr.Column(scale=1):
             search_btn = gr.Button("🚀 Research", variant="primary", size="lg")
+            stop_btn = gr.Button("Stop", variant="stop")
+            refresh_input = gr.Checkbox(label="Refresh (ignore cached reports)", value=False)
     
     gr.Markdown("### 💡 Example Queries by Domain:")
-    
-    with gr.Row():
-        with gr.Column():
-            gr.Markdown("**🔍 General Research:**")
-            gr.Markdown("- Climate change impact on agriculture")
-            gr.Markdown("- Latest AI breakthroughs 2024")
-        with gr.Column():
-            gr.Markdown("**🚢 Cruise Research:**") 
-            gr.Markdown("- Mediterranean cruise in September")
-            gr.Markdown("- Family-friendly Caribbean cruises")
-        with gr.Column():
-            gr.Markdown("**💼 Job Research:**")
-            gr.Markdown("- Remote software engineer jobs")
-            gr.Markdown("- Data scientist salary trends")
+    examples_output = gr.Markdown(domain_examples())
     
     with gr.Row():
         results_output = gr.Markdown(
@@ -76,22 +82,34 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="purple")) as ui:
         )
     
     # Connect the interface
-    def launch_research(query, domain):
-        return run_research(query, domain)
+    def launch_research(query, domain, refresh):
+        return run_research(query, domain, refresh)
     
-    search_btn.click(
+    search_event = search_btn.click(
         fn=launch_research,
-        inputs=[query_input, domain_selector],
+        inputs=[query_input, domain_selector, refresh_input],
         outputs=results_output
     )
     
-    query_input.submit(
+    submit_event = query_input.submit(
         fn=launch_research,
-        inputs=[query_input, domain_selector],
+        inputs=[query_input, domain_selector, refresh_input],
         outputs=results_output
     )
+    
+    # Stopping or resubmitting cancels the running research and all of its in-flight work
+    stop_btn.click(fn=None, cancels=[search_event, submit_event])
+    search_btn.click(fn=None, cancels=[submit_event])
+    query_input.submit(fn=None, cancels=[search_event])
+    
+    # Pick up domains added or changed since the UI was built on every page load
+    def refresh_domains():
+        return gr.Radio(choices=domain_choices()), domain_examples()
+    
+    ui.load(fn=refresh_domains, outputs=[domain_selector, examples_output])
 
 if __name__ == "__main__":
     print("🎯 Launching Modular Research Assistant...")
-    print("Available domains: General, Cruises, Jobs")
-    ui.launch(inbrowser=True)
\ No newline at end of file
+    print(f"Available domains: General, {', '.join(get_domain_registry().names())}")
+    ui.launch(inbrowser=True)
+    drain_before_exit()
\ No newline at end of file
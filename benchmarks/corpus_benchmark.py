@@ -0,0 +1,86 @@
+"""Build, reindex and query timings for the local corpus search backend.
+
+Generates a synthetic corpus of random documents, indexes it with
+CorpusIndex, changes a share of the files and re-indexes incrementally,
+then reports query latency percentiles and the index size on disk.
+
+Usage:
+    python benchmarks/corpus_benchmark.py --documents 5000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from deep_researcher.core.corpus_index import CorpusIndex
+
+VOCABULARY = [f"term{i}" for i in range(20000)]
+
+
+def write_document(path: Path, rng: random.Random, paragraphs: int, words: int) -> None:
+    # Zipf-like term distribution, so postings lists have a realistic mix of lengths
+    text = "\n\n".join(
+        " ".join(VOCABULARY[min(int(rng.paretovariate(1.1)) - 1, len(VOCABULARY) - 1)] for _ in range(words))
+        for _ in range(paragraphs)
+    )
+    path.write_text(text, encoding="utf-8")
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BM25 corpus index")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=8, help="Paragraphs per document")
+    parser.add_argument("--words", type=int, default=80, help="Words per paragraph")
+    parser.add_argument("--changed", type=float, default=0.01, help="Share of documents changed before reindexing")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = Path(directory, "corpus")
+        corpus.mkdir()
+        for number in range(args.documents):
+            write_document(corpus / f"doc{number}.txt", rng, args.paragraphs, args.words)
+
+        index = CorpusIndex(corpus, reindex_interval=-1)
+        started = time.perf_counter()
+        index.refresh()
+        build_seconds = time.perf_counter() - started
+
+        for number in rng.sample(range(args.documents), max(1, int(args.documents * args.changed))):
+            write_document(corpus / f"doc{number}.txt", rng, args.paragraphs, args.words)
+        started = time.perf_counter()
+        index.refresh()
+        reindex_seconds = time.perf_counter() - started
+
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.choice(VOCABULARY[:2000]) for _ in range(rng.randint(2, 5)))
+            started = time.perf_counter()
+            index.search(query, args.top_k)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        size_mb = sum(path.stat().st_size for path in index.index_dir.iterdir()) / 1024 / 1024
+        stats = index.stats()
+        print(f"{args.documents} documents, {stats['passages']} passages, {stats['segments']} segments, "
+              f"index {size_mb:.1f}MB")
+        print(f"full build {build_seconds:.2f}s, incremental reindex of {args.changed:.0%} {reindex_seconds:.2f}s")
+        print(f"query p50 {statistics.median(latencies):.2f}ms  p95 {percentile(latencies, 0.95):.2f}ms  "
+              f"p99 {percentile(latencies, 0.99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Local stand-in for the SendGrid mail/send endpoint, for testing email delivery.
+
+Accepts POST requests, records each message as a JSON line and answers 202,
+or 503 / 429 for a configurable share of requests so the outbox's retries
+can be exercised. Point the outbox at it with
+SENDGRID_API_URL=http://127.0.0.1:8025/v3/mail/send.
+
+Usage:
+    python benchmarks/email_sink.py --port 8025 --fail-rate 0.2 --output sent.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_sink(port: int, fail_rate: float = 0.0, rate_limit_rate: float = 0.0, latency: float = 0.0,
+              output=None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Build the sink server; received messages are also kept on server.messages."""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency:
+                time.sleep(latency)
+            roll = random.random()
+            if roll < fail_rate:
+                self._respond(503)
+                return
+            if roll < fail_rate + rate_limit_rate:
+                self._respond(429)
+                return
+            message = json.loads(body)
+            record = {
+                "received_at": time.time(),
+                "to": [to["email"] for p in message.get("personalizations", []) for to in p.get("to", [])],
+                "from": message.get("from", {}).get("email"),
+                "subject": message.get("subject"),
+                "bytes": len(body),
+            }
+            with lock:
+                server.messages.append(message)
+                if output is not None:
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+            self._respond(202)
+
+        def _respond(self, status: int):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.messages = []
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record emails posted to a local SendGrid-compatible endpoint")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--output", type=argparse.FileType("a"), default=sys.stdout,
+                        help="JSONL file each received message is appended to")
+    args = parser.parse_args()
+
+    server = make_sink(args.port, args.fail_rate, args.rate_limit_rate, args.latency, args.output)
+    print(f"Email sink listening on http://127.0.0.1:{args.port}/v3/mail/send", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Offline fake model provider for benchmarking the research pipeline.
+
+FakeModelProvider plugs into the Agents SDK through
+``RunConfig(model_provider=...)``, so the real Runner, agents and
+ResearchManager orchestration run unchanged while every model call is
+answered locally. Structured outputs (WebSearchPlan, ReportData, ...) are
+generated from the agent's output JSON schema, so any agent the pipeline
+adds later gets valid fake output without changes here.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails, ResponseUsage
+
+WORDS = (
+    "cruise caribbean mediterranean alaska balcony itinerary fare deal port ship cabin family "
+    "salary remote engineer python data market growth skills hiring startup analysis trend "
+    "price review amenity option comparison availability season september march budget premium"
+).split()
+
+
+class FakeModelError(ConnectionError):
+    """Raised by the fake model to simulate a failed, retryable provider call."""
+
+
+@dataclass
+class LatencyDistribution:
+    """Log-normal latency with the given median (seconds) and shape."""
+    median: float
+    sigma: float = 0.35
+
+    def sample(self, rng: random.Random, scale: float = 1.0) -> float:
+        return max(0.0, rng.lognormvariate(math.log(self.median), self.sigma) * scale)
+
+
+@dataclass
+class SizeDistribution:
+    """Normally distributed token count, clamped to at least one token."""
+    mean: int
+    stdev: int = 0
+
+    def sample(self, rng: random.Random) -> int:
+        return max(1, int(rng.gauss(self.mean, self.stdev)))
+
+
+@dataclass
+class FakeModelConfig:
+    """Latency, size and error behaviour of the fake provider.
+
+    Stages are named after the agent's output type ("WebSearchPlan",
+    "ReportData", ...) or "text" for plain-text agents such as the searcher.
+    """
+    latency: dict = field(default_factory=lambda: {
+        "WebSearchPlan": LatencyDistribution(1.5),
+        "text": LatencyDistribution(4.0),
+        "ReportData": LatencyDistribution(20.0),
+    })
+    default_latency: LatencyDistribution = field(default_factory=lambda: LatencyDistribution(2.0))
+    latency_scale: float = 1.0
+    text_tokens: SizeDistribution = field(default_factory=lambda: SizeDistribution(250, 50))
+    report_tokens: SizeDistribution = field(default_factory=lambda: SizeDistribution(1500, 300))
+    list_items: int = 5
+    error_rate: float = 0.0
+    distinct_terms: int = 0     # > 0 limits generated search terms to a pool, to exercise caching
+    seed: int | None = None
+
+
+class FakeModel(Model):
+    """Model that sleeps for a sampled latency and returns schema-valid fake output."""
+
+    def __init__(self, name: str, config: FakeModelConfig, rng: random.Random):
+        self.name = name
+        self.config = config
+        self.rng = rng
+        self.calls = 0
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *args, **kwargs) -> ModelResponse:
+        stage, text, usage = self._prepare(system_instructions, input, output_schema)
+        await asyncio.sleep(self._latency(stage))
+        self._maybe_fail(stage)
+        return ModelResponse(output=[_message(text)], usage=usage, response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *args, **kwargs):
+        stage, text, usage = self._prepare(system_instructions, input, output_schema)
+        latency = self._latency(stage)
+        # Spend a fifth of the latency before the first token, then spread the rest over the deltas
+        await asyncio.sleep(latency * 0.2)
+        self._maybe_fail(stage)
+        chunks = [text[i:i + 64] for i in range(0, len(text), 64)] or [""]
+        for sequence_number, chunk in enumerate(chunks):
+            await asyncio.sleep(latency * 0.8 / len(chunks))
+            yield ResponseTextDeltaEvent.model_construct(
+                content_index=0, delta=chunk, item_id="msg_fake", output_index=0,
+                sequence_number=sequence_number, type="response.output_text.delta", logprobs=[],
+            )
+        response = Response(
+            id="resp_fake", created_at=time.time(), model=self.name, object="response",
+            output=[_message(text)], tool_choice="auto", tools=[], top_p=None,
+            parallel_tool_calls=False,
+            usage=ResponseUsage(
+                input_tokens=usage.input_tokens,
+                input_tokens_details=InputTokensDetails(cached_tokens=0),
+                output_tokens=usage.output_tokens,
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+                total_tokens=usage.total_tokens,
+            ),
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=len(chunks))
+
+    def _prepare(self, system_instructions, input, output_schema):
+        self.calls += 1
+        if output_schema is None or output_schema.is_plain_text():
+            stage = "text"
+            text = self._sentences(self.config.text_tokens.sample(self.rng))
+        else:
+            stage = output_schema.name()
+            text = json.dumps(self._generate(output_schema.json_schema(), None, {}))
+        input_tokens = (len(str(system_instructions or "")) + len(str(input))) // 4 + 1
+        output_tokens = len(text) // 4 + 1
+        usage = Usage(requests=1, input_tokens=input_tokens, output_tokens=output_tokens,
+                      total_tokens=input_tokens + output_tokens)
+        return stage, text, usage
+
+    def _latency(self, stage: str) -> float:
+        distribution = self.config.latency.get(stage, self.config.default_latency)
+        return distribution.sample(self.rng, self.config.latency_scale)
+
+    def _maybe_fail(self, stage: str) -> None:
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            raise FakeModelError(f"Simulated provider failure for {stage}")
+
+    def _generate(self, schema: dict, name: str | None, definitions: dict):
+        """Build a value matching a JSON schema, using the field name as a content hint."""
+        definitions = {**definitions, **schema.get("$defs", {})}
+        if "$ref" in schema:
+            return self._generate(definitions[schema["$ref"].split("/")[-1]], name, definitions)
+        for key in ("anyOf", "oneOf", "allOf"):
+            if key in schema:
+                options = [option for option in schema[key] if option.get("type") != "null"]
+                return self._generate(options[0], name, definitions)
+        kind = schema.get("type")
+        if kind == "object":
+            return {prop: self._generate(sub, prop, definitions) for prop, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._generate(schema.get("items", {}), name, definitions) for _ in range(self.config.list_items)]
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        if kind == "integer":
+            return self.rng.randint(0, 10)
+        if kind == "number":
+            return round(self.rng.random() * 10, 2)
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        return self._string(name or "")
+
+    def _string(self, name: str) -> str:
+        if "markdown" in name or name == "report":
+            return self._markdown(self.config.report_tokens.sample(self.rng))
+        if name == "query":
+            if self.config.distinct_terms:
+                term_rng = random.Random(self.rng.randrange(self.config.distinct_terms))
+                return " ".join(term_rng.choice(WORDS) for _ in range(4))
+            return " ".join(self.rng.choice(WORDS) for _ in range(4))
+        return self._sentences(30)
+
+    def _sentences(self, tokens: int) -> str:
+        words = [self.rng.choice(WORDS) for _ in range(max(1, int(tokens * 0.75)))]
+        sentences = [" ".join(words[i:i + 12]).capitalize() + "." for i in range(0, len(words), 12)]
+        paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        return "\n\n".join(paragraphs)
+
+    def _markdown(self, tokens: int) -> str:
+        sections = max(1, tokens // 250)
+        parts = ["# Research Report"]
+        for number in range(1, sections + 1):
+            parts.append(f"## Section {number}")
+            parts.append(self._sentences(tokens // sections))
+        return "\n\n".join(parts)
+
+
+class FakeModelProvider(ModelProvider):
+    """Hands out FakeModels sharing one config and random stream."""
+
+    def __init__(self, config: FakeModelConfig | None = None):
+        self.config = config or FakeModelConfig()
+        self.rng = random.Random(self.config.seed)
+        self.models = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        name = model_name or "fake-default"
+        if name not in self.models:
+            self.models[name] = FakeModel(name, self.config, self.rng)
+        return self.models[name]
+
+
+def _message(text: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(
+        id="msg_fake",
+        content=[ResponseOutputText(annotations=[], text=text, type="output_text")],
+        role="assistant",
+        status="completed",
+        type="message",
+    )
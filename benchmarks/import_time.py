@@ -0,0 +1,89 @@
+"""Cold-start import cost check for the deep_researcher package.
+
+Imports each target in a fresh interpreter several times and reports the
+median wall time and the peak RSS of the child process. Exits non-zero when
+a target exceeds its time budget, or when it loads a module that must stay
+lazy (UI, email and HTTP service libraries), so a CI step can catch
+import-time regressions.
+
+Usage:
+    python benchmarks/import_time.py --repeat 5 --budget 1.5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+
+# Module -> modules that importing it must not load
+TARGETS = {
+    "deep_researcher.core": ("agents", "gradio", "sendgrid", "fastapi", "dotenv"),
+    "deep_researcher.core.research_manager": ("gradio", "sendgrid", "fastapi"),
+}
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in {forbidden!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(module: str, forbidden: tuple, repeat: int) -> dict:
+    """Import `module` in `repeat` fresh interpreters and summarize the cost."""
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, forbidden=forbidden)],
+            cwd=SRC, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "median_seconds": round(statistics.median(sample["seconds"] for sample in samples), 4),
+        "max_seconds": round(max(sample["seconds"] for sample in samples), 4),
+        "rss_mb": round(statistics.median(sample["rss_mb"] for sample in samples), 1),
+        "eagerly_loaded": sorted({name for sample in samples for name in sample["loaded"]}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold-start import cost of deep_researcher")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--budget", type=float, default=0.05,
+                        help="Median seconds allowed for importing deep_researcher.core")
+    parser.add_argument("--manager-budget", type=float, default=2.5,
+                        help="Median seconds allowed for importing the research manager")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    budgets = {"deep_researcher.core": args.budget, "deep_researcher.core.research_manager": args.manager_budget}
+    results, failures = [], []
+    for module, forbidden in TARGETS.items():
+        result = measure(module, forbidden, args.repeat)
+        result["budget_seconds"] = budgets[module]
+        results.append(result)
+        print(f"{module:<42}{result['median_seconds']:>8.3f}s (budget {budgets[module]}s)  "
+              f"rss={result['rss_mb']}MB")
+        if result["median_seconds"] > budgets[module]:
+            failures.append(f"{module} took {result['median_seconds']}s, over its {budgets[module]}s budget")
+        if result["eagerly_loaded"]:
+            failures.append(f"{module} eagerly imports {', '.join(result['eagerly_loaded'])}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Offline load test for the research pipeline.
+
+Drives ResearchManager.run at several concurrency levels against the fake
+model provider and reports end-to-end and per-stage latency percentiles,
+throughput, peak memory and event-loop lag. No network access or API key
+is needed.
+
+Usage:
+    python benchmarks/run_benchmark.py --concurrency 1,8,32 --runs 64 --latency-scale 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add src and this directory to path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents import RunConfig, set_tracing_disabled
+
+from deep_researcher.core.research_manager import ResearchManager
+from deep_researcher.core.report_cache import ReportCache
+from deep_researcher.core.scheduler import ModelScheduler
+from deep_researcher.core.checkpoints import CheckpointStore
+from deep_researcher.core.search_cache import SearchCache
+from fake_provider import FakeModelConfig, FakeModelProvider
+
+STAGES = ("plan", "search", "gap_check", "first_report_token", "write")
+
+
+class TimedResearchManager(ResearchManager):
+    """ResearchManager that records how long each stage of a run took."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+
+    async def plan_searches(self, query, count=None):
+        started = time.perf_counter()
+        try:
+            return await super().plan_searches(query, count)
+        finally:
+            self.timings["plan"] = time.perf_counter() - started
+
+    async def perform_searches(self, search_plan, deadline=None):
+        started = time.perf_counter()
+        try:
+            return await super().perform_searches(search_plan, deadline)
+        finally:
+            # Summed over all search rounds of the run
+            self.timings["search"] = self.timings.get("search", 0.0) + time.perf_counter() - started
+
+    async def check_gaps(self, query, search_results):
+        started = time.perf_counter()
+        try:
+            return await super().check_gaps(query, search_results)
+        finally:
+            self.timings["gap_check"] = self.timings.get("gap_check", 0.0) + time.perf_counter() - started
+
+    async def stream_report(self, query, search_results):
+        started = time.perf_counter()
+        try:
+            async for update in super().stream_report(query, search_results):
+                if "first_report_token" not in self.timings and isinstance(update, str):
+                    self.timings["first_report_token"] = time.perf_counter() - started
+                yield update
+        finally:
+            self.timings["write"] = time.perf_counter() - started
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile, 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(values: list) -> dict:
+    return {
+        "p50": round(percentile(values, 0.50), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "p99": round(percentile(values, 0.99), 4),
+        "count": len(values),
+    }
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Measure how late the event loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_level(args, concurrency: int, domain_config: dict | None) -> dict:
+    """Run args.runs research runs with at most `concurrency` in flight."""
+    provider = FakeModelProvider(FakeModelConfig(
+        latency_scale=args.latency_scale,
+        error_rate=args.error_rate,
+        distinct_terms=args.distinct_terms,
+        seed=args.seed,
+    ))
+    run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+    # Fresh caches and scheduler per level so levels don't warm each other up
+    search_cache = SearchCache()
+    report_cache = ReportCache()
+    checkpoints = CheckpointStore()
+    scheduler = ModelScheduler(
+        max_concurrency=args.scheduler_concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+    rng = random.Random(args.seed)
+    queries = [f"benchmark query {rng.randrange(args.distinct_queries or 1 << 30)}" for _ in range(args.runs)]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    end_to_end, stage_timings, failures = [], {stage: [] for stage in STAGES}, []
+
+    async def one_run(query: str) -> None:
+        async with semaphore:
+            manager = TimedResearchManager(
+                domain_config=domain_config,
+                search_cache=search_cache,
+                scheduler=scheduler,
+                report_cache=report_cache,
+                run_config=run_config,
+                email_enabled=False,
+                checkpoints=checkpoints,
+            )
+            started = time.perf_counter()
+            try:
+                async for _ in manager.run(query):
+                    pass
+            except Exception as e:
+                failures.append(type(e).__name__)
+                return
+            end_to_end.append(time.perf_counter() - started)
+            for stage, seconds in manager.timings.items():
+                stage_timings[stage].append(seconds)
+
+    lag_samples, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one_run(query) for query in queries))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    traced_peak = None
+    if args.tracemalloc:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "concurrency": concurrency,
+        "runs": args.runs,
+        "failed": len(failures),
+        "elapsed_seconds": round(elapsed, 3),
+        "runs_per_second": round(len(end_to_end) / elapsed, 3) if elapsed else 0.0,
+        "end_to_end": summarize(end_to_end),
+        "stages": {stage: summarize(values) for stage, values in stage_timings.items()},
+        "loop_lag": {**summarize(lag_samples), "max": round(max(lag_samples, default=0.0), 4)},
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_traced_mb": round(traced_peak / 1024 / 1024, 1) if traced_peak is not None else None,
+        "model_calls": sum(model.calls for model in provider.models.values()),
+        "search_cache": search_cache.stats(),
+        "report_cache": report_cache.stats(),
+        "scheduler": scheduler.stats(),
+    }
+
+
+def print_level(result: dict) -> None:
+    e2e = result["end_to_end"]
+    print(
+        f"\nconcurrency={result['concurrency']:<4} runs={result['runs']} failed={result['failed']} "
+        f"runs/s={result['runs_per_second']} peak_rss={result['peak_rss_mb']}MB "
+        f"model_calls={result['model_calls']}"
+    )
+    print(f"  {'stage':<20}{'p50':>10}{'p95':>10}{'p99':>10}")
+    print(f"  {'end_to_end':<20}{e2e['p50']:>10.3f}{e2e['p95']:>10.3f}{e2e['p99']:>10.3f}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<20}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+    lag = result["loop_lag"]
+    print(f"  {'loop_lag':<20}{lag['p50']:>10.4f}{lag['p95']:>10.4f}{lag['p99']:>10.4f}  max={lag['max']}")
+
+
+async def main_async(args) -> list:
+    domain_config = None
+    if args.domain:
+        from deep_researcher.core.domain_launcher import load_domain_config
+        domain_config = load_domain_config(args.domain)
+    if args.resilience:
+        domain_config = {**(domain_config or {}), "resilience": json.loads(args.resilience)}
+    if args.depth:
+        domain_config = {**(domain_config or {}), "depth": json.loads(args.depth)}
+    if args.writer:
+        domain_config = {**(domain_config or {}), "writer": json.loads(args.writer)}
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args, concurrency, domain_config)
+        print_level(result)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the research pipeline")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda value: [int(level) for level in value.split(",")],
+                        help="Comma-separated concurrent run levels")
+    parser.add_argument("--runs", type=int, default=32, help="Runs per concurrency level")
+    parser.add_argument("--latency-scale", type=float, default=0.01,
+                        help="Multiplier on the fake model's realistic latencies (1.0 = real time)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of model calls that fail")
+    parser.add_argument("--distinct-queries", type=int, default=0,
+                        help="Draw run queries from this many distinct values (0 = all unique)")
+    parser.add_argument("--distinct-terms", type=int, default=0,
+                        help="Draw planned search terms from this many distinct values (0 = all unique)")
+    parser.add_argument("--scheduler-concurrency", type=int, default=64)
+    parser.add_argument("--rpm", type=float, default=None, help="Scheduler requests-per-minute limit")
+    parser.add_argument("--tpm", type=float, default=None, help="Scheduler tokens-per-minute limit")
+    parser.add_argument("--domain", default=None, help="Domain config to load, e.g. cruise")
+    parser.add_argument("--resilience", default=None,
+                        help='JSON resilience policy, e.g. \'{"hedge_percentile": 0.9, "quorum": 0.8}\'')
+    parser.add_argument("--depth", default=None,
+                        help='JSON depth budget, e.g. \'{"max_rounds": 3}\' for gap-checked follow-up rounds')
+    parser.add_argument("--writer", default=None,
+                        help='JSON writer settings, e.g. \'{"mode": "map_reduce", "min_results": 1}\'')
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report peak traced Python memory")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--quiet", action="store_true", help="Silence the pipeline's progress prints")
+    args = parser.parse_args()
+
+    set_tracing_disabled(True)
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+    if args.quiet:
+        real_stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            results = asyncio.run(main_async(args))
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+        for result in results:
+            print_level(result)
+    else:
+        results = asyncio.run(main_async(args))
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
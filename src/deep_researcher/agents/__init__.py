@@ -4,5 +4,12 @@ from .planner_agent import planner_agent
 from .search_agent import search_agent  
 from .writer_agent import writer_agent
 from .email_agent import email_agent
+from .gap_check_agent import gap_check_agent
+from .outline_agent import outline_agent
+from .section_writer_agent import section_writer_agent
+from .report_editor_agent import report_editor_agent
 
-__all__ = ["planner_agent", "search_agent", "writer_agent", "email_agent"]
\ No newline at end of file
+__all__ = [
+    "planner_agent", "search_agent", "writer_agent", "email_agent", "gap_check_agent",
+    "outline_agent", "section_writer_agent", "report_editor_agent",
+]
@@ -1,21 +1,22 @@
 import os
 from typing import Dict
 
-import sendgrid
-from sendgrid.helpers.mail import Email, Mail, Content, To
 from agents import Agent, function_tool
 
+def deliver_email(subject: str, html_body: str) -> Dict[str, str]:
+    """ Queue an email with the given subject and HTML body for background delivery """
+    # Imported here so the agents package doesn't depend on the core package at import time
+    from ..core.email_outbox import get_email_outbox
+
+    message_id = get_email_outbox().enqueue(subject, html_body)
+    if message_id is None:
+        return {"status": "skipped", "reason": "no recipient configured"}
+    return {"status": "queued"}
+
 @function_tool
 def send_email(subject: str, html_body: str) -> Dict[str, str]:
     """ Send an email with the given subject and HTML body """
-    sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
-    from_email = Email(os.environ.get('FROM_EMAIL'))
-    to_email = To(os.environ.get('TO_EMAIL'))
-    content = Content("text/html", html_body)
-    mail = Mail(from_email, to_email, subject, content).get()
-    response = sg.client.mail.send.post(request_body=mail)
-    print("Email response", response.status_code)
-    return {"status": "success"}
+    return deliver_email(subject, html_body)
 
 INSTRUCTIONS = """You are able to send a nicely formatted HTML email based on a detailed report.
 You will be provided with a detailed report. You should use your tool to send one email, providing the 
@@ -25,5 +26,5 @@ email_agent = Agent(
     name="Email agent",
     instructions=INSTRUCTIONS,
     tools=[send_email],
-    model="gpt-4o-mini",
+    model=os.environ.get('OPENAI_SMALL_MODEL') or "gpt-4o-mini",
 )
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from agents import Agent
+from .planner_agent import WebSearchItem
+import os
+
+INSTRUCTIONS = (
+    "You are a research reviewer. You will be given a research query and summaries of the web "
+    "searches performed so far. Judge how well they cover what is needed to answer the query "
+    "thoroughly, as a coverage score from 0 (nothing useful) to 1 (fully covered). If important "
+    "aspects are missing, outdated or contradictory, propose targeted web searches that would fill "
+    "those gaps, most important first. Never repeat a search that has already been performed. "
+    "Propose no searches if coverage is already good."
+)
+
+
+class CoverageAssessment(BaseModel):
+    coverage: float = Field(description="How well the searches so far cover the query, from 0 to 1.")
+
+    gaps: list[str] = Field(description="Important aspects of the query the searches don't cover yet.")
+
+    searches: list[WebSearchItem] = Field(description="Targeted follow-up searches to fill the gaps, most important first.")
+
+
+gap_check_agent = Agent(
+    name="GapCheckAgent",
+    instructions=INSTRUCTIONS,
+    # A judgement call over short summaries, so a cheaper model is usually enough
+    model=os.environ.get('OPENAI_SMALL_MODEL') or os.environ.get('OPENAI_MEDIUM_MODEL'),
+    output_type=CoverageAssessment,
+)
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from agents import Agent
+import os
+
+INSTRUCTIONS = (
+    "You are a senior researcher planning a report for a research query. You will be given the query "
+    "and numbered excerpts of the web searches a research assistant performed. Design the outline of a "
+    "cohesive, detailed report: a title and its main sections in reading order. For each section give a "
+    "heading, a brief of what it must cover, and the numbers of the search results it should draw on. "
+    "Every useful search result should belong to at least one section. Do not include an introduction "
+    "or conclusion section, those are written separately."
+)
+
+
+class OutlineSection(BaseModel):
+    heading: str = Field(description="The section heading.")
+
+    brief: str = Field(description="What this section must cover, in one or two sentences.")
+
+    results: list[int] = Field(description="Numbers of the search results this section should draw on.")
+
+
+class ReportOutline(BaseModel):
+    title: str = Field(description="The title of the report.")
+
+    sections: list[OutlineSection] = Field(description="The main sections of the report, in reading order.")
+
+
+outline_agent = Agent(
+    name="OutlineAgent",
+    instructions=INSTRUCTIONS,
+    model=os.environ.get('OPENAI_MEDIUM_MODEL'),
+    output_type=ReportOutline,
+)
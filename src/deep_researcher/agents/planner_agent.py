@@ -5,7 +5,8 @@ import os
 HOW_MANY_SEARCHES = 3
 
 INSTRUCTIONS = f"You are a helpful research assistant. Given a query, come up with a set of web searches \
-to perform to best answer the query. Output {HOW_MANY_SEARCHES} terms to query for."
+to perform to best answer the query. Output {HOW_MANY_SEARCHES} terms to query for, unless you are \
+asked for a different number."
 
 
 class WebSearchItem(BaseModel):
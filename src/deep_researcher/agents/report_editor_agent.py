@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from agents import Agent
+import os
+
+INSTRUCTIONS = (
+    "You are the editor of a research report whose sections were written separately. You will be "
+    "given the original query and the draft sections. Write a short introduction that frames the "
+    "report and sets up its sections, and a conclusion that ties their findings together and resolves "
+    "any inconsistencies between them. Also write a 2-3 sentence summary of the findings and suggest "
+    "topics to research further. Do not rewrite the sections themselves."
+)
+
+
+class ReportEdit(BaseModel):
+    short_summary: str = Field(description="A short 2-3 sentence summary of the findings.")
+
+    introduction: str = Field(description="The introduction of the report, in markdown.")
+
+    conclusion: str = Field(description="The conclusion of the report, in markdown.")
+
+    follow_up_questions: list[str] = Field(description="Suggested topics to research further")
+
+
+report_editor_agent = Agent(
+    name="ReportEditorAgent",
+    instructions=INSTRUCTIONS,
+    # Writes only the framing around the sections, so a cheaper model is usually enough
+    model=os.environ.get('OPENAI_SMALL_MODEL') or os.environ.get('OPENAI_MEDIUM_MODEL'),
+    output_type=ReportEdit,
+)
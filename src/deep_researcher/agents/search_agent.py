@@ -15,4 +15,11 @@ search_agent = Agent(
     tools=[WebSearchTool(search_context_size="low")],
     model=os.environ.get('OPENAI_MEDIUM_MODEL'),
     model_settings=ModelSettings(tool_choice="required"),
-)
\ No newline at end of file
+)
+CORPUS_INSTRUCTIONS = (
+    "You are a research assistant. Given a search term, you search our document collection for that term "
+    "with your tool and produce a concise summary of the passages it returns. The summary must 2-3 "
+    "paragraphs and less than 300 words. Capture the main points and name the source documents. Only use "
+    "what the passages say; if they don't cover the term, say so in one sentence. Do not include any "
+    "additional commentary other than the summary itself."
+)
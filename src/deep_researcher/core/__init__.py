@@ -1,6 +1,27 @@
-"""Core research framework components."""
+"""Core research framework components.
 
-from .research_manager import ResearchManager
-from .domain_launcher import load_domain_config, create_domain_ui
+Submodules are imported on first attribute access, so importing this
+package doesn't load Gradio, SendGrid or the HTTP service unless they are used.
+"""
+import importlib
 
-__all__ = ["ResearchManager", "load_domain_config", "create_domain_ui"]
\ No newline at end of file
+_EXPORTS = {
+    "ResearchManager": ".research_manager",
+    "load_domain_config": ".domain_launcher",
+    "create_domain_ui": ".domain_launcher",
+    "get_domain_registry": ".domain_registry",
+}
+
+__all__ = ["ResearchManager", "load_domain_config", "create_domain_ui", "get_domain_registry"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,191 @@
+"""Headless batch runner for JSONL research workloads.
+
+Reads ``{"domain": ..., "query": ...}`` records (an optional ``"id"`` is
+used as the record key, optional ``"max_seconds"`` / ``"max_tokens"``
+bound the run's research depth and ``"deadline_seconds"`` cancels it
+outright) from a JSONL file, runs them through ResearchManager with
+bounded parallelism and appends one result line per record to an output
+JSONL file as soon as it finishes. A line that isn't a record with a
+query gets a failed result line and the batch carries on. Re-running with
+the same output file skips records that already completed, so an
+interrupted batch resumes where it stopped. With --email, the batch
+waits for the email outbox to send its queued reports before exiting.
+
+Usage:
+    python -m deep_researcher.core.batch_runner queries.jsonl reports.jsonl --parallelism 8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .domain_registry import get_domain_registry
+from .email_outbox import get_email_outbox
+from .research_manager import ResearchManager
+
+# How long a finished batch waits for its queued emails to go out
+EMAIL_DRAIN_SECONDS = 300
+
+
+def record_key(record: dict) -> str:
+    """Stable identity of an input record: its id, or a hash of domain and query."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    payload = json.dumps([record.get("domain"), record["query"]])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def load_completed(output_path: Path) -> set:
+    """Keys of records that already completed in a previous run of the batch."""
+    completed = set()
+    if not output_path.exists():
+        return completed
+    with output_path.open(encoding="utf-8") as output:
+        for line in output:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that record will simply be re-run
+                continue
+            if result.get("status") == "completed":
+                completed.add(result["key"])
+    return completed
+
+
+class BatchRunner:
+    """Runs input records through ResearchManager and appends results to a JSONL file."""
+
+    def __init__(self, output_path: Path, parallelism: int = 4, email: bool = False, refresh: bool = False,
+                 run_config=None):
+        self.output_path = output_path
+        self.run_config = run_config
+        self.parallelism = parallelism
+        self.email = email
+        self.refresh = refresh
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self, input_path: Path) -> None:
+        done = load_completed(self.output_path)
+        if done:
+            print(f"Resuming: {len(done)} records already completed")
+        self._ensure_trailing_newline()
+
+        if self.email:
+            get_email_outbox().start()
+        queue = asyncio.Queue(maxsize=self.parallelism * 2)
+        started = time.perf_counter()
+        with self.output_path.open("a", encoding="utf-8") as output:
+            workers = [asyncio.create_task(self._worker(queue, output)) for _ in range(self.parallelism)]
+            skipped = 0
+            with input_path.open(encoding="utf-8") as source:
+                for number, line in enumerate(source, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        if not isinstance(record, dict) or not isinstance(record.get("query"), str):
+                            raise ValueError('expected an object with a "query" string')
+                        key = record_key(record)
+                    except ValueError as e:
+                        print(f"Skipping line {number} of {input_path}: {e}")
+                        self.failed += 1
+                        self._write(output, {"key": f"{input_path.name}:{number}", "status": "failed",
+                                             "error": f"{type(e).__name__}: {e}"})
+                        continue
+                    if key in done:
+                        skipped += 1
+                        continue
+                    done.add(key)
+                    await queue.put((key, record))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        if self.email:
+            print(f"Waiting for queued emails: {get_email_outbox().stats()}")
+            await get_email_outbox().drain(timeout=EMAIL_DRAIN_SECONDS)
+
+        elapsed = time.perf_counter() - started
+        per_hour = self.completed / elapsed * 3600 if elapsed else 0.0
+        print(
+            f"Batch finished: {self.completed} completed, {self.failed} failed, {skipped} skipped "
+            f"in {elapsed:.1f}s ({per_hour:.0f} queries/hour)"
+        )
+
+    async def _worker(self, queue: asyncio.Queue, output) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            key, record = item
+            result = await self._research(key, record)
+            self._write(output, result)
+            print(f"[{self.completed} done, {self.failed} failed] {result['status']}: {record['query']}")
+
+    async def _research(self, key: str, record: dict) -> dict:
+        result = {"key": key, "domain": record.get("domain"), "query": record["query"]}
+        started = time.perf_counter()
+        manager = None
+        try:
+            manager = self._manager(record.get("domain"))
+            budget = manager.depth_budget(max_seconds=record.get("max_seconds"), max_tokens=record.get("max_tokens"))
+            async for _ in manager.run(record["query"], refresh=self.refresh, budget=budget,
+                                       deadline_seconds=record.get("deadline_seconds")):
+                pass
+            result.update(status="completed", report=manager.report.model_dump())
+            self.completed += 1
+        except Exception as e:
+            print(f"Research failed for '{record['query']}': {e}")
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+            self.failed += 1
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        if manager is not None:
+            result["metrics"] = manager.metrics.summary()
+        return result
+
+    def _write(self, output, result: dict) -> None:
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        os.fsync(output.fileno())
+
+    def _manager(self, domain: str | None) -> ResearchManager:
+        if domain is None:
+            return ResearchManager(email_enabled=self.email, run_config=self.run_config)
+        entry = get_domain_registry().get(domain)
+        return ResearchManager(domain_config=entry.config, agents=entry.agents,
+                               email_enabled=self.email, run_config=self.run_config)
+
+    def _ensure_trailing_newline(self) -> None:
+        if not self.output_path.exists() or self.output_path.stat().st_size == 0:
+            return
+        with self.output_path.open("rb+") as output:
+            output.seek(-1, os.SEEK_END)
+            if output.read(1) != b"\n":
+                output.write(b"\n")
+
+
+def main():
+    """Main entry point for batch research."""
+    parser = argparse.ArgumentParser(description="Run research queries from a JSONL file without a UI")
+    parser.add_argument("input", type=Path, help="JSONL file of {\"domain\": ..., \"query\": ...} records")
+    parser.add_argument("output", type=Path, help="JSONL file results are appended to")
+    parser.add_argument("--parallelism", type=int, default=4, help="Records researched concurrently")
+    parser.add_argument("--email", action="store_true", help="Also email each report")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached reports")
+    parser.add_argument("--no-metrics", action="store_true", help="Don't record per-stage timings")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    if not args.no_metrics:
+        os.environ.setdefault("METRICS_ENABLED", "1")
+    runner = BatchRunner(args.output, parallelism=args.parallelism, email=args.email, refresh=args.refresh)
+    asyncio.run(runner.run(args.input))
+
+
+if __name__ == "__main__":
+    main()
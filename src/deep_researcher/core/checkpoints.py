@@ -0,0 +1,203 @@
+"""SQLite checkpoints of research run stages, so interrupted runs can resume.
+
+Each run's completed artifacts are stored under its run id as they are
+produced: the search plan, every individual search summary, each depth
+round's gap check, the map-reduce writer's outline and sections, the
+ReportData and whether the email went out. When a run for the same domain
+and query failed, was cancelled or was cut off by a restart, the next run
+for it picks up those artifacts and only repeats the steps that never
+finished. So does a run left "degraded" because its report rests on no
+search results, or on searches a quorum or deadline cut short: the
+missing searches are retried and the report rewritten.
+Follow-up questions researched ahead of time (see prefetch.py) are left
+"prefetched" the same way.
+
+The store lives in the file named by CHECKPOINT_DB, by default
+checkpoints.db in the data directory (see data_dir.py); ":memory:" keeps
+it in memory, so a failed writer call can still resume within the
+process. Processes may share the file: a run another live process on this
+host is working on is never resumed. A resumed run redoes searches older
+than its domain's search TTL, and whatever was written from them.
+Runs older than CHECKPOINT_MAX_AGE_SECONDS, and the oldest runs beyond
+CHECKPOINT_MAX_RUNS, are deleted as new runs start.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from .data_dir import data_path
+from .search_cache import normalize_query
+
+DEFAULT_MAX_RUNS = 500
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+# Artifact kinds
+PLAN = "plan"
+SEARCH = "search"
+GAP_CHECK = "gap_check"
+REPORT = "report"
+EMAIL = "email"
+OUTLINE = "outline"
+SECTION = "section"
+
+
+class CheckpointStore:
+    """Durable per-run stage artifacts with a bounded retention policy."""
+
+    def __init__(self, db_path: str | None = None, max_runs: int = DEFAULT_MAX_RUNS,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.db_path = db_path or ":memory:"
+        self.max_runs = max_runs
+        self.max_age_seconds = max_age_seconds
+        # Identifies this process, so runs it left "running" before a restart can be resumed
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{time.time()}"
+        self._active = set()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoint_runs ("
+            " run_id TEXT PRIMARY KEY, domain TEXT NOT NULL, query_key TEXT NOT NULL, query TEXT NOT NULL,"
+            " status TEXT NOT NULL, owner TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS checkpoint_runs_query ON checkpoint_runs (domain, query_key, updated_at);"
+            "CREATE TABLE IF NOT EXISTS checkpoint_artifacts ("
+            " run_id TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, PRIMARY KEY (run_id, kind, key));"
+        )
+        self._db.commit()
+
+    def find_resumable(self, domain: str, query: str) -> str | None:
+        """Id of the most recent unfinished run for this domain and query, if any."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT run_id, status, owner FROM checkpoint_runs"
+                " WHERE domain = ? AND query_key = ? AND status != 'completed' AND updated_at > ?"
+                " ORDER BY updated_at DESC",
+                (domain, normalize_query(query), time.time() - self.max_age_seconds),
+            ).fetchall()
+        for run_id, status, owner in rows:
+            # A run still going is not resumable; one left running by a dead process is
+            if run_id in self._active or (status == "running" and _owner_alive(owner, self.owner)):
+                continue
+            return run_id
+        return None
+
+    def start_run(self, run_id: str, domain: str, query: str) -> None:
+        """Create or reopen a run and apply the retention policy."""
+        now = time.time()
+        with self._lock:
+            self._active.add(run_id)
+            self._db.execute(
+                "INSERT INTO checkpoint_runs (run_id, domain, query_key, query, status, owner, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'running', ?, ?, ?)"
+                " ON CONFLICT (run_id) DO UPDATE SET status = 'running', owner = excluded.owner,"
+                " updated_at = excluded.updated_at",
+                (run_id, domain, normalize_query(query), query, self.owner, now, now),
+            )
+            self._prune(now)
+            self._db.commit()
+
+    def save(self, run_id: str, kind: str, key: str, value) -> None:
+        """Persist one JSON-serializable artifact of a run."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoint_artifacts (run_id, kind, key, value, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (run_id, kind, key, json.dumps(value), now),
+            )
+            self._db.execute("UPDATE checkpoint_runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+            self._db.commit()
+
+    def load(self, run_id: str) -> dict:
+        """All artifacts of a run as {kind: {key: value}}."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, key, value FROM checkpoint_artifacts WHERE run_id = ? ORDER BY created_at",
+                (run_id,),
+            ).fetchall()
+        artifacts = {}
+        for kind, key, value in rows:
+            artifacts.setdefault(kind, {})[key] = json.loads(value)
+        return artifacts
+
+    def expire(self, run_id: str, kind: str, max_age_seconds: float) -> int:
+        """Delete a run's artifacts of one kind saved more than max_age_seconds ago; returns how many."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM checkpoint_artifacts WHERE run_id = ? AND kind = ? AND created_at <= ?",
+                (run_id, kind, time.time() - max_age_seconds),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def discard(self, run_id: str, kinds) -> None:
+        """Delete a run's artifacts of the given kinds, so a resumed run redoes those stages."""
+        kinds = list(kinds)
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM checkpoint_artifacts WHERE run_id = ? AND kind IN ({','.join('?' * len(kinds))})",
+                (run_id, *kinds),
+            )
+            self._db.commit()
+
+    def finish(self, run_id: str, status: str) -> None:
+        """Mark a run completed, degraded, failed or cancelled. Only completed runs are never resumed."""
+        with self._lock:
+            self._active.discard(run_id)
+            self._db.execute(
+                "UPDATE checkpoint_runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, time.time(), run_id),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM checkpoint_runs GROUP BY status"))
+            artifacts = self._db.execute("SELECT COUNT(*) FROM checkpoint_artifacts").fetchone()[0]
+        return {"runs": by_status, "artifacts": artifacts}
+
+    def _prune(self, now: float) -> None:
+        expired = [row[0] for row in self._db.execute(
+            "SELECT run_id FROM checkpoint_runs WHERE updated_at <= ?", (now - self.max_age_seconds,)
+        )]
+        expired += [row[0] for row in self._db.execute(
+            "SELECT run_id FROM checkpoint_runs ORDER BY updated_at DESC LIMIT -1 OFFSET ?", (self.max_runs,)
+        )]
+        for run_id in set(expired) - self._active:
+            self._db.execute("DELETE FROM checkpoint_artifacts WHERE run_id = ?", (run_id,))
+            self._db.execute("DELETE FROM checkpoint_runs WHERE run_id = ?", (run_id,))
+
+
+def _owner_alive(owner: str, current: str) -> bool:
+    """Whether the process that recorded owner may still be running; other hosts are assumed gone."""
+    if owner == current:
+        return True
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # This process's pid under another owner was an earlier process that has since exited
+    return int(pid) != os.getpid()
+
+
+_checkpoint_store = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Return the process-wide checkpoint store, configured from the environment."""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(
+            db_path=os.environ.get("CHECKPOINT_DB") or data_path("checkpoints.db"),
+            max_runs=int(os.environ.get("CHECKPOINT_MAX_RUNS", DEFAULT_MAX_RUNS)),
+            max_age_seconds=float(os.environ.get("CHECKPOINT_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)),
+        )
+    return _checkpoint_store
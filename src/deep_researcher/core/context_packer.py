@@ -0,0 +1,139 @@
+"""Pack search summaries into a compact, token-budgeted writer prompt.
+
+Summaries for related searches tend to repeat the same facts. The packer
+splits them into paragraphs, drops near-duplicates using word shingles,
+ranks what is left by relevance to the original query and keeps the best
+paragraphs that fit the writer model's token budget.
+"""
+import math
+import re
+from dataclasses import dataclass
+
+from .scheduler import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 8000
+DEFAULT_DUPLICATE_THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"[a-z0-9$%]+(?:[.,][0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who how why when where i me my we our you your".split()
+)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    original_tokens: int
+    packed_tokens: int
+    duplicates_removed: int
+    dropped_for_budget: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.packed_tokens)
+
+
+@dataclass
+class _Paragraph:
+    source: int
+    position: int
+    text: str
+    words: list
+    shingles: frozenset
+    tokens: int
+    score: float = 0.0
+
+
+def resolve_token_budget(context_config: dict, model) -> int:
+    """Read the writer token budget, which may be a single number or a per-model mapping."""
+    budget = context_config.get('token_budget', DEFAULT_TOKEN_BUDGET)
+    if isinstance(budget, dict):
+        return budget.get(str(model), budget.get('default', DEFAULT_TOKEN_BUDGET))
+    return budget
+
+
+def pack_search_results(
+    query: str,
+    search_results: list[str],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+) -> PackedContext:
+    """Deduplicate, rank and budget the search summaries for the writer."""
+    paragraphs = []
+    for source, summary in enumerate(search_results):
+        for position, text in enumerate(_split_paragraphs(summary)):
+            words = _WORD.findall(text.lower())
+            paragraphs.append(_Paragraph(source, position, text, words, _shingles(words), estimate_tokens(text)))
+
+    unique = []
+    for paragraph in paragraphs:
+        if not any(_is_near_duplicate(paragraph, kept, duplicate_threshold) for kept in unique):
+            unique.append(paragraph)
+
+    _score(query, unique)
+    selected, used = [], 0
+    for paragraph in sorted(unique, key=lambda p: p.score, reverse=True):
+        if used + paragraph.tokens <= token_budget:
+            selected.append(paragraph)
+            used += paragraph.tokens
+
+    text = _format(selected)
+    return PackedContext(
+        text=text,
+        original_tokens=estimate_tokens(str(search_results)),
+        packed_tokens=estimate_tokens(text),
+        duplicates_removed=len(paragraphs) - len(unique),
+        dropped_for_budget=len(unique) - len(selected),
+    )
+
+
+def _split_paragraphs(summary: str) -> list[str]:
+    parts = [part.strip() for part in re.split(r"\n\s*\n", summary.strip())]
+    return [part for part in parts if part]
+
+
+def _shingles(words: list) -> frozenset:
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def _is_near_duplicate(candidate: _Paragraph, kept: _Paragraph, threshold: float) -> bool:
+    if not candidate.shingles or not kept.shingles:
+        return candidate.text == kept.text
+    overlap = len(candidate.shingles & kept.shingles)
+    if not overlap:
+        return False
+    jaccard = overlap / len(candidate.shingles | kept.shingles)
+    # Also catch a paragraph that is mostly contained in a longer one already kept
+    containment = overlap / len(candidate.shingles)
+    return jaccard >= threshold or containment >= max(threshold, 0.9)
+
+
+def _score(query: str, paragraphs: list) -> None:
+    """Score paragraphs by idf-weighted overlap with the query terms, earlier paragraphs first on ties."""
+    terms = {word for word in _WORD.findall(query.lower()) if word not in _STOPWORDS}
+    document_frequency = {}
+    for paragraph in paragraphs:
+        for word in set(paragraph.words) & terms:
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+    total = len(paragraphs) or 1
+    for paragraph in paragraphs:
+        present = set(paragraph.words) & terms
+        relevance = sum(math.log(1 + total / document_frequency[word]) for word in present)
+        paragraph.score = relevance / math.sqrt(1 + len(paragraph.words) / 100) - paragraph.position * 0.01
+
+
+def _format(selected: list) -> str:
+    """Group the kept paragraphs by source, most relevant source first, in their original order."""
+    by_source = {}
+    for paragraph in selected:
+        by_source.setdefault(paragraph.source, []).append(paragraph)
+    blocks = sorted(by_source.values(), key=lambda group: max(p.score for p in group), reverse=True)
+    sections = []
+    for number, group in enumerate(blocks, start=1):
+        body = "\n\n".join(p.text for p in sorted(group, key=lambda p: p.position))
+        sections.append(f"<result {number}>\n{body}\n</result {number}>")
+    return "\n\n".join(sections)
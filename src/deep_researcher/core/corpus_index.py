@@ -0,0 +1,358 @@
+"""BM25 passage search over a local directory of documents.
+
+Documents (text, Markdown, CSV, JSON, HTML and, with pypdf installed, PDF)
+are split into passages of about passage_words words and indexed into
+segments on disk, next to a manifest.json listing the indexed files with
+their sizes and modification times. Each segment is four files:
+
+* ``<name>.lex``  JSON lexicon, term -> [first posting, document frequency]
+* ``<name>.post`` uint32 (passage, term frequency) pairs, grouped by term
+* ``<name>.docs`` uint32 (file, text offset, text length, tokens) per passage
+* ``<name>.text`` the passages' UTF-8 text
+
+Postings, passages and text are memory-mapped, so opening an index costs
+only its lexicons and queries touch just the postings of their terms.
+
+refresh() re-scans the directory. New and changed files go into a new
+segment; the passages of changed and deleted files are tombstoned in the
+manifest. Once there are too many segments or tombstones, the live files
+are re-indexed into a single segment. Document frequencies include
+tombstoned passages until then, which shifts scores only slightly.
+Only one process should refresh a given index directory.
+"""
+import heapq
+import html
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+
+INDEX_VERSION = 1
+DEFAULT_PASSAGE_WORDS = 120
+DEFAULT_REINDEX_INTERVAL_SECONDS = 30.0
+MAX_SEGMENTS = 8
+MAX_DELETED_RATIO = 0.3
+TEXT_SUFFIXES = frozenset({".txt", ".md", ".markdown", ".rst", ".csv", ".tsv", ".json", ".xml", ".html", ".htm"})
+PDF_SUFFIX = ".pdf"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_TAG = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_PARAGRAPH = re.compile(r"\n\s*\n")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or that the their then "
+    "there these they this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens without stopwords; numbers are kept, prices and dates matter."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_passages(text: str, passage_words: int = DEFAULT_PASSAGE_WORDS) -> list[str]:
+    """Group paragraphs into passages of about passage_words words, splitting longer paragraphs."""
+    passages, current, size = [], [], 0
+    for paragraph in _PARAGRAPH.split(text):
+        words = paragraph.split()
+        for start in range(0, len(words), passage_words):
+            chunk = words[start:start + passage_words]
+            current.append(" ".join(chunk))
+            size += len(chunk)
+            if size >= passage_words:
+                passages.append("\n\n".join(current))
+                current, size = [], 0
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+def read_document(path: Path) -> str:
+    """The plain text of a document, or "" when it can't be read."""
+    suffix = path.suffix.lower()
+    try:
+        if suffix == PDF_SUFFIX:
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                return ""
+            return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+        text = path.read_text(encoding="utf-8", errors="replace")
+    except Exception as e:
+        print(f"Skipping {path}: {type(e).__name__}: {e}")
+        return ""
+    if suffix in (".html", ".htm", ".xml"):
+        text = html.unescape(_TAG.sub(" ", text))
+    return text
+
+
+@dataclass(frozen=True)
+class Passage:
+    path: str
+    text: str
+    score: float
+
+
+class _Segment:
+    """A read-only, memory-mapped segment."""
+
+    def __init__(self, directory: Path, name: str):
+        self.name = name
+        self.lexicon = json.loads((directory / f"{name}.lex").read_text(encoding="utf-8"))
+        self._maps = [self._map(directory / f"{name}.{kind}") for kind in ("post", "docs", "text")]
+        self.postings = memoryview(self._maps[0]).cast("I")
+        self.docs = memoryview(self._maps[1]).cast("I")
+        self.text = self._maps[2]
+
+    @staticmethod
+    def _map(path: Path) -> mmap | bytes:
+        # Empty files can't be mapped, e.g. the postings of a segment whose passages are all stopwords
+        if path.stat().st_size == 0:
+            return b""
+        with path.open("rb") as file:
+            return mmap(file.fileno(), 0, access=ACCESS_READ)
+
+    def passage_text(self, passage: int) -> str:
+        offset, length = self.docs[4 * passage + 1], self.docs[4 * passage + 2]
+        return self.text[offset:offset + length].decode("utf-8")
+
+
+class CorpusIndex:
+    """An incrementally maintained BM25 index of the documents under corpus_dir."""
+
+    def __init__(self, corpus_dir: str | Path, index_dir: str | Path | None = None,
+                 passage_words: int = DEFAULT_PASSAGE_WORDS,
+                 reindex_interval: float = DEFAULT_REINDEX_INTERVAL_SECONDS):
+        self.corpus_dir = Path(corpus_dir).resolve()
+        self.index_dir = Path(index_dir).resolve() if index_dir else self.corpus_dir / ".index"
+        self.passage_words = passage_words
+        # Seconds between directory scans when searching; a negative value only refreshes on demand
+        self.reindex_interval = reindex_interval
+        self._lock = threading.Lock()
+        self._checked = None
+        manifest = self._load_manifest()
+        # Replaced as one tuple, so a search always sees a manifest with its own segments
+        self._state = (manifest, {entry["name"]: _Segment(self.index_dir, entry["name"])
+                                  for entry in manifest["segments"]})
+
+    @property
+    def generation(self) -> int:
+        """Incremented by every refresh that changed the index."""
+        return self._state[0]["generation"]
+
+    def stats(self) -> dict:
+        manifest = self._state[0]
+        return {
+            "files": len(manifest["files"]),
+            "segments": len(manifest["segments"]),
+            "passages": sum(entry["live_passages"] for entry in manifest["segments"]),
+            "generation": manifest["generation"],
+        }
+
+    def search(self, query: str, top_k: int = 5) -> list[Passage]:
+        """The top_k passages for query by BM25, refreshing the index first if it is due."""
+        self.refresh_if_stale()
+        manifest, segments = self._state
+        live_passages = sum(entry["live_passages"] for entry in manifest["segments"])
+        if not live_passages:
+            return []
+        average_length = sum(entry["live_tokens"] for entry in manifest["segments"]) / live_passages
+
+        scores = Counter()
+        for term in set(tokenize(query)):
+            entries = [(entry, segments[entry["name"]].lexicon.get(term)) for entry in manifest["segments"]]
+            frequency = sum(found[1] for _, found in entries if found)
+            if not frequency:
+                continue
+            idf = math.log(1 + (live_passages - frequency + 0.5) / (frequency + 0.5))
+            for entry, found in entries:
+                if not found:
+                    continue
+                segment, deleted = segments[entry["name"]], set(entry["deleted"])
+                start, count = found
+                postings, docs = segment.postings, segment.docs
+                for position in range(2 * start, 2 * (start + count), 2):
+                    passage, tf = postings[position], postings[position + 1]
+                    if deleted and docs[4 * passage] in deleted:
+                        continue
+                    length = docs[4 * passage + 3]
+                    scores[entry["name"], passage] += idf * tf * (K1 + 1) / (
+                        tf + K1 * (1 - B + B * length / average_length))
+
+        files = {entry["name"]: entry["files"] for entry in manifest["segments"]}
+        return [
+            Passage(files[name][segments[name].docs[4 * passage]], segments[name].passage_text(passage), score)
+            for (name, passage), score in heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        ]
+
+    def refresh_if_stale(self) -> bool:
+        """refresh() unless the directory was scanned less than reindex_interval seconds ago."""
+        now = time.monotonic()
+        if self._checked is not None and (self.reindex_interval < 0 or now - self._checked < self.reindex_interval):
+            return False
+        return self.refresh()
+
+    def refresh(self) -> bool:
+        """Index new and changed files and drop deleted ones; True if the index changed."""
+        with self._lock:
+            self._checked = time.monotonic()
+            manifest = json.loads(json.dumps(self._state[0]))
+            found = self._scan()
+            indexed = manifest["files"]
+            changed = [path for path, stat in found.items()
+                       if path not in indexed or [indexed[path]["mtime_ns"], indexed[path]["size"]] != stat]
+            removed = [path for path in indexed if path not in found]
+            if not changed and not removed:
+                return False
+
+            started = time.perf_counter()
+            for path in changed + removed:
+                self._tombstone(manifest, path)
+            segment_count = len([entry for entry in manifest["segments"] if entry["live_passages"]]) + 1
+            total = sum(len(entry["docs_per_file"]) for entry in manifest["segments"])
+            deleted = sum(len(entry["deleted"]) for entry in manifest["segments"])
+            if segment_count > MAX_SEGMENTS or (total and deleted / total > MAX_DELETED_RATIO):
+                # Merge by re-indexing every live file into one segment
+                for path in list(manifest["files"]):
+                    if path in found and path not in changed:
+                        self._tombstone(manifest, path)
+                        changed.append(path)
+            self._add_segment(manifest, changed, found)
+            manifest["segments"] = [entry for entry in manifest["segments"] if entry["live_passages"]]
+            manifest["generation"] += 1
+            self._install(manifest)
+            print(
+                f"Corpus index {self.corpus_dir}: {len(changed)} files indexed, {len(removed)} removed "
+                f"in {time.perf_counter() - started:.2f}s ({self.stats()['passages']} passages)"
+            )
+            return True
+
+    def _scan(self) -> dict:
+        found = {}
+        for root, directories, names in os.walk(self.corpus_dir):
+            directories[:] = [name for name in directories
+                              if not name.startswith(".") and Path(root, name) != self.index_dir]
+            for name in names:
+                path = Path(root, name)
+                suffix = path.suffix.lower()
+                if name.startswith(".") or (suffix not in TEXT_SUFFIXES and suffix != PDF_SUFFIX):
+                    continue
+                stat = path.stat()
+                found[path.relative_to(self.corpus_dir).as_posix()] = [stat.st_mtime_ns, stat.st_size]
+        return found
+
+    @staticmethod
+    def _tombstone(manifest: dict, path: str) -> None:
+        record = manifest["files"].pop(path, None)
+        if record is None or record["segment"] is None:
+            return
+        for entry in manifest["segments"]:
+            if entry["name"] == record["segment"]:
+                file_index = entry["files"].index(path)
+                entry["deleted"].append(file_index)
+                passages, tokens = entry["docs_per_file"][file_index]
+                entry["live_passages"] -= passages
+                entry["live_tokens"] -= tokens
+
+    def _add_segment(self, manifest: dict, paths: list, found: dict) -> None:
+        name = f"seg{manifest['next_segment']:06d}"
+        postings, docs, text = {}, array("I"), bytearray()
+        files, docs_per_file = [], []
+        for path in sorted(paths):
+            passages = split_passages(read_document(self.corpus_dir / path), self.passage_words)
+            if not passages:
+                manifest["files"][path] = {"mtime_ns": found[path][0], "size": found[path][1], "segment": None}
+                continue
+            file_index = len(files)
+            file_tokens = 0
+            for passage in passages:
+                passage_id = len(docs) // 4
+                tokens = tokenize(passage)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((passage_id, tf))
+                encoded = passage.encode("utf-8")
+                docs.extend((file_index, len(text), len(encoded), len(tokens)))
+                text += encoded
+                file_tokens += len(tokens)
+            files.append(path)
+            docs_per_file.append([len(passages), file_tokens])
+            manifest["files"][path] = {"mtime_ns": found[path][0], "size": found[path][1], "segment": name}
+        if not files:
+            return
+
+        lexicon, flat = {}, array("I")
+        for term in sorted(postings):
+            lexicon[term] = [len(flat) // 2, len(postings[term])]
+            for passage_id, tf in postings[term]:
+                flat.extend((passage_id, tf))
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        (self.index_dir / f"{name}.lex").write_text(json.dumps(lexicon, separators=(",", ":")), encoding="utf-8")
+        (self.index_dir / f"{name}.post").write_bytes(flat.tobytes())
+        (self.index_dir / f"{name}.docs").write_bytes(docs.tobytes())
+        (self.index_dir / f"{name}.text").write_bytes(bytes(text))
+        manifest["next_segment"] += 1
+        manifest["segments"].append({
+            "name": name, "files": files, "docs_per_file": docs_per_file, "deleted": [],
+            "live_passages": len(docs) // 4, "live_tokens": sum(tokens for _, tokens in docs_per_file),
+        })
+
+    def _install(self, manifest: dict) -> None:
+        """Write the manifest atomically, then swap in the new segments and delete unused ones."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        temporary = self.index_dir / "manifest.json.tmp"
+        temporary.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(temporary, self.index_dir / "manifest.json")
+        current = self._state[1]
+        segments = {entry["name"]: current.get(entry["name"]) or _Segment(self.index_dir, entry["name"])
+                    for entry in manifest["segments"]}
+        # Searches already running keep the old mappings, which stay valid after the files are unlinked
+        self._state = (manifest, segments)
+        for path in self.index_dir.iterdir():
+            if path.name != "manifest.json" and path.stem not in segments:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _load_manifest(self) -> dict:
+        empty = {"version": INDEX_VERSION, "byteorder": sys.byteorder, "generation": 0, "next_segment": 0,
+                 "files": {}, "segments": []}
+        try:
+            manifest = json.loads((self.index_dir / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return empty
+        if manifest.get("version") != INDEX_VERSION or manifest.get("byteorder") != sys.byteorder:
+            print(f"Corpus index {self.index_dir} was written by another version, rebuilding")
+            return {**empty, "next_segment": manifest.get("next_segment", 0)}
+        return manifest
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_corpus_index(corpus_dir: str | Path, index_dir: str | Path | None = None,
+                     passage_words: int = DEFAULT_PASSAGE_WORDS) -> CorpusIndex:
+    """Return the process-wide index of corpus_dir, opening it on first use."""
+    key = str(Path(corpus_dir).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CorpusIndex(
+                corpus_dir,
+                index_dir=index_dir,
+                passage_words=passage_words,
+                reindex_interval=float(os.environ.get("CORPUS_REINDEX_INTERVAL", DEFAULT_REINDEX_INTERVAL_SECONDS)),
+            )
+        return index
@@ -0,0 +1,19 @@
+"""Where the process-wide SQLite stores keep their files by default.
+
+Checkpoints and the email outbox live in DEEP_RESEARCHER_DATA_DIR
+(~/.deep_researcher when it is unset), so interrupted runs and unsent
+emails survive a restart without any configuration. Their own variables,
+e.g. CHECKPOINT_DB, still name a file of their own, or ":memory:" to keep
+the store in memory.
+"""
+import os
+from pathlib import Path
+
+DEFAULT_DATA_DIR = "~/.deep_researcher"
+
+
+def data_path(filename: str) -> str:
+    """Path of filename in the data directory, which is created if it doesn't exist."""
+    directory = Path(os.environ.get("DEEP_RESEARCHER_DATA_DIR") or DEFAULT_DATA_DIR).expanduser()
+    directory.mkdir(parents=True, exist_ok=True)
+    return str(directory / filename)
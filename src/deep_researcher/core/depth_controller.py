@@ -0,0 +1,146 @@
+"""Budget-driven control of how many search rounds a research run performs.
+
+By default a run performs the searches its planner proposes in a single
+round, as it always has. A domain opts into deeper research by raising
+``max_rounds``: after each round a cheap gap check rates how well the
+results cover the query and proposes follow-up searches, and another round
+runs only while coverage is below target and the remaining wall-clock and
+token budget can pay for it, with a reserve kept back for the writer.
+
+Defaults come from DepthBudget, overridden by a domain's optional
+``depth`` section, overridden in turn by the caller for a single run:
+
+    "depth": {
+        "max_seconds": 120,          # wall-clock budget for the whole run, None for no limit
+        "max_tokens": 60000,         # model token budget for the whole run, None for no limit
+        "initial_searches": 3,       # first-round searches, None for as many as the planner proposes
+        "searches_per_round": 3,
+        "max_rounds": 3,             # 1 (the default) for no follow-up rounds
+        "coverage_target": 0.8,
+        "reserve_seconds": 30,       # kept back for writing the report
+        "reserve_tokens": 8000,
+    }
+"""
+import time
+from dataclasses import dataclass, fields, replace
+
+STOP_COVERAGE = "coverage"
+STOP_BUDGET = "budget"
+STOP_MAX_ROUNDS = "max_rounds"
+STOP_NO_GAPS = "no_new_searches"
+
+
+@dataclass(frozen=True)
+class DepthBudget:
+    max_seconds: float | None = None
+    max_tokens: int | None = None
+    initial_searches: int | None = None
+    searches_per_round: int = 3
+    max_rounds: int = 1
+    coverage_target: float = 0.8
+    reserve_seconds: float = 30.0
+    reserve_tokens: int = 8000
+
+    @classmethod
+    def from_config(cls, config: dict | None, **overrides) -> "DepthBudget":
+        """Build a budget from a domain's ``depth`` section plus per-run overrides (None values are ignored).
+
+        Raises ValueError on unknown keys.
+        """
+        unknown = sorted(set(config or {}) - {field.name for field in fields(cls)})
+        if unknown:
+            raise ValueError(f"Unknown depth setting(s): {', '.join(unknown)}")
+        budget = cls(**(config or {}))
+        return replace(budget, **{key: value for key, value in overrides.items() if value is not None})
+
+
+class DepthController:
+    """Tracks one run's spend against its DepthBudget and decides whether to search again."""
+
+    def __init__(self, budget: DepthBudget, tokens_used=lambda: 0):
+        self.budget = budget
+        self._tokens_used = tokens_used
+        self.started = time.monotonic()
+        self.rounds = 0
+        self.coverage = None
+        self.stop_reason = None
+        self._round_started = None
+        self._round_tokens_started = 0
+        self._round_size = 0
+        self._last_round_seconds = 0.0
+        self._last_round_tokens = 0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_seconds(self) -> float | None:
+        """Seconds left for searching, after the writer's reserve."""
+        if self.budget.max_seconds is None:
+            return None
+        return self.budget.max_seconds - self.budget.reserve_seconds - self.elapsed()
+
+    def remaining_tokens(self) -> int | None:
+        """Tokens left for searching, after the writer's reserve."""
+        if self.budget.max_tokens is None:
+            return None
+        return self.budget.max_tokens - self.budget.reserve_tokens - self._tokens_used()
+
+    def start_round(self, size: int) -> None:
+        self._round_size = size
+        self._round_started = time.monotonic()
+        self._round_tokens_started = self._tokens_used()
+
+    def end_round(self) -> None:
+        self.rounds += 1
+        self._last_round_seconds = time.monotonic() - self._round_started
+        self._last_round_tokens = self._tokens_used() - self._round_tokens_started
+
+    def can_afford_round(self) -> bool:
+        """Whether the remaining budget covers another round costing about as much as the last one."""
+        seconds, tokens = self.remaining_seconds(), self.remaining_tokens()
+        if seconds is not None and seconds < self._last_round_seconds:
+            return False
+        if tokens is not None and tokens < self._last_round_tokens:
+            return False
+        return True
+
+    def next_round_size(self, proposed: int) -> int:
+        """How many of the proposed follow-up searches the next round may run."""
+        size = min(proposed, self.budget.searches_per_round)
+        tokens = self.remaining_tokens()
+        if tokens is not None and self._last_round_tokens:
+            # Scale by what a single search cost in the last round
+            per_search = self._last_round_tokens / max(1, self._round_size)
+            size = min(size, int(tokens // max(1.0, per_search)))
+        return max(0, size)
+
+    def should_continue(self) -> bool:
+        """Decide whether to run a gap check and another round, recording why not."""
+        if self.rounds >= self.budget.max_rounds:
+            self.stop_reason = STOP_MAX_ROUNDS
+        elif not self.can_afford_round():
+            self.stop_reason = STOP_BUDGET
+        return self.stop_reason is None
+
+    def record_assessment(self, coverage: float, proposed: int) -> bool:
+        """Record a gap check; returns True if another round should run."""
+        self.coverage = min(1.0, max(0.0, coverage))
+        if self.coverage >= self.budget.coverage_target:
+            self.stop_reason = STOP_COVERAGE
+        elif proposed == 0:
+            self.stop_reason = STOP_NO_GAPS
+        elif not self.can_afford_round():
+            # The gap check itself may have used up the last of the budget
+            self.stop_reason = STOP_BUDGET
+        return self.stop_reason is None
+
+    def search_deadline(self) -> float | None:
+        """Seconds the next search round may take before the writer's reserve is at risk.
+
+        An overspent budget doesn't cut the first round short, so the writer
+        always has results to work with.
+        """
+        seconds = self.remaining_seconds()
+        if seconds is None or (seconds <= 0 and self.rounds == 0):
+            return None
+        return max(0.0, seconds)
@@ -1,28 +1,37 @@
 """Generic domain launcher for the modular research system."""
-import gradio as gr
+import os
 import sys
-import importlib
+from contextlib import aclosing
 from dotenv import load_dotenv
 from .research_manager import ResearchManager
-
-load_dotenv(override=True)
+from .domain_registry import get_domain_registry
+from .email_outbox import drain_before_exit
+from .metrics import start_metrics_server
+from .progress import ProgressView
 
 def load_domain_config(domain_name: str):
-    """Load domain configuration from the domains directory."""
-    try:
-        config_module = importlib.import_module(f'deep_researcher.domains.{domain_name}_config')
-        return config_module.DOMAIN_CONFIG
-    except ImportError:
-        raise ValueError(f"Domain configuration '{domain_name}_config' not found in domains/")
+    """Load domain configuration from the domain registry."""
+    return get_domain_registry().get(domain_name).config
 
-async def run_domain_research(query: str, domain_config: dict):
-    """Execute domain-specific research using the configuration."""
-    manager = ResearchManager(domain_config=domain_config)
-    async for chunk in manager.run(query):
-        yield chunk
+async def run_domain_research(query: str, domain_config: dict, refresh: bool = False):
+    """Execute domain-specific research, yielding Markdown that shows each search result as it arrives."""
+    # Use the registry's current version of the domain, so edits apply without a restart
+    try:
+        entry = get_domain_registry().get(domain_config['name'])
+        manager = ResearchManager(domain_config=entry.config, agents=entry.agents)
+    except ValueError:
+        manager = ResearchManager(domain_config=domain_config)
+    # Closing this generator (a Stop click or a closed tab) closes the run and cancels its work
+    view = ProgressView()
+    async with aclosing(manager.run_events(query, refresh=refresh)) as events:
+        async for event in events:
+            yield view.update(event)
 
 def create_domain_ui(domain_config: dict):
     """Create a Gradio UI based on domain configuration."""
+    # Imported here so headless callers of this module don't pay for loading Gradio
+    import gradio as gr
+
     ui_config = domain_config['ui']
     
     # Map theme colors to Gradio themes
@@ -50,6 +59,8 @@ def create_domain_ui(domain_config: dict):
                 )
             with gr.Column(scale=1):
                 search_btn = gr.Button(ui_config['button_text'], variant="primary", size="lg")
+                stop_btn = gr.Button("Stop", variant="stop")
+                refresh_input = gr.Checkbox(label="Refresh (ignore cached reports)", value=False)
         
         if ui_config.get('examples'):
             gr.Markdown("### 💡 Example Searches:")
@@ -63,21 +74,27 @@ def create_domain_ui(domain_config: dict):
             )
         
         # Create a properly wrapped async function for this domain
-        async def domain_search_fn(query: str):
-            async for chunk in run_domain_research(query, domain_config):
+        async def domain_search_fn(query: str, refresh: bool):
+            async for chunk in run_domain_research(query, domain_config, refresh):
                 yield chunk
         
-        search_btn.click(
+        search_event = search_btn.click(
             fn=domain_search_fn,
-            inputs=query_input,
+            inputs=[query_input, refresh_input],
             outputs=results_output
         )
         
-        query_input.submit(
+        submit_event = query_input.submit(
             fn=domain_search_fn,
-            inputs=query_input,
+            inputs=[query_input, refresh_input],
             outputs=results_output
         )
+        
+        # Cancelling the event closes the research generator, which cancels the run's in-flight work
+        stop_btn.click(fn=None, cancels=[search_event, submit_event])
+        # Resubmitting the other way replaces the running research instead of queueing behind it
+        search_btn.click(fn=None, cancels=[submit_event])
+        query_input.submit(fn=None, cancels=[search_event])
     
     return ui
 
@@ -85,16 +102,20 @@ def main():
     """Main entry point for domain launcher."""
     if len(sys.argv) != 2:
         print("Usage: python domain_launcher.py <domain_name>")
-        print("Available domains: cruise, job")
+        print(f"Available domains: {', '.join(get_domain_registry().names())}")
         sys.exit(1)
     
     domain_name = sys.argv[1]
+    load_dotenv(override=True)
     
     try:
         domain_config = load_domain_config(domain_name)
         ui = create_domain_ui(domain_config)
+        if os.environ.get('METRICS_PORT'):
+            start_metrics_server(int(os.environ['METRICS_PORT']))
         print(f"Launching {domain_config['display_name']}...")
         ui.launch(inbrowser=True)
+        drain_before_exit()
     except ValueError as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -0,0 +1,271 @@
+"""Registry of research domains with cached agents and hot reload.
+
+Domains come from two places:
+
+* ``deep_researcher.domains.<name>_config`` modules defining DOMAIN_CONFIG
+* ``<name>.toml`` / ``<name>.yaml`` files in the directory named by the
+  DOMAINS_DIR env var (a file overrides a module with the same name)
+
+Every config is validated when it is loaded, down to the keys of its
+optional sections, and its agents are built once, so resolving a domain
+per request is a dict lookup. Sources are re-scanned for changed
+modification times at most every DOMAIN_RELOAD_INTERVAL seconds, in a
+background thread: a lookup that finds a rescan due starts one and is
+served the current domains, so it never waits on imports or agent builds.
+A reload builds a new mapping and swaps it in with a single assignment;
+runs already holding an entry keep that snapshot.
+"""
+import importlib
+import os
+import pkgutil
+import threading
+import time
+import tomllib
+from dataclasses import dataclass
+from pathlib import Path
+
+from .depth_controller import DepthBudget
+from .model_router import parse_route
+from .prefetch import PrefetchSettings
+from .research_agents import ResearchAgents, build_research_agents
+from .resilience import ResiliencePolicy
+from .search_backends import validate_search_settings
+from .sectioned_writer import WriterSettings
+
+DOMAINS_PACKAGE = "deep_researcher.domains"
+DEFAULT_RELOAD_INTERVAL_SECONDS = 2.0
+
+REQUIRED_UI_KEYS = ("theme_color", "input_label", "input_placeholder", "button_text", "output_label")
+AGENT_NAMES = ("planner", "searcher", "writer", "email", "gap_checker", "outliner", "section_writer", "editor")
+OPTIONAL_SECTIONS = ("cache", "email", "context", "resilience", "depth", "models", "writer", "search",
+                     "prefetch")
+# Sections parsed into settings, which reject unknown keys and bad values themselves
+SECTION_SETTINGS = {"resilience": ResiliencePolicy, "depth": DepthBudget, "writer": WriterSettings,
+                    "prefetch": PrefetchSettings}
+# Keys of the sections read key by key
+SECTION_KEYS = {
+    "cache": ("search_ttl_seconds", "report_ttl_seconds", "similarity_threshold"),
+    "email": ("mode", "template", "footer", "subject_prefix"),
+    "context": ("token_budget", "duplicate_threshold"),
+    "search": ("backend", "corpus_dir", "index_dir", "top_k", "passage_words"),
+    "models": AGENT_NAMES,
+}
+EMAIL_MODES = ("local", "llm")
+
+
+def validate_domain_config(config, source: str) -> dict:
+    """Check a domain config against the expected schema, raising ValueError on the first problem."""
+    def fail(problem):
+        raise ValueError(f"Invalid domain config {source}: {problem}")
+
+    if not isinstance(config, dict):
+        fail("expected a mapping at the top level")
+    for key in ("name", "display_name", "description"):
+        if not isinstance(config.get(key), str) or not config[key]:
+            fail(f"'{key}' must be a non-empty string")
+
+    ui = config.get("ui")
+    if not isinstance(ui, dict):
+        fail("'ui' must be a mapping")
+    for key in REQUIRED_UI_KEYS:
+        if not isinstance(ui.get(key), str):
+            fail(f"'ui.{key}' must be a string")
+    examples = ui.get("examples", [])
+    if not isinstance(examples, list) or not all(isinstance(example, str) for example in examples):
+        fail("'ui.examples' must be a list of strings")
+
+    instructions = config.get("agent_instructions")
+    if not isinstance(instructions, dict):
+        fail("'agent_instructions' must be a mapping")
+    for agent, text in instructions.items():
+        if agent not in AGENT_NAMES:
+            fail(f"unknown agent '{agent}' in 'agent_instructions' (expected one of {', '.join(AGENT_NAMES)})")
+        if not isinstance(text, str) or not text.strip():
+            fail(f"'agent_instructions.{agent}' must be a non-empty string")
+
+    for section in OPTIONAL_SECTIONS:
+        if section in config and not isinstance(config[section], dict):
+            fail(f"'{section}' must be a mapping")
+    for section, keys in SECTION_KEYS.items():
+        for key in config.get(section, {}):
+            if key not in keys:
+                fail(f"unknown key '{key}' in '{section}' (expected one of {', '.join(keys)})")
+    for section, settings in SECTION_SETTINGS.items():
+        if section in config:
+            try:
+                settings.from_config(config[section])
+            except (TypeError, ValueError) as e:
+                fail(f"'{section}': {e}")
+    for key in ("search_ttl_seconds", "report_ttl_seconds", "similarity_threshold"):
+        value = config.get("cache", {}).get(key)
+        if value is not None and (not isinstance(value, (int, float)) or value < 0):
+            fail(f"'cache.{key}' must be a non-negative number")
+    if config.get("email", {}).get("mode", "local") not in EMAIL_MODES:
+        fail(f"'email.mode' must be one of {', '.join(EMAIL_MODES)}")
+    for stage, route in config.get("models", {}).items():
+        try:
+            parse_route(route)
+        except ValueError as e:
+            fail(f"'models.{stage}': {e}")
+    if "search" in config:
+        problem = validate_search_settings(config["search"])
+        if problem:
+            fail(problem)
+    return config
+
+
+def load_config_file(path: Path) -> dict:
+    """Parse a TOML or YAML domain file into a config dict."""
+    if path.suffix == ".toml":
+        with path.open("rb") as source:
+            config = tomllib.load(source)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"Cannot load {path}: install PyYAML to use YAML domain configs")
+        with path.open(encoding="utf-8") as source:
+            config = yaml.safe_load(source)
+    if isinstance(config, dict):
+        config.setdefault("name", path.stem)
+    return config
+
+
+@dataclass(frozen=True)
+class DomainEntry:
+    """A validated domain config together with the agents built for it."""
+    name: str
+    config: dict
+    agents: ResearchAgents
+    source: str
+    mtime: float
+
+
+class DomainRegistry:
+    """Discovers, validates and caches research domains, reloading changed sources."""
+
+    def __init__(self, config_dir: str | Path | None = None, package: str = DOMAINS_PACKAGE,
+                 reload_interval: float = DEFAULT_RELOAD_INTERVAL_SECONDS):
+        self.config_dir = Path(config_dir) if config_dir else None
+        self.package = package
+        self.reload_interval = reload_interval
+        self._domains: dict[str, DomainEntry] = {}
+        # (source, mtime) of sources that failed to load, so they aren't retried until they change
+        self._failed: dict[str, tuple] = {}
+        self._last_scan = None
+        self._lock = threading.Lock()
+        # Separate from _lock, which a rescan holds throughout, so starting one never waits on it
+        self._rescan_lock = threading.Lock()
+        self._rescanning = None
+
+    def get(self, name: str) -> DomainEntry:
+        """Return the current entry for a domain, raising ValueError if it doesn't exist."""
+        self._maybe_refresh()
+        entry = self._domains.get(name)
+        if entry is None:
+            raise ValueError(f"Domain configuration '{name}_config' not found in domains/")
+        return entry
+
+    def names(self) -> list[str]:
+        self._maybe_refresh()
+        return sorted(self._domains)
+
+    def entries(self) -> list[DomainEntry]:
+        self._maybe_refresh()
+        domains = self._domains
+        return [domains[name] for name in sorted(domains)]
+
+    def refresh(self) -> None:
+        """Rescan every source now and swap in any added, changed or removed domains."""
+        with self._lock:
+            current = self._domains
+            updated = {}
+            for name, source, mtime, load in self._discover():
+                previous = current.get(name)
+                if previous is not None and previous.source == source and previous.mtime == mtime:
+                    updated[name] = previous
+                    continue
+                if self._failed.get(name) == (source, mtime):
+                    if previous is not None:
+                        updated[name] = previous
+                    continue
+                try:
+                    config = validate_domain_config(load(), source)
+                    updated[name] = DomainEntry(name, config, build_research_agents(config), source, mtime)
+                    self._failed.pop(name, None)
+                    if previous is not None:
+                        print(f"Reloaded domain '{name}' from {source}")
+                except Exception as e:
+                    # Keep serving the last good version of a domain whose edit is broken
+                    print(f"Skipping domain '{name}' from {source}: {e}")
+                    self._failed[name] = (source, mtime)
+                    if previous is not None:
+                        updated[name] = previous
+            self._domains = updated
+            self._last_scan = time.monotonic()
+
+    def _maybe_refresh(self) -> None:
+        if self._last_scan is None:
+            # Nothing to serve yet, so the first scan is waited for
+            self.refresh()
+        elif self.reload_interval >= 0 and time.monotonic() - self._last_scan >= self.reload_interval:
+            with self._rescan_lock:
+                if self._rescanning is not None and self._rescanning.is_alive():
+                    return
+                self._rescanning = threading.Thread(target=self._rescan, name="domain-rescan", daemon=True)
+                self._rescanning.start()
+
+    def _rescan(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Rescanning domains failed: {type(e).__name__}: {e}")
+            # Retried after the reload interval rather than by the next lookup
+            self._last_scan = time.monotonic()
+
+    def _discover(self):
+        """Yield (name, source, mtime, load) for every domain source, files last so they override."""
+        importlib.invalidate_caches()
+        package = importlib.import_module(self.package)
+        found = {}
+        for module_info in pkgutil.iter_modules(package.__path__):
+            if module_info.ispkg or not module_info.name.endswith("_config"):
+                continue
+            path = Path(module_info.module_finder.path) / f"{module_info.name}.py"
+            module_name = f"{self.package}.{module_info.name}"
+            found[module_info.name[:-len("_config")]] = (
+                module_name, _mtime(path), lambda module_name=module_name: self._load_module(module_name),
+            )
+        if self.config_dir is not None and self.config_dir.is_dir():
+            for path in sorted(self.config_dir.iterdir()):
+                if path.suffix in (".toml", ".yaml", ".yml"):
+                    found[path.stem] = (str(path), _mtime(path), lambda path=path: load_config_file(path))
+        for name, (source, mtime, load) in found.items():
+            yield name, source, mtime, load
+
+    def _load_module(self, module_name: str) -> dict:
+        module = importlib.import_module(module_name)
+        if self._last_scan is not None:
+            module = importlib.reload(module)
+        return module.DOMAIN_CONFIG
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+_domain_registry = None
+
+
+def get_domain_registry() -> DomainRegistry:
+    """Return the process-wide domain registry, configured from the environment."""
+    global _domain_registry
+    if _domain_registry is None:
+        _domain_registry = DomainRegistry(
+            config_dir=os.environ.get("DOMAINS_DIR") or None,
+            reload_interval=float(os.environ.get("DOMAIN_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL_SECONDS)),
+        )
+    return _domain_registry
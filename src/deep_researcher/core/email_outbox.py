@@ -0,0 +1,360 @@
+"""Durable background outbox for report emails.
+
+enqueue() writes a message to a SQLite table and returns right away, so a
+run yields its report without waiting on the mail provider. A worker task
+on the event loop sends pending messages through one pooled HTTP client,
+posting SendGrid v3 mail/send requests to SENDGRID_API_URL (point it at
+benchmarks/email_sink.py to test delivery locally).
+
+Sends are rate limited to EMAIL_SENDS_PER_MINUTE. Rate limits, server
+errors and connection failures are retried with jittered backoff up to
+EMAIL_MAX_ATTEMPTS; other client errors fail the message at once. With
+EMAIL_DIGEST_SECONDS set, a message waits that long and is sent together
+with everything else queued for the same recipient in the meantime.
+
+The outbox lives in the file named by EMAIL_OUTBOX_DB, by default
+email_outbox.db in the data directory (see data_dir.py); ":memory:" keeps
+it in memory. Processes may share the file: each message is claimed by
+one sender, and one a stopped process left mid-send is sent again once
+its claim expires. Messages left pending are sent by the next process to
+use the file; UIs call drain_before_exit() when they are closed.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from .data_dir import data_path
+from .metrics import get_metrics_registry
+from .resilience import backoff_delay
+from .scheduler import TokenBucket
+
+DEFAULT_API_URL = "https://api.sendgrid.com/v3/mail/send"
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+# On top of the HTTP timeout, how long a claimed message may wait on the rate limit before its send
+CLAIM_MARGIN_SECONDS = 60.0
+# How long a closed UI waits for queued emails before exiting
+EXIT_DRAIN_SECONDS = 30.0
+
+_BODY = re.compile(r"<body[^>]*>(.*)</body>", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class _Batch:
+    """One outgoing email: a single message, or a recipient's digest of several."""
+    ids: list
+    sender: str | None
+    recipient: str
+    subject: str
+    html_body: str
+    attempts: int
+
+
+def digest_email(subjects: list[str], html_bodies: list[str]) -> tuple[str, str]:
+    """Combine several messages for one recipient into a single subject and HTML body."""
+    if len(subjects) == 1:
+        return subjects[0], html_bodies[0]
+    parts = []
+    for html_body in html_bodies:
+        match = _BODY.search(html_body)
+        parts.append(match.group(1) if match else html_body)
+    subject = f"Research digest ({len(subjects)} reports): {'; '.join(subjects)}"
+    if len(subject) > 150:
+        subject = subject[:147] + "..."
+    return subject, f"<html><body>{'<hr>'.join(parts)}</body></html>"
+
+
+def default_recipient() -> str | None:
+    """Where report emails go unless a recipient is given: TO_EMAIL, or None when it is unset."""
+    return os.environ.get("TO_EMAIL") or None
+
+
+class EmailOutbox:
+    """A persistent email queue drained by a rate-limited, retrying background sender."""
+
+    def __init__(self, db_path: str | None = None, api_url: str = DEFAULT_API_URL, api_key: str | None = None,
+                 sends_per_minute: float | None = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 digest_seconds: float = 0.0, backoff_base: float = 2.0, backoff_cap: float = 300.0,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.db_path = db_path or ":memory:"
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_attempts = max_attempts
+        self.digest_seconds = digest_seconds
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self._limiter = TokenBucket(sends_per_minute)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._worker = None
+        self._producers = set()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS email_outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, sender TEXT, recipient TEXT NOT NULL,"
+            " subject TEXT NOT NULL, html_body TEXT NOT NULL, status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,"
+            " created_at REAL NOT NULL, sent_at REAL, last_error TEXT);"
+            "CREATE INDEX IF NOT EXISTS email_outbox_due ON email_outbox (status, next_attempt_at);"
+        )
+        self._db.execute(
+            "DELETE FROM email_outbox WHERE status IN ('sent', 'failed') AND created_at < ?",
+            (time.time() - DEFAULT_RETENTION_SECONDS,),
+        )
+        self._db.commit()
+
+    def enqueue(self, subject: str, html_body: str, recipient: str | None = None,
+                sender: str | None = None) -> int | None:
+        """Queue a message for delivery and return its id; None when there is no recipient."""
+        recipient = recipient or default_recipient()
+        sender = sender or os.environ.get("FROM_EMAIL")
+        if not recipient:
+            print("No TO_EMAIL configured, email not queued")
+            return None
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO email_outbox (sender, recipient, subject, html_body, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                (sender, recipient, subject, html_body, now + self.digest_seconds, now),
+            )
+            self._db.commit()
+        print(f"Email queued for {recipient}: {subject}")
+        self._notify()
+        return cursor.lastrowid
+
+    def track(self, coro) -> asyncio.Task:
+        """Run coro, which composes and enqueues a message, in the background; drain() waits for it."""
+        task = asyncio.ensure_future(coro)
+        self._producers.add(task)
+        task.add_done_callback(self._producer_done)
+        return task
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall()
+        counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        counts.update(dict(rows))
+        counts["composing"] = len(self._producers)
+        return counts
+
+    async def drain(self, timeout: float | None = None) -> bool:
+        """Send everything queued now, skipping digest waits; False if messages remain after timeout."""
+        try:
+            async with asyncio.timeout(timeout):
+                # Messages still being composed on another loop, e.g. a closed UI's, can't be waited for
+                loop = asyncio.get_running_loop()
+                while producers := [task for task in self._producers if task.get_loop() is loop]:
+                    await asyncio.gather(*producers, return_exceptions=True)
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE email_outbox SET next_attempt_at = ? WHERE status = 'pending' AND attempts = 0",
+                        (time.time(),),
+                    )
+                    self._db.commit()
+                self._notify()
+                while True:
+                    stats = self.stats()
+                    if not stats["pending"] and not stats["sending"]:
+                        return True
+                    await asyncio.sleep(0.05)
+        except TimeoutError:
+            return False
+
+    def start(self) -> None:
+        """Start the worker on the running loop, e.g. to send what a previous process left queued."""
+        self._notify()
+
+    async def stop(self) -> None:
+        """Cancel the worker; unsent messages stay queued."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def _notify(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a thread (e.g. a sync tool); wake the worker on its own loop
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._wake.set)
+            return
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._worker = loop.create_task(self._work())
+        self._wake.set()
+
+    def _producer_done(self, task: asyncio.Task) -> None:
+        self._producers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            print(f"Composing email failed: {type(error).__name__}: {error}")
+            get_metrics_registry().inc("research_emails_total", result="failed")
+
+    async def _work(self) -> None:
+        limits = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        # A worker started later on another loop replaces self._wake; this one keeps the event of its own loop
+        wake = self._wake
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            while True:
+                # Cleared before looking, so a message queued meanwhile still wakes the next wait
+                wake.clear()
+                batch = self._claim()
+                if batch is None:
+                    try:
+                        async with asyncio.timeout(self._seconds_until_due()):
+                            await wake.wait()
+                    except TimeoutError:
+                        pass
+                    continue
+                await self._deliver(client, batch)
+
+    def _claim(self) -> _Batch | None:
+        """Mark the next due message, plus its recipient's other pending ones when digesting, as sending.
+
+        A message stays claimed until the send could have finished; after that a
+        process that stopped mid-send may or may not have delivered it, and
+        sending again is the safer side.
+        """
+        now = time.time()
+        with self._lock:
+            # Taken before reading, so two processes sharing the file can't claim the same message
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, sender, recipient FROM email_outbox"
+                    " WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?"
+                    " ORDER BY next_attempt_at, id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                message_id, sender, recipient = row
+                if self.digest_seconds > 0:
+                    rows = self._db.execute(
+                        "SELECT id, subject, html_body, attempts FROM email_outbox"
+                        " WHERE (status = 'pending' OR (status = 'sending' AND next_attempt_at <= ?))"
+                        " AND sender IS ? AND recipient = ? ORDER BY id",
+                        (now, sender, recipient),
+                    ).fetchall()
+                else:
+                    rows = self._db.execute(
+                        "SELECT id, subject, html_body, attempts FROM email_outbox WHERE id = ?", (message_id,)
+                    ).fetchall()
+                ids = [row[0] for row in rows]
+                self._db.execute(
+                    f"UPDATE email_outbox SET status = 'sending', next_attempt_at = ?"
+                    f" WHERE id IN ({','.join('?' * len(ids))})",
+                    (now + self.timeout + CLAIM_MARGIN_SECONDS, *ids),
+                )
+            finally:
+                self._db.commit()
+        subject, html_body = digest_email([row[1] for row in rows], [row[2] for row in rows])
+        return _Batch(ids, sender, recipient, subject, html_body, max(row[3] for row in rows))
+
+    def _seconds_until_due(self) -> float | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    async def _deliver(self, client: httpx.AsyncClient, batch: _Batch) -> None:
+        payload = {
+            "personalizations": [{"to": [{"email": batch.recipient}]}],
+            "from": {"email": batch.sender},
+            "subject": batch.subject,
+            "content": [{"type": "text/html", "value": batch.html_body}],
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            delay = self._limiter.delay_for(1)
+            if delay:
+                await asyncio.sleep(delay)
+            self._limiter.consume(1)
+            response = await client.post(self.api_url, json=payload, headers=headers)
+        except asyncio.CancelledError:
+            self._update(batch.ids, "pending", batch.attempts, next_attempt_at=time.time())
+            raise
+        except httpx.HTTPError as e:
+            error, retryable = f"{type(e).__name__}: {e}", True
+        else:
+            if response.is_success:
+                self._update(batch.ids, "sent", batch.attempts + 1, sent_at=time.time())
+                print(f"Email sent to {batch.recipient}: {batch.subject}")
+                get_metrics_registry().inc("research_emails_total", len(batch.ids), result="sent")
+                return
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if response.status_code == 429:
+                self._limiter.drain()
+
+        attempts = batch.attempts + 1
+        if retryable and attempts < self.max_attempts:
+            delay = backoff_delay(attempts, self.backoff_base, self.backoff_cap)
+            print(f"Email to {batch.recipient} failed ({error}), retrying in {delay:.1f}s")
+            self._update(batch.ids, "pending", attempts, next_attempt_at=time.time() + delay, error=error)
+            get_metrics_registry().inc("research_emails_total", len(batch.ids), result="retried")
+        else:
+            print(f"Email to {batch.recipient} failed after {attempts} attempts: {error}")
+            self._update(batch.ids, "failed", attempts, error=error)
+            get_metrics_registry().inc("research_emails_total", len(batch.ids), result="failed")
+
+    def _update(self, ids: list, status: str, attempts: int, next_attempt_at: float | None = None,
+                sent_at: float | None = None, error: str | None = None) -> None:
+        placeholders = ','.join('?' * len(ids))
+        with self._lock:
+            self._db.execute(
+                "UPDATE email_outbox SET status = ?, attempts = ?,"
+                " next_attempt_at = COALESCE(?, next_attempt_at), sent_at = ?, last_error = COALESCE(?, last_error)"
+                f" WHERE id IN ({placeholders})",
+                (status, attempts, next_attempt_at, sent_at, error, *ids),
+            )
+            self._db.commit()
+
+
+_email_outbox = None
+
+
+def get_email_outbox() -> EmailOutbox:
+    """Return the process-wide email outbox, configured from the environment."""
+    global _email_outbox
+    if _email_outbox is None:
+        per_minute = os.environ.get("EMAIL_SENDS_PER_MINUTE")
+        _email_outbox = EmailOutbox(
+            db_path=os.environ.get("EMAIL_OUTBOX_DB") or data_path("email_outbox.db"),
+            api_url=os.environ.get("SENDGRID_API_URL") or DEFAULT_API_URL,
+            api_key=os.environ.get("SENDGRID_API_KEY") or None,
+            sends_per_minute=float(per_minute) if per_minute else None,
+            max_attempts=int(os.environ.get("EMAIL_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+            digest_seconds=float(os.environ.get("EMAIL_DIGEST_SECONDS") or 0),
+        )
+    return _email_outbox
+
+
+def drain_before_exit(timeout: float = EXIT_DRAIN_SECONDS) -> None:
+    """Give queued emails up to timeout seconds to go out, e.g. once a Gradio UI has been closed."""
+    if _email_outbox is None:
+        return
+    stats = _email_outbox.stats()
+    if not (stats["pending"] or stats["sending"] or stats["composing"]):
+        return
+    print(f"Waiting for queued emails: {stats}")
+    if not asyncio.run(_email_outbox.drain(timeout=timeout)):
+        print(f"Unsent emails stay queued in {_email_outbox.db_path}: {_email_outbox.stats()}")
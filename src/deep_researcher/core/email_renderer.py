@@ -0,0 +1,228 @@
+"""Local Markdown-to-HTML rendering for report emails.
+
+Turns a ReportData into an email-safe HTML document (inline styles only,
+table-based layout) without a model round trip. Colors come from the
+domain's ``ui.theme_color`` and the surrounding template can be overridden
+per domain through ``DOMAIN_CONFIG['email']['template']``.
+"""
+import html
+import re
+from string import Template
+
+THEME_COLORS = {
+    'blue': '#2563eb',
+    'green': '#16a34a',
+    'orange': '#ea580c',
+    'red': '#dc2626',
+    'purple': '#9333ea',
+    'sky': '#0284c7',
+}
+DEFAULT_THEME_COLOR = '#2563eb'
+MAX_SUBJECT_LENGTH = 78
+
+DEFAULT_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1"><title>$title</title></head>
+<body style="margin:0;padding:0;background:#f4f5f7;">
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="background:#f4f5f7;">
+<tr><td align="center" style="padding:24px 12px;">
+<table role="presentation" width="640" cellpadding="0" cellspacing="0" style="max-width:640px;width:100%;background:#ffffff;border-radius:8px;">
+<tr><td style="background:$accent;color:#ffffff;padding:20px 28px;border-radius:8px 8px 0 0;font-family:Arial,Helvetica,sans-serif;font-size:20px;font-weight:bold;">$title</td></tr>
+<tr><td style="padding:20px 28px 0 28px;font-family:Arial,Helvetica,sans-serif;font-size:15px;line-height:1.5;color:#374151;border-left:4px solid $accent;"><em>$summary</em></td></tr>
+<tr><td style="padding:8px 28px 24px 28px;font-family:Arial,Helvetica,sans-serif;font-size:15px;line-height:1.6;color:#1f2937;">$body</td></tr>
+<tr><td style="padding:16px 28px;font-family:Arial,Helvetica,sans-serif;font-size:12px;color:#6b7280;border-top:1px solid #e5e7eb;">$footer</td></tr>
+</table>
+</td></tr>
+</table>
+</body>
+</html>
+""")
+
+_HEADING_SIZES = {1: 24, 2: 20, 3: 17, 4: 15, 5: 14, 6: 13}
+_TABLE_DIVIDER = re.compile(r'^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$')
+_LIST_ITEM = re.compile(r'^(\s*)([-*+]|\d+[.)])\s+(.*)$')
+_URL_SCHEME = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+# Link schemes rendered as links; anything else, e.g. javascript: or data:, is rendered as its text
+LINK_SCHEMES = {'http', 'https', 'mailto'}
+
+
+def render_email(report, domain_config: dict | None = None) -> tuple[str, str]:
+    """Return the (subject, html_body) for a report email."""
+    domain_config = domain_config or {}
+    email_config = domain_config.get('email', {})
+    accent = THEME_COLORS.get(domain_config.get('ui', {}).get('theme_color'), DEFAULT_THEME_COLOR)
+    title = domain_config.get('display_name', 'Deep Research')
+    template = Template(email_config['template']) if 'template' in email_config else DEFAULT_TEMPLATE
+    body = template.safe_substitute(
+        title=html.escape(title),
+        accent=accent,
+        summary=html.escape(report.short_summary),
+        body=render_markdown(report.markdown_report, accent),
+        footer=html.escape(email_config.get('footer', 'Generated by Deep Researcher')),
+    )
+    return make_subject(report.short_summary, email_config.get('subject_prefix', '')), body
+
+
+def make_subject(short_summary: str, prefix: str = '') -> str:
+    """Build a subject line from the first sentence of the report summary."""
+    sentence = re.split(r'(?<=[.!?])\s', short_summary.strip(), maxsplit=1)[0].rstrip('.')
+    subject = f"{prefix}{sentence}" if prefix else sentence
+    if len(subject) > MAX_SUBJECT_LENGTH:
+        subject = subject[:MAX_SUBJECT_LENGTH - 1].rsplit(' ', 1)[0] + '…'
+    return subject or 'Your research report'
+
+
+def render_markdown(markdown: str, accent: str = DEFAULT_THEME_COLOR) -> str:
+    """Convert the subset of Markdown the writer produces into inline-styled HTML."""
+    lines = markdown.replace('\r\n', '\n').split('\n')
+    out = []
+    paragraph = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            text = ' '.join(line.strip() for line in paragraph)
+            out.append(f'<p style="margin:0 0 12px 0;">{_inline(text, accent)}</p>')
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            flush_paragraph()
+            i += 1
+        elif stripped.startswith('```'):
+            flush_paragraph()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith('```'):
+                code.append(lines[i])
+                i += 1
+            i += 1
+            out.append(
+                '<pre style="background:#f3f4f6;padding:12px;border-radius:4px;font-size:13px;'
+                f'white-space:pre-wrap;font-family:Consolas,Menlo,monospace;">{html.escape(chr(10).join(code))}</pre>'
+            )
+        elif re.match(r'^#{1,6}\s', stripped):
+            flush_paragraph()
+            level = len(stripped) - len(stripped.lstrip('#'))
+            text = stripped[level:].strip().rstrip('#').strip()
+            border = f'border-bottom:2px solid {accent};padding-bottom:4px;' if level <= 2 else ''
+            out.append(
+                f'<h{level} style="margin:20px 0 10px 0;font-size:{_HEADING_SIZES[level]}px;color:#111827;{border}">'
+                f'{_inline(text, accent)}</h{level}>'
+            )
+            i += 1
+        elif re.match(r'^(-{3,}|\*{3,}|_{3,})$', stripped):
+            flush_paragraph()
+            out.append('<hr style="border:none;border-top:1px solid #e5e7eb;margin:20px 0;">')
+            i += 1
+        elif stripped.startswith('|') and i + 1 < len(lines) and _TABLE_DIVIDER.match(lines[i + 1].strip()):
+            flush_paragraph()
+            rows = [stripped]
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith('|'):
+                rows.append(lines[i].strip())
+                i += 1
+            out.append(_table(rows, accent))
+        elif stripped.startswith('>'):
+            flush_paragraph()
+            quote = []
+            while i < len(lines) and lines[i].strip().startswith('>'):
+                quote.append(lines[i].strip()[1:].strip())
+                i += 1
+            out.append(
+                f'<blockquote style="margin:0 0 12px 0;padding:8px 16px;border-left:4px solid {accent};'
+                f'color:#4b5563;background:#f9fafb;">{_inline(" ".join(quote), accent)}</blockquote>'
+            )
+        elif _LIST_ITEM.match(line):
+            flush_paragraph()
+            items = []
+            while i < len(lines) and (_LIST_ITEM.match(lines[i]) or (lines[i].startswith('  ') and items)):
+                match = _LIST_ITEM.match(lines[i])
+                if match:
+                    items.append((len(match.group(1)), match.group(2)[0].isdigit(), match.group(3)))
+                else:
+                    # Continuation line of the previous item
+                    depth, ordered, text = items[-1]
+                    items[-1] = (depth, ordered, f"{text} {lines[i].strip()}")
+                i += 1
+            out.append(_list(items, accent))
+        else:
+            paragraph.append(line)
+            i += 1
+
+    flush_paragraph()
+    return '\n'.join(out)
+
+
+def _inline(text: str, accent: str) -> str:
+    """Render inline Markdown (code, links, bold, italic) on escaped text."""
+    code_spans = []
+
+    def stash_code(match):
+        code_spans.append(
+            '<code style="background:#f3f4f6;padding:1px 4px;border-radius:3px;'
+            f'font-family:Consolas,Menlo,monospace;font-size:90%;">{html.escape(match.group(1))}</code>'
+        )
+        return f'\x00{len(code_spans) - 1}\x00'
+
+    text = re.sub(r'`([^`]+)`', stash_code, text)
+    text = html.escape(text, quote=False)
+
+    def link(match):
+        label, url = match.groups()
+        scheme = _URL_SCHEME.match(url)
+        if scheme is None or scheme.group(1).lower() not in LINK_SCHEMES:
+            return label
+        return f'<a href="{url.replace(chr(34), "%22")}" style="color:{accent};">{label}</a>'
+
+    text = re.sub(r'\[([^\]]+)\]\(([^)\s]+)\)', link, text)
+    text = re.sub(r'\*\*(.+?)\*\*|__(.+?)__', lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', text)
+    text = re.sub(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?!\w)', r'<em>\1</em>', text)
+    text = re.sub(r'(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?!\w)', r'<em>\1</em>', text)
+    return re.sub(r'\x00(\d+)\x00', lambda m: code_spans[int(m.group(1))], text)
+
+
+def _table(rows: list[str], accent: str) -> str:
+    def cells(row):
+        return [cell.strip() for cell in row.strip().strip('|').split('|')]
+
+    header, body = cells(rows[0]), [cells(row) for row in rows[1:]]
+    parts = ['<table role="presentation" cellpadding="0" cellspacing="0" '
+             'style="border-collapse:collapse;width:100%;margin:0 0 16px 0;font-size:14px;">', '<tr>']
+    for cell in header:
+        parts.append(f'<th style="background:{accent};color:#ffffff;text-align:left;padding:8px;'
+                     f'border:1px solid #e5e7eb;">{_inline(cell, accent)}</th>')
+    parts.append('</tr>')
+    for index, row in enumerate(body):
+        background = '#f9fafb' if index % 2 else '#ffffff'
+        parts.append(f'<tr style="background:{background};">')
+        for cell in row:
+            parts.append(f'<td style="padding:8px;border:1px solid #e5e7eb;vertical-align:top;">{_inline(cell, accent)}</td>')
+        parts.append('</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def _list(items: list[tuple], accent: str) -> str:
+    """Render (indent, ordered, text) items, nesting deeper indents under the previous item."""
+    parts = []
+    stack = []
+    for depth, ordered, text in items:
+        tag = 'ol' if ordered else 'ul'
+        while stack and depth < stack[-1][0]:
+            parts.append(f'</li></{stack.pop()[1]}>')
+        if stack and depth == stack[-1][0] and tag != stack[-1][1]:
+            # Switching between bullets and numbers at the same level starts a new list
+            parts.append(f'</li></{stack.pop()[1]}>')
+        if stack and depth == stack[-1][0]:
+            parts.append('</li>')
+        else:
+            parts.append(f'<{tag} style="margin:0 0 12px 0;padding-left:24px;">')
+            stack.append((depth, tag))
+        parts.append(f'<li style="margin:0 0 4px 0;">{_inline(text, accent)}')
+    while stack:
+        parts.append(f'</li></{stack.pop()[1]}>')
+    return ''.join(parts)
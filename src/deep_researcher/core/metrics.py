@@ -0,0 +1,284 @@
+"""Per-stage timing, token and cost accounting for research runs.
+
+Metrics are off unless METRICS_ENABLED is set. When off, ResearchManager
+records into a NullRunMetrics whose methods do nothing, so instrumented
+code paths cost a method call and nothing more.
+
+When on, every run aggregates into a process-wide MetricsRegistry, rendered
+in the Prometheus text format by the HTTP service's /metrics endpoint or by
+start_metrics_server() for the Gradio apps, and keeps its own RunMetrics
+whose summary() is a JSON-serializable record of that run.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# USD per million (input, output) tokens. Hosted web search tool fees are not included.
+MODEL_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4.1': (2.00, 8.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1-nano': (0.10, 0.40),
+    'o4-mini': (1.10, 4.40),
+    'gpt-5': (1.25, 10.00),
+    'gpt-5-mini': (0.25, 2.00),
+    'gpt-5-nano': (0.05, 0.40),
+}
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+METRIC_HELP = {
+    'research_runs_total': ('counter', 'Research runs by outcome'),
+    'research_stage_seconds': ('histogram', 'Wall time of pipeline stages'),
+    'research_model_call_seconds': ('histogram', 'Wall time of individual agent calls'),
+    'research_model_calls_total': ('counter', 'Agent calls by stage, model and outcome (ok, error or cancelled)'),
+    'research_tokens_total': ('counter', 'Model tokens used'),
+    'research_cost_usd_total': ('counter', 'Estimated model cost in USD'),
+    'research_cache_events_total': ('counter', 'Search and report cache hits and misses'),
+    'research_searches_dropped_total': ('counter', 'Searches that returned no summary'),
+    'research_search_failures_total': ('counter', 'Searches that failed after retries, by error'),
+    'research_retries_total': ('counter', 'Agent calls retried after a transient error'),
+    'research_search_hedges_total': ('counter', 'Hedged duplicate searches sent, by which copy answered first'),
+    'research_searches_abandoned_total': ('counter', 'Searches cancelled at the stage deadline or once a quorum finished'),
+    'research_depth_rounds_total': ('counter', 'Search rounds run by the depth controller'),
+    'research_depth_stops_total': ('counter', 'Runs by the reason the depth controller stopped searching'),
+    'research_model_fallbacks_total': ('counter', 'Calls moved to a fallback model after an error or timeout'),
+    'research_runs_resumed_total': ('counter', 'Runs resumed from the checkpoints of an interrupted run'),
+    'research_coalesced_total': ('counter', 'Runs and searches that joined an identical one already in flight'),
+    'research_report_sections_total': ('counter', 'Report sections written by the map-reduce writer, by result'),
+    'research_writer_fallbacks_total': ('counter', 'Map-reduce reports rewritten by the single writer after a section failed'),
+    'research_runs_stopped_total': ('counter', 'Callers that stopped following a run early, by reason (client or deadline)'),
+    'research_emails_total': ('counter', 'Outbox email deliveries by result (sent, retried or failed)'),
+    'research_prefetch_total': ('counter', 'Follow-up questions by prefetch result (prefetched, hit, wasted or skipped)'),
+    'research_prefetch_tokens_total': ('counter', 'Model tokens of prefetched follow-ups by result (spent, hit or wasted)'),
+    'research_context_tokens_saved_total': ('counter', 'Writer prompt tokens removed by the context packer'),
+    'research_context_paragraphs_dropped_total': ('counter', 'Search paragraphs dropped, by reason'),
+}
+
+
+def metrics_enabled() -> bool:
+    return os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+
+def model_prices() -> dict:
+    """Built-in price table, optionally extended through the MODEL_PRICES env var (JSON)."""
+    overrides = json.loads(os.environ.get('MODEL_PRICES') or '{}')
+    return {**MODEL_PRICES, **{model: tuple(prices) for model, prices in overrides.items()}}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, prices: dict | None = None) -> float:
+    """Estimated USD cost of a call, 0.0 for models missing from the price table."""
+    input_price, output_price = (prices or MODEL_PRICES).get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class MetricsRegistry:
+    """Thread-safe process-wide counters and histograms with Prometheus rendering."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(SECONDS_BUCKETS), 0, 0.0]
+            for index, bound in enumerate(SECONDS_BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self._histograms.items())
+        lines, described = [], set()
+
+        def describe(name):
+            if name not in described and name in METRIC_HELP:
+                kind, text = METRIC_HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), (buckets, count, total) in histograms:
+            describe(name)
+            for bound, bucket_count in zip(SECONDS_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class RunMetrics:
+    """Metrics for one research run, mirrored into the process-wide registry."""
+
+    enabled = True
+
+    def __init__(self, run_id: str, domain: str, registry: MetricsRegistry):
+        self.run_id = run_id
+        self.domain = domain
+        self.registry = registry
+        self.prices = model_prices()
+        self.started = time.time()
+        self.stages = []
+        self.model_calls = []
+        self.counters = {}
+        self.outcome = "running"
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Time a block as a pipeline stage (plan, search, write, ...)."""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.record_stage(stage, time.perf_counter() - started, outcome, **attributes)
+
+    def record_stage(self, stage: str, seconds: float, outcome: str = "ok", **attributes) -> None:
+        """Record a stage duration measured by the caller, e.g. time to first report token."""
+        self.stages.append({"stage": stage, "seconds": round(seconds, 4), "outcome": outcome, **attributes})
+        self.registry.observe('research_stage_seconds', seconds, stage=stage, domain=self.domain)
+
+    def record_model_call(self, stage: str, model: str, seconds: float, usage=None, error: str | None = None) -> None:
+        """Record latency, tokens and estimated cost of one agent call."""
+        input_tokens = getattr(usage, 'input_tokens', 0) or 0
+        output_tokens = getattr(usage, 'output_tokens', 0) or 0
+        cost = estimate_cost(model, input_tokens, output_tokens, self.prices)
+        self.model_calls.append({
+            "stage": stage, "model": model, "seconds": round(seconds, 4),
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "cost_usd": round(cost, 6), "error": error,
+        })
+        labels = {"stage": stage, "model": model, "domain": self.domain}
+        outcome = "cancelled" if error == "CancelledError" else "error" if error else "ok"
+        self.registry.inc('research_model_calls_total', outcome=outcome, **labels)
+        self.registry.observe('research_model_call_seconds', seconds, **labels)
+        if input_tokens or output_tokens:
+            self.registry.inc('research_tokens_total', input_tokens, direction="input", **labels)
+            self.registry.inc('research_tokens_total', output_tokens, direction="output", **labels)
+            self.registry.inc('research_cost_usd_total', cost, **labels)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a run counter, mirrored as a registry counter labelled with the domain."""
+        key = name if not labels else f"{name}[{','.join(f'{k}={v}' for k, v in sorted(labels.items()))}]"
+        self.counters[key] = self.counters.get(key, 0) + value
+        self.registry.inc(name, value, domain=self.domain, **labels)
+
+    def finish(self, outcome: str) -> dict:
+        """Close the run, count its outcome and return the summary."""
+        self.registry.inc('research_runs_total', outcome=outcome, domain=self.domain)
+        self.outcome = outcome
+        return self.summary()
+
+    def summary(self) -> dict:
+        input_tokens = sum(call["input_tokens"] for call in self.model_calls)
+        output_tokens = sum(call["output_tokens"] for call in self.model_calls)
+        return {
+            "run_id": self.run_id,
+            "domain": self.domain,
+            "outcome": self.outcome,
+            "seconds": round(time.time() - self.started, 4),
+            "stages": self.stages,
+            "model_calls": self.model_calls,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": round(sum(call["cost_usd"] for call in self.model_calls), 6),
+            "counters": self.counters,
+        }
+
+
+class NullRunMetrics:
+    """Stand-in used when metrics are disabled; every method is a no-op."""
+
+    enabled = False
+
+    def __init__(self, run_id: str = "", domain: str = ""):
+        self.run_id = run_id
+        self.domain = domain
+
+    def span(self, stage: str, **attributes):
+        return nullcontext()
+
+    def record_stage(self, stage, seconds, outcome="ok", **attributes) -> None:
+        pass
+
+    def record_model_call(self, stage, model, seconds, usage=None, error=None) -> None:
+        pass
+
+    def count(self, name, value=1, **labels) -> None:
+        pass
+
+    def finish(self, outcome: str) -> dict:
+        return {}
+
+    def summary(self) -> dict:
+        return {}
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def new_run_metrics(run_id: str, domain: str):
+    """Return RunMetrics when metrics are enabled, otherwise a NullRunMetrics."""
+    if metrics_enabled():
+        return RunMetrics(run_id, domain, _registry)
+    return NullRunMetrics(run_id, domain)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread, for processes without their own HTTP API."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = _registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,148 @@
+"""Per-stage model routing with live health tracking and fallback.
+
+Each pipeline stage (planner, searcher, writer, gap_checker, email, and
+the map-reduce writer's outliner, section_writer and editor) is routed to
+an ordered list of models, taken from a domain's optional ``models``
+section, else the MODEL_ROUTES env var (JSON), else the agent's own model.
+A route is a model name, a list of models (first is preferred) or a dict:
+
+    "models": {
+        "searcher": ["gpt-4.1-mini", "gpt-4o-mini"],
+        "writer": {
+            "models": ["gpt-4.1", "gpt-4o"],
+            "timeout_seconds": 90,       # fall over to the next model after this long
+            "max_p95_seconds": 60,       # demote a model whose recent p95 is slower
+        },
+    }
+
+The router keeps a rolling window of latencies and errors per model,
+shared by every run in the process. A model whose error rate crosses the
+threshold is skipped for a cooldown, and one whose p95 latency breaks its
+route's limit is tried after the healthy ones. A call that fails with a
+retryable error or times out moves on to the next model.
+"""
+import json
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+
+DEFAULT_ERROR_THRESHOLD = 0.5
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class Route:
+    models: tuple
+    timeout_seconds: float | None = None
+    max_p95_seconds: float | None = None
+
+
+def parse_route(value) -> Route | None:
+    """Normalize a route given as a model name, list of names or dict."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return Route((value,))
+    if isinstance(value, (list, tuple)):
+        return Route(tuple(value)) if value else None
+    if isinstance(value, dict) and value.get("models"):
+        models = value["models"]
+        return Route(
+            (models,) if isinstance(models, str) else tuple(models),
+            timeout_seconds=value.get("timeout_seconds"),
+            max_p95_seconds=value.get("max_p95_seconds"),
+        )
+    raise ValueError(f"Invalid model route: {value!r}")
+
+
+class ModelHealth:
+    """Rolling latency and error window for one model."""
+
+    def __init__(self, window: int = 50):
+        self.samples = deque(maxlen=window)
+        self.open_until = 0.0
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def p95(self) -> float | None:
+        latencies = sorted(seconds for seconds, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)]
+
+
+class ModelRouter:
+    """Chooses models for pipeline stages and tracks how each model is doing."""
+
+    def __init__(self, default_routes: dict | None = None, error_threshold: float = DEFAULT_ERROR_THRESHOLD,
+                 min_samples: int = DEFAULT_MIN_SAMPLES, cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS):
+        self.default_routes = default_routes or {}
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self._health: dict[str, ModelHealth] = {}
+
+    def route(self, stage: str, domain_config: dict | None, default_model) -> Route:
+        """The configured route for a stage: domain, then process defaults, then the agent's model."""
+        domain_routes = (domain_config or {}).get("models", {})
+        route = parse_route(domain_routes.get(stage)) or parse_route(self.default_routes.get(stage))
+        return route or Route((default_model,))
+
+    def candidates(self, route: Route) -> list:
+        """Models to try in order: healthy first, then slow ones, then ones in cooldown as a last resort."""
+        now = time.monotonic()
+        healthy, slow, cooling = [], [], []
+        for model in route.models:
+            health = self._health.get(str(model))
+            if health is None:
+                healthy.append(model)
+            elif health.open_until > now:
+                cooling.append(model)
+            elif (route.max_p95_seconds is not None and len(health.samples) >= self.min_samples
+                  and (health.p95() or 0.0) > route.max_p95_seconds):
+                slow.append(model)
+            else:
+                healthy.append(model)
+        return healthy + slow + cooling
+
+    def record(self, model, seconds: float, ok: bool) -> None:
+        """Record one call; too many recent errors put the model into cooldown."""
+        health = self._health.setdefault(str(model), ModelHealth())
+        health.samples.append((seconds, ok))
+        if (not ok and len(health.samples) >= self.min_samples
+                and health.error_rate() >= self.error_threshold):
+            health.open_until = time.monotonic() + self.cooldown_seconds
+            print(f"Model {model} error rate {health.error_rate():.0%}, skipping it for {self.cooldown_seconds:.0f}s")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            model: {
+                "calls": len(health.samples),
+                "error_rate": round(health.error_rate(), 3),
+                "p95_seconds": round(health.p95(), 3) if health.p95() is not None else None,
+                "cooling_down": health.open_until > now,
+            }
+            for model, health in self._health.items()
+        }
+
+
+_model_router = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router, configured from the environment."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter(
+            default_routes=json.loads(os.environ.get("MODEL_ROUTES") or "{}"),
+            error_threshold=float(os.environ.get("MODEL_ROUTER_ERROR_THRESHOLD", DEFAULT_ERROR_THRESHOLD)),
+            cooldown_seconds=float(os.environ.get("MODEL_ROUTER_COOLDOWN_SECONDS", DEFAULT_COOLDOWN_SECONDS)),
+        )
+    return _model_router
@@ -0,0 +1,164 @@
+"""Speculative background research of a report's follow-up questions.
+
+After a run writes its report, its first few follow-up questions are
+researched in the background by ResearchManager.prefetch(): planned,
+searched and, unless write_reports is off, written up. Every model call
+runs at Priority.BACKGROUND, so live runs always go first, and reserves
+its estimated tokens against the run's max_tokens, so a prefetch never
+starts a call its budget can't cover. Results land in the search and
+report caches, and each question is left behind as a resumable checkpoint,
+so asking it later returns the cached report or resumes with the plan and
+searches already done. Prefetch searches only coalesce with other prefetch
+searches, so a live run never waits on one, and prefetches stay out of the
+run metrics, e.g. research_runs_total and the stage latencies.
+
+The Prefetcher tracks every prefetched question until it is asked (a hit)
+or its checkpoint ages out unused (wasted), counting both along with the
+tokens they cost in research_prefetch_total and
+research_prefetch_tokens_total, which show whether prefetching pays for
+itself. At most PREFETCH_MAX_CONCURRENT runs prefetch at once; further
+runs skip it.
+
+Enabled per domain through the optional ``prefetch`` section:
+
+    "prefetch": {
+        "enabled": True,
+        "questions": 2,                  # follow-up questions researched per run
+        "searches_per_question": 3,
+        "max_tokens": 30000,             # shared by all of a run's prefetched questions
+        "write_reports": True,           # False stops after the searches
+    }
+"""
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
+
+from .metrics import get_metrics_registry
+
+DEFAULT_MAX_CONCURRENT = 2
+MAX_TRACKED = 1024
+
+
+class PrefetchBudgetExceeded(Exception):
+    """A prefetch call was refused because it could exceed the prefetch's token budget."""
+
+
+@dataclass(frozen=True)
+class PrefetchSettings:
+    enabled: bool = False
+    questions: int = 2
+    searches_per_question: int = 3
+    max_tokens: int = 30000
+    write_reports: bool = True
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "PrefetchSettings":
+        """Build settings from a domain's ``prefetch`` section, raising ValueError on unknown keys."""
+        unknown = sorted(set(config or {}) - {field.name for field in fields(cls)})
+        if unknown:
+            raise ValueError(f"Unknown prefetch setting(s): {', '.join(unknown)}")
+        return cls(**(config or {}))
+
+
+@dataclass
+class _Prefetched:
+    run_id: str
+    report: object
+    tokens: int
+    expires_at: float
+
+
+class Prefetcher:
+    """Runs prefetches in the background and tracks whether their results get used."""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self._tasks = set()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def submit(self, make_coro) -> bool:
+        """Start make_coro() in the background, unless max_concurrent prefetches are already running."""
+        if len(self._tasks) >= self.max_concurrent:
+            get_metrics_registry().inc("research_prefetch_total", result="skipped")
+            return False
+        task = asyncio.ensure_future(make_coro())
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return True
+
+    def skip(self) -> None:
+        """Count a follow-up question that needed no prefetch, e.g. one already cached."""
+        get_metrics_registry().inc("research_prefetch_total", result="skipped")
+
+    def record(self, run_id: str, report, tokens: int, ttl: float) -> None:
+        """Track a prefetched question, left as checkpoint run_id and optionally a cached report."""
+        registry = get_metrics_registry()
+        registry.inc("research_prefetch_total", result="prefetched")
+        registry.inc("research_prefetch_tokens_total", tokens, result="spent")
+        with self._lock:
+            self._sweep(time.time())
+            while len(self._entries) >= MAX_TRACKED:
+                self._expire(next(iter(self._entries)))
+            self._entries[run_id] = _Prefetched(run_id, report, tokens, time.time() + ttl)
+
+    def claim_run(self, run_id: str) -> bool:
+        """Count a hit if run_id, a checkpoint being resumed, was prefetched."""
+        with self._lock:
+            self._sweep(time.time())
+            entry = self._entries.pop(run_id, None)
+        return self._hit(entry)
+
+    def claim_report(self, report) -> bool:
+        """Count a hit if report, served from the report cache, was prefetched."""
+        with self._lock:
+            self._sweep(time.time())
+            # The report cache hands out copies, so match by value
+            entry = next((entry for entry in self._entries.values()
+                          if entry.report is not None and entry.report == report), None)
+            if entry is not None:
+                del self._entries[entry.run_id]
+        return self._hit(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sweep(time.time())
+            return {"running": len(self._tasks), "tracked": len(self._entries)}
+
+    def _hit(self, entry: _Prefetched | None) -> bool:
+        if entry is None:
+            return False
+        print(f"Prefetched research used ({entry.tokens} tokens)")
+        registry = get_metrics_registry()
+        registry.inc("research_prefetch_total", result="hit")
+        registry.inc("research_prefetch_tokens_total", entry.tokens, result="hit")
+        return True
+
+    def _sweep(self, now: float) -> None:
+        for run_id in [run_id for run_id, entry in self._entries.items() if entry.expires_at <= now]:
+            self._expire(run_id)
+
+    def _expire(self, run_id: str) -> None:
+        entry = self._entries.pop(run_id)
+        registry = get_metrics_registry()
+        registry.inc("research_prefetch_total", result="wasted")
+        registry.inc("research_prefetch_tokens_total", entry.tokens, result="wasted")
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            print(f"Prefetch failed: {type(error).__name__}: {error}")
+
+
+_prefetcher = None
+
+
+def get_prefetcher() -> Prefetcher:
+    """Return the process-wide prefetcher, configured from the environment."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher(int(os.environ.get("PREFETCH_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT)))
+    return _prefetcher
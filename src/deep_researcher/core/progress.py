@@ -0,0 +1,192 @@
+"""Typed progress events of a research run, and their renderings.
+
+ResearchManager.run_events() yields these instead of strings, so consumers
+can react to individual stages without parsing messages: the plan, every
+search as it starts and finishes, the growing report and the email, queued
+or skipped. ResearchManager.run() maps them back to the plain status
+strings through progress_text(), and ProgressView renders them as a
+Markdown panel that shows each search summary as soon as it arrives.
+"""
+from contextlib import aclosing
+from dataclasses import dataclass, field
+
+from ..agents.planner_agent import WebSearchItem
+from ..agents.writer_agent import ReportData
+
+# Where a finished search's summary came from
+SOURCE_SEARCH = "search"
+SOURCE_CACHE = "cache"
+SOURCE_CHECKPOINT = "checkpoint"
+SOURCE_COALESCED = "coalesced"
+
+
+@dataclass(frozen=True)
+class StatusUpdate:
+    message: str
+
+    @property
+    def text(self) -> str | None:
+        return self.message
+
+
+@dataclass(frozen=True)
+class PlanReady:
+    searches: tuple[WebSearchItem, ...]
+
+    @property
+    def text(self) -> str | None:
+        return "Searches planned, starting to search..."
+
+
+@dataclass(frozen=True)
+class SearchStarted:
+    query: str
+    reason: str
+
+    @property
+    def text(self) -> str | None:
+        return None
+
+
+@dataclass(frozen=True)
+class SearchCompleted:
+    query: str
+    summary: str
+    seconds: float
+    source: str = SOURCE_SEARCH
+
+    @property
+    def text(self) -> str | None:
+        return None
+
+
+@dataclass(frozen=True)
+class SearchFailed:
+    query: str
+    error: str
+    seconds: float
+
+    @property
+    def text(self) -> str | None:
+        return None
+
+
+@dataclass(frozen=True)
+class ReportProgress:
+    """The report's markdown so far, while it is being written."""
+    markdown: str
+
+    @property
+    def text(self) -> str | None:
+        return self.markdown
+
+
+@dataclass(frozen=True)
+class ReportReady:
+    report: ReportData
+    cached: bool = False
+
+    @property
+    def text(self) -> str | None:
+        return self.report.markdown_report
+
+
+@dataclass(frozen=True)
+class EmailQueued:
+    report: ReportData
+
+    @property
+    def text(self) -> str | None:
+        return f"{self.report.markdown_report}\n\n---\n*Report written, email queued for delivery*"
+
+
+@dataclass(frozen=True)
+class EmailSkipped:
+    report: ReportData
+    reason: str
+
+    @property
+    def text(self) -> str | None:
+        return f"{self.report.markdown_report}\n\n---\n*Report written, email not sent: {self.reason}*"
+
+
+async def progress_text(events):
+    """Adapt a stream of progress events to the plain status strings run() has always yielded."""
+    async with aclosing(events):
+        async for event in events:
+            if event.text is not None:
+                yield event.text
+
+
+@dataclass
+class _SearchRow:
+    query: str
+    status: str = "running"
+    summary: str = ""
+    seconds: float = 0.0
+    note: str = ""
+
+
+@dataclass
+class ProgressView:
+    """Renders progress events as one Markdown document, updated in place."""
+    status: str = ""
+    searches: dict = field(default_factory=dict)
+    report: str = ""
+    final: str | None = None
+
+    def update(self, event) -> str:
+        """Apply an event and return the Markdown to display."""
+        if isinstance(event, StatusUpdate):
+            self.status = event.message
+        elif isinstance(event, PlanReady):
+            self.status = f"Searching {len(event.searches)} sources..."
+            for item in event.searches:
+                self.searches.setdefault(item.query, _SearchRow(item.query, status="planned"))
+        elif isinstance(event, SearchStarted):
+            self.searches[event.query] = _SearchRow(event.query)
+        elif isinstance(event, SearchCompleted):
+            note = "" if event.source == SOURCE_SEARCH else event.source
+            self.searches[event.query] = _SearchRow(event.query, "done", event.summary, event.seconds, note)
+        elif isinstance(event, SearchFailed):
+            self.searches[event.query] = _SearchRow(event.query, "failed", seconds=event.seconds, note=event.error)
+        elif isinstance(event, ReportProgress):
+            self.status = "Writing report..."
+            self.report = event.markdown
+        elif isinstance(event, EmailQueued):
+            self.status = "Report written, email queued for delivery"
+            self.report = event.report.markdown_report
+        elif isinstance(event, EmailSkipped):
+            self.status = f"Report written, email not sent: {event.reason}"
+            self.report = event.report.markdown_report
+        elif isinstance(event, ReportReady):
+            self.final = event.report.markdown_report
+        return self.render()
+
+    def render(self) -> str:
+        if self.final is not None:
+            return self.final
+        parts = [f"*{self.status}*"] if self.status else []
+        if self.report:
+            parts.append(self.report)
+        if self.searches:
+            done = sum(1 for row in self.searches.values() if row.status == "done")
+            rows = "\n\n".join(self._render_search(row) for row in self.searches.values())
+            if self.report:
+                # Keep the finished searches out of the way once the report is being written
+                rows = f"<details><summary>{done} search results</summary>\n\n{rows}\n\n</details>"
+            else:
+                rows = f"### Search results ({done}/{len(self.searches)})\n\n{rows}"
+            parts.append(rows)
+        return "\n\n---\n\n".join(parts)
+
+    @staticmethod
+    def _render_search(row: _SearchRow) -> str:
+        if row.status == "done":
+            note = f", {row.note}" if row.note else ""
+            return f"**✅ {row.query}** ({row.seconds:.1f}s{note})\n\n{row.summary}"
+        if row.status == "failed":
+            return f"**⚠️ {row.query}** failed ({row.note})"
+        if row.status == "planned":
+            return f"**🕓 {row.query}**"
+        return f"**⏳ {row.query}** searching..."
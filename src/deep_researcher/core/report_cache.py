@@ -0,0 +1,221 @@
+"""Cache of finished reports for repeat and near-repeat queries.
+
+Lookups go through two tiers per domain: an exact match on the normalized
+query text, then a character n-gram TF-IDF similarity search over the
+cached queries. A similar query is only served a cached report when both
+have the same content words, allowing for plurals and small typos in
+longer words, so "junior" never matches "senior". Numbers (prices,
+dates, durations) must match exactly, however similar the rest of the
+text is.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+DEFAULT_REPORT_TTL_SECONDS = 24 * 3600
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+NGRAM_SIZES = (3, 4, 5)
+
+_SYMBOLS = {'<': ' under ', '>': ' over ', '&': ' and ', '+': ' plus '}
+_TOKEN = re.compile(r"[a-z0-9$]+(?:[.,][0-9]+)*")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_STOPWORDS = frozenset("a an the in on at for of to with and or from by is are i me my want looking".split())
+# Edits tolerated between two content words of at least this many characters
+_TYPO_EDITS = ((9, 2), (5, 1))
+
+
+def normalize_report_query(query: str) -> str:
+    """Reduce a query to its content words so trivial rephrasings compare equal."""
+    text = query.lower()
+    for symbol, word in _SYMBOLS.items():
+        text = text.replace(symbol, word)
+    return " ".join(token for token in _TOKEN.findall(text) if token not in _STOPWORDS)
+
+
+def _ngrams(normalized: str) -> Counter:
+    grams = Counter()
+    for word in normalized.split():
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                grams[padded[i:i + size]] += 1
+    return grams
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance between a and b counting an adjacent swap as one edit, capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _same_word(a: str, b: str) -> bool:
+    if _singular(a) == _singular(b):
+        return True
+    if _NUMBER.search(a) or _NUMBER.search(b):
+        return False
+    for length, edits in _TYPO_EDITS:
+        if min(len(a), len(b)) >= length:
+            return _edit_distance(a, b, edits) <= edits
+    return False
+
+
+def _same_content_words(words: frozenset, other: frozenset) -> bool:
+    """Whether every content word of each query has a counterpart in the other, up to typos."""
+    return (all(any(_same_word(word, candidate) for candidate in other) for word in words - other)
+            and all(any(_same_word(word, candidate) for candidate in words) for word in other - words))
+
+
+class _Entry:
+    def __init__(self, domain: str, normalized: str, report, created_at: float):
+        self.domain = domain
+        self.normalized = normalized
+        self.report = report
+        self.created_at = created_at
+        self.ngrams = _ngrams(normalized)
+        self.numbers = frozenset(_NUMBER.findall(normalized))
+        self.words = frozenset(normalized.split())
+
+
+class ReportCache:
+    """Size-bounded, per-domain report cache with exact and similarity lookup."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()      # (domain, normalized query) -> _Entry, in LRU order
+        self._postings = {}                # domain -> n-gram -> set of normalized queries
+        self._document_frequency = {}      # domain -> Counter of n-gram document frequencies
+        self._domain_sizes = Counter()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get(self, domain: str, query: str, max_age: float = DEFAULT_REPORT_TTL_SECONDS,
+            threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        """Return a cached ReportData for the query, or None."""
+        normalized = normalize_report_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((domain, normalized))
+            if entry is not None and now - entry.created_at <= max_age:
+                self._entries.move_to_end((domain, normalized))
+                self.exact_hits += 1
+                return entry.report.model_copy()
+
+            entry = self._most_similar(domain, normalized, now, max_age, threshold)
+            if entry is not None:
+                self._entries.move_to_end((domain, entry.normalized))
+                self.similar_hits += 1
+                print(f"Report cache: '{query}' matched cached query '{entry.normalized}'")
+                return entry.report.model_copy()
+
+            self.misses += 1
+            return None
+
+    def set(self, domain: str, query: str, report) -> None:
+        """Store the report for the query, evicting the least recently used entries if full."""
+        normalized = normalize_report_query(query)
+        with self._lock:
+            self._remove((domain, normalized))
+            entry = _Entry(domain, normalized, report.model_copy(), time.time())
+            self._entries[(domain, normalized)] = entry
+            self._domain_sizes[domain] += 1
+            postings = self._postings.setdefault(domain, {})
+            document_frequency = self._document_frequency.setdefault(domain, Counter())
+            for gram in entry.ngrams:
+                postings.setdefault(gram, set()).add(normalized)
+                document_frequency[gram] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, domain: str, query: str) -> None:
+        """Forget the cached report for exactly this query."""
+        with self._lock:
+            self._remove((domain, normalize_report_query(query)))
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _most_similar(self, domain: str, normalized: str, now: float, max_age: float, threshold: float):
+        postings = self._postings.get(domain)
+        if not postings or not normalized:
+            return None
+        query_grams = _ngrams(normalized)
+        query_numbers = frozenset(_NUMBER.findall(normalized))
+        query_words = frozenset(normalized.split())
+        document_frequency = self._document_frequency[domain]
+        documents = self._domain_sizes[domain] + 1
+
+        def idf(gram):
+            return math.log((1 + documents) / (1 + document_frequency.get(gram, 0))) + 1
+
+        query_vector = {gram: count * idf(gram) for gram, count in query_grams.items()}
+        query_norm = math.sqrt(sum(weight * weight for weight in query_vector.values()))
+
+        candidates = set()
+        for gram in query_grams:
+            candidates.update(postings.get(gram, ()))
+
+        best, best_score = None, threshold
+        for candidate in candidates:
+            entry = self._entries[(domain, candidate)]
+            if now - entry.created_at > max_age or entry.numbers != query_numbers:
+                continue
+            dot = sum(weight * entry.ngrams.get(gram, 0) * idf(gram) for gram, weight in query_vector.items())
+            norm = math.sqrt(sum((count * idf(gram)) ** 2 for gram, count in entry.ngrams.items()))
+            score = dot / (query_norm * norm) if norm else 0.0
+            if score >= best_score and _same_content_words(query_words, entry.words):
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._domain_sizes[entry.domain] -= 1
+        postings = self._postings[entry.domain]
+        document_frequency = self._document_frequency[entry.domain]
+        for gram in entry.ngrams:
+            postings[gram].discard(entry.normalized)
+            if not postings[gram]:
+                del postings[gram]
+            document_frequency[gram] -= 1
+            if not document_frequency[gram]:
+                del document_frequency[gram]
+
+
+_report_cache = None
+
+
+def get_report_cache() -> ReportCache:
+    """Return the process-wide report cache, configured from the environment."""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(max_entries=int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", "256")))
+    return _report_cache
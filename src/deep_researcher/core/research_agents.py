@@ -0,0 +1,78 @@
+"""Per-run agent instances resolved from a domain configuration."""
+import os
+from dataclasses import dataclass
+
+from agents import Agent
+
+from ..agents.planner_agent import planner_agent
+from ..agents.search_agent import search_agent
+from ..agents.writer_agent import writer_agent
+from ..agents.email_agent import email_agent
+from ..agents.gap_check_agent import gap_check_agent
+from ..agents.outline_agent import outline_agent
+from ..agents.section_writer_agent import section_writer_agent
+from ..agents.report_editor_agent import report_editor_agent
+from .search_backends import search_instructions, search_tools
+
+
+@dataclass(frozen=True)
+class ResearchAgents:
+    """The set of agents a single research run works with.
+
+    Each instance is a clone of the module-level template agent, so domain
+    instructions never leak into the shared globals or into other runs.
+    Models are read from the environment when the agents are built, so a
+    .env loaded by an entry point's main() applies whatever was imported first.
+    """
+    planner: Agent
+    searcher: Agent
+    writer: Agent
+    email: Agent
+    gap_checker: Agent
+    outliner: Agent
+    section_writer: Agent
+    editor: Agent
+
+
+def build_research_agents(domain_config: dict | None = None) -> ResearchAgents:
+    """Clone the template agents with the domain-specific instructions and search backend applied."""
+    instructions = (domain_config or {}).get('agent_instructions', {})
+    medium = os.environ.get('OPENAI_MEDIUM_MODEL')
+    small = os.environ.get('OPENAI_SMALL_MODEL')
+    return ResearchAgents(
+        planner=planner_agent.clone(model=medium,
+                                    instructions=instructions.get('planner', planner_agent.instructions)),
+        searcher=search_agent.clone(
+            model=medium,
+            instructions=search_instructions(domain_config, search_agent.instructions),
+            tools=search_tools(domain_config),
+        ),
+        writer=writer_agent.clone(model=medium, instructions=instructions.get('writer', writer_agent.instructions)),
+        email=email_agent.clone(model=small or "gpt-4o-mini"),
+        gap_checker=gap_check_agent.clone(
+            model=small or medium,
+            instructions=instructions.get('gap_checker', gap_check_agent.instructions),
+        ),
+        outliner=outline_agent.clone(
+            model=medium,
+            instructions=instructions.get('outliner', with_report_brief(outline_agent.instructions, instructions)),
+        ),
+        section_writer=section_writer_agent.clone(
+            model=medium,
+            instructions=instructions.get('section_writer',
+                                          with_report_brief(section_writer_agent.instructions, instructions)),
+        ),
+        editor=report_editor_agent.clone(
+            model=small or medium,
+            instructions=instructions.get('editor', with_report_brief(report_editor_agent.instructions, instructions)),
+        ),
+    )
+
+
+def with_report_brief(base: str, instructions: dict) -> str:
+    """Map-reduce writer instructions that also carry the domain's writer prompt, e.g. its comparison tables."""
+    brief = instructions.get('writer')
+    if not brief:
+        return base
+    return (f"{base}\n\nThe report as a whole must follow this brief; apply the parts that concern "
+            f"your share of the work:\n{brief}")
@@ -1,117 +1,997 @@
 from agents import Runner, trace, gen_trace_id
-from ..agents.search_agent import search_agent
-from ..agents.planner_agent import planner_agent, WebSearchItem, WebSearchPlan
-from ..agents.writer_agent import writer_agent, ReportData
-from ..agents.email_agent import email_agent
+from ..agents.planner_agent import WebSearchItem, WebSearchPlan
+from ..agents.writer_agent import ReportData
+from .research_agents import build_research_agents
+from .search_cache import get_search_cache, make_search_key, DEFAULT_SEARCH_TTL_SECONDS
+from .search_backends import search_backend_key
+from .report_cache import get_report_cache, DEFAULT_REPORT_TTL_SECONDS, DEFAULT_SIMILARITY_THRESHOLD
+from .scheduler import get_scheduler, estimate_tokens, Priority
+from .streaming import JsonStringFieldStream, is_model_output
+from .email_renderer import render_email
+from .email_outbox import get_email_outbox, default_recipient
+from .context_packer import PackedContext, pack_search_results, resolve_token_budget, DEFAULT_DUPLICATE_THRESHOLD
+from .metrics import new_run_metrics, NullRunMetrics
+from .resilience import (
+    ResiliencePolicy, call_with_retries, stream_with_retries, hedged, get_latency_tracker, is_retryable,
+)
+from .model_router import get_model_router
+from .checkpoints import get_checkpoint_store, PLAN, SEARCH, GAP_CHECK, REPORT, EMAIL, OUTLINE, SECTION
+from .search_cache import normalize_query
+from .single_flight import get_run_flights, get_search_flights
+from .prefetch import PrefetchSettings, PrefetchBudgetExceeded, get_prefetcher
+from .progress import (
+    StatusUpdate, PlanReady, SearchStarted, SearchCompleted, SearchFailed, ReportProgress, ReportReady,
+    EmailQueued, EmailSkipped, progress_text, SOURCE_CACHE, SOURCE_CHECKPOINT, SOURCE_COALESCED, SOURCE_SEARCH,
+)
+from .depth_controller import DepthBudget, DepthController, STOP_BUDGET
+from ..agents.gap_check_agent import CoverageAssessment
+from ..agents.outline_agent import OutlineSection, ReportOutline
+from ..agents.report_editor_agent import ReportEdit
+from .sectioned_writer import (
+    WriterSettings, MODE_MAP_REDUCE, digest_results, section_results, outline_text, assemble_markdown, merge_report,
+)
+from openai.types.responses import ResponseTextDeltaEvent
+from contextlib import aclosing, asynccontextmanager
 import asyncio
+import json
+import math
+import time
+import uuid
+
+# Minimum seconds between partial report updates pushed to the UI
+REPORT_STREAM_INTERVAL = 0.1
 
 class ResearchManager:
     """Modular research manager that can be configured for different domains."""
     
-    def __init__(self, domain_config=None):
-        """Initialize with optional domain configuration."""
+    def __init__(self, domain_config=None, search_cache=None, scheduler=None, report_cache=None,
+                 run_config=None, email_enabled=True, agents=None, router=None, checkpoints=None,
+                 coalesce=True):
+        """Initialize with optional domain configuration, caches and scheduler.
+
+        run_config is passed to every Runner call, e.g. to swap in a different
+        model provider. Set email_enabled to False to skip sending the report.
+        agents are prebuilt ResearchAgents for the domain (see DomainRegistry);
+        when omitted they are built from domain_config. Set coalesce to False
+        to keep runs and searches from joining identical ones already in flight.
+        """
         self.domain_config = domain_config
+        self.run_config = run_config
+        self.email_enabled = email_enabled
+        self.coalesce = coalesce
+        self.agents = agents if agents is not None else build_research_agents(domain_config)
+        self.resilience = ResiliencePolicy.from_config((domain_config or {}).get('resilience'))
+        self.search_cache = search_cache if search_cache is not None else get_search_cache()
+        self.report_cache = report_cache if report_cache is not None else get_report_cache()
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.router = router if router is not None else get_model_router()
+        self.checkpoints = checkpoints if checkpoints is not None else get_checkpoint_store()
+        # Stage artifacts restored from an interrupted run being resumed, {kind: {key: value}}
+        self._artifacts = {}
+        self._routed_agents = {}
+        self.run_id = uuid.uuid4().hex
+        self.metrics = new_run_metrics(self.run_id, self._domain_name())
+        # The ReportData of the most recent run, for callers that need more than the markdown
+        self.report = None
+        # Model tokens used by the current run, for budget decisions
+        self.tokens_used = 0
+        # Why the current run's report rests on incomplete research, if it does; such reports aren't cached
+        self.degraded = None
+        # Publishes progress events of the current run from the tasks it starts
+        self._emit = lambda event: None
+        # Set while prefetching follow-ups: calls run at background priority within this many tokens
+        self.prefetch_budget = None
+        self._tokens_reserved = 0
+
+    async def run(self, query: str, refresh: bool = False, budget: DepthBudget | None = None,
+                  resume: bool = True, deadline_seconds: float | None = None):
+        """ Run the deep research process, yielding the status updates and the final report as strings.
+
+        A thin adapter over run_events(), which takes the same options.
+        """
+        events = self.run_events(query, refresh, budget, resume, deadline_seconds)
+        async with aclosing(progress_text(events)) as updates:
+            async for text in updates:
+                yield text
+
+    async def run_events(self, query: str, refresh: bool = False, budget: DepthBudget | None = None,
+                         resume: bool = True, deadline_seconds: float | None = None):
+        """ Run the deep research process, yielding typed progress events (see core/progress.py).
+
+        A recent report for the same or a near-identical query is returned from
+        the report cache unless refresh is set. budget bounds how many search
+        rounds the run may spend; it defaults to the domain's depth settings.
+        Unless resume is False or refresh is set, an earlier unfinished run for
+        the same query is resumed from its checkpoints instead of starting
+        over; its searches older than the domain's search TTL are redone.
+
+        A run for the same domain and query as one already in flight in this
+        process joins it and receives its updates and report rather than
+        starting its own pipeline. Cancelling one joined run leaves the
+        shared pipeline running for the others.
+
+        The pipeline runs in its own task. Closing this generator, cancelling
+        the task iterating it or passing deadline_seconds (by default the
+        domain's run_timeout_seconds; TimeoutError when reached) stops
+        following it, and a pipeline nobody follows any more is cancelled
+        right away: its searches and writer call are cancelled, scheduler
+        slots are released and no email is sent.
+        """
+        key = (self._domain_name(), normalize_query(query)) if self.coalesce else uuid.uuid4().hex
+        broadcast, shared = get_run_flights().stream(
+            key, lambda publish: self._lead(publish, query, refresh, budget, resume)
+        )
+        if shared:
+            print(f"Joining the research already in flight for '{query}'")
+            self.metrics = new_run_metrics(uuid.uuid4().hex, self._domain_name())
+            self.metrics.count('research_coalesced_total', level='run')
+            self.report = None
+            self.tokens_used = 0
+        if deadline_seconds is None:
+            deadline_seconds = self.resilience.run_timeout_seconds
+        deadline = None if deadline_seconds is None else asyncio.get_running_loop().time() + deadline_seconds
+        outcome = "error"
+        try:
+            async with aclosing(broadcast.follow(deadline)) as updates:
+                async for event in updates:
+                    if isinstance(event, ReportReady):
+                        self.report = event.report
+                    yield event
+            outcome = "coalesced"
+        except TimeoutError:
+            if deadline is None or asyncio.get_running_loop().time() < deadline:
+                raise
+            outcome = "cancelled"
+            print(f"Run deadline of {deadline_seconds}s reached, stopping research for '{query}'")
+            self.metrics.count('research_runs_stopped_total', reason='deadline')
+            raise TimeoutError(f"Research run exceeded its {deadline_seconds}s deadline") from None
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            print(f"Stopped following research for '{query}'")
+            self.metrics.count('research_runs_stopped_total', reason='client')
+            raise
+        finally:
+            if shared:
+                self._finish_metrics(outcome)
+
+    async def _lead(self, publish, query: str, refresh: bool, budget: DepthBudget | None, resume: bool):
+        """ The shared pipeline of a run, whose events every subscriber receives """
+        self._emit = publish
+        async for event in self._run(query, refresh, budget, resume):
+            yield event
+
+    async def _run(self, query: str, refresh: bool, budget: DepthBudget | None, resume: bool):
+        self.metrics = new_run_metrics(uuid.uuid4().hex, self._domain_name())
+        self.report = None
+        self.tokens_used = 0
+        self.degraded = None
+        budget = budget if budget is not None else self.depth_budget()
+        cache_config = self._cache_config()
+        if not refresh:
+            cached = self.report_cache.get(
+                self._domain_name(),
+                query,
+                max_age=cache_config.get('report_ttl_seconds', DEFAULT_REPORT_TTL_SECONDS),
+                threshold=cache_config.get('similarity_threshold', DEFAULT_SIMILARITY_THRESHOLD),
+            )
+            if cached is not None:
+                print(f"Report cache hit: {self.report_cache.stats()}")
+                get_prefetcher().claim_report(cached)
+                self.metrics.count('research_cache_events_total', cache='report', result='hit')
+                self.report = cached
+                self._finish_metrics("cached")
+                yield StatusUpdate("Found a recent report for this query, loading it from cache...")
+                yield ReportReady(cached, cached=True)
+                return
+            self.metrics.count('research_cache_events_total', cache='report', result='miss')
+
+        resumed = self.checkpoints.find_resumable(self._domain_name(), query) if resume and not refresh else None
+        trace_id = resumed or gen_trace_id()
+        self.run_id = self.metrics.run_id = trace_id
+        if resumed and self.checkpoints.expire(trace_id, SEARCH, self._search_ttl()):
+            # Stale searches are redone, so nothing written from them is restored
+            self.checkpoints.discard(trace_id, (REPORT, OUTLINE, SECTION))
+        self._artifacts = self.checkpoints.load(trace_id) if resumed else {}
+        self.checkpoints.start_run(trace_id, self._domain_name(), query)
+        if resumed:
+            get_prefetcher().claim_run(resumed)
+            done = len(self._artifacts.get(SEARCH, {}))
+            print(f"Resuming run {trace_id} with {done} searches already done")
+            self.metrics.count('research_runs_resumed_total')
+            yield StatusUpdate(f"Resuming an interrupted run for this query ({done} searches already done)...")
+        try:
+            async for chunk in self._run_pipeline(query, trace_id, budget):
+                yield chunk
+        except asyncio.CancelledError:
+            print(f"Run {trace_id} cancelled")
+            self.checkpoints.finish(trace_id, "cancelled")
+            self._finish_metrics("cancelled")
+            raise
+        except BaseException:
+            self.checkpoints.finish(trace_id, "failed")
+            self._finish_metrics("error")
+            raise
+        # A degraded run stays resumable, so asking again retries the searches it is missing
+        status = "completed" if self.degraded is None else "degraded"
+        self.checkpoints.finish(trace_id, status)
+        self._finish_metrics(status)
 
-    async def run(self, query: str):
-        """ Run the deep research process, yielding the status updates and the final report"""
-        trace_id = gen_trace_id()
+    async def _run_pipeline(self, query: str, trace_id: str, budget: DepthBudget):
+        """ Plan, search, write and email, yielding progress events """
         with trace("Research trace", trace_id=trace_id):
             print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
-            yield f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
+            yield StatusUpdate(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
             print("Starting research...")
-            search_plan = await self.plan_searches(query)
-            yield "Searches planned, starting to search..."     
-            search_results = await self.perform_searches(search_plan)
-            yield "Searches complete, writing report..."
-            report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
-            await self.send_email(report)
-            yield "Email sent, research complete"
-            yield report.markdown_report
-        
-
-    async def plan_searches(self, query: str) -> WebSearchPlan:
-        """ Plan the searches to perform for the query """
+            search_results = []
+            async for update in self.research_rounds(query, budget):
+                if isinstance(update, list):
+                    search_results = update
+                else:
+                    yield update
+            if not search_results:
+                self.degraded = "no search results"
+            yield StatusUpdate("Searches complete, writing report...")
+            report = None
+            if REPORT in self._artifacts:
+                print("Report restored from checkpoint")
+                report = ReportData.model_validate(self._artifacts[REPORT][""])
+            else:
+                async for update in self.stream_report(query, search_results):
+                    if isinstance(update, ReportData):
+                        report = update
+                    else:
+                        yield ReportProgress(update)
+                self.checkpoints.save(self.run_id, REPORT, "", report.model_dump())
+            self.report = report
+            if self.degraded is None:
+                self.report_cache.set(self._domain_name(), query, report)
+                self._start_prefetch(report)
+            else:
+                # Served once, but neither cached nor restored when the run is resumed
+                print(f"Not caching the report: {self.degraded}")
+                self.checkpoints.discard(self.run_id, (REPORT, OUTLINE, SECTION))
+            if self.email_enabled and EMAIL not in self._artifacts:
+                queued = await self.send_email(report)
+                self.checkpoints.save(self.run_id, EMAIL, "", {"status": "queued" if queued else "skipped"})
+                yield EmailQueued(report) if queued else EmailSkipped(report, "no recipient configured")
+            yield ReportReady(report)
+
+    def _finish_metrics(self, outcome: str) -> None:
+        summary = self.metrics.finish(outcome)
+        if summary:
+            print(f"Run summary: {json.dumps(summary)}")
+
+    def depth_budget(self, **overrides) -> DepthBudget:
+        """ The domain's depth budget with per-run overrides such as max_seconds and max_tokens """
+        return DepthBudget.from_config((self.domain_config or {}).get('depth'), **overrides)
+
+    async def research_rounds(self, query: str, budget: DepthBudget):
+        """ Search in rounds until coverage is good enough or the budget runs out
+
+        Yields progress events, then the list of all search summaries.
+        """
+        controller = DepthController(budget, tokens_used=lambda: self.tokens_used)
+        if PLAN in self._artifacts:
+            search_plan = WebSearchPlan.model_validate(self._artifacts[PLAN][""])
+        else:
+            search_plan = await self.plan_searches(query, budget.initial_searches)
+            self.checkpoints.save(self.run_id, PLAN, "", search_plan.model_dump())
+        searches = search_plan.searches[:budget.initial_searches]
+        searched = set()
+        results = []
+        yield PlanReady(tuple(searches))
+        while True:
+            controller.start_round(len(searches))
+            searched.update(item.query.strip().lower() for item in searches)
+            results += await self.perform_searches(WebSearchPlan(searches=searches),
+                                                   deadline=controller.search_deadline())
+            controller.end_round()
+            if not controller.should_continue():
+                break
+            saved = self._artifacts.get(GAP_CHECK, {}).get(str(controller.rounds))
+            if saved is not None:
+                assessment = CoverageAssessment.model_validate(saved)
+            else:
+                assessment = await self.check_gaps(query, results)
+                self.checkpoints.save(self.run_id, GAP_CHECK, str(controller.rounds), assessment.model_dump())
+            follow_ups = [item for item in assessment.searches if item.query.strip().lower() not in searched]
+            if not controller.record_assessment(assessment.coverage, len(follow_ups)):
+                break
+            size = controller.next_round_size(len(follow_ups))
+            if size == 0:
+                controller.stop_reason = STOP_BUDGET
+                break
+            searches = follow_ups[:size]
+            yield StatusUpdate(f"Coverage {controller.coverage:.0%} after round {controller.rounds}, "
+                               f"searching {size} more: {', '.join(item.query for item in searches)}")
+        print(f"Stopped searching after {controller.rounds} rounds ({controller.stop_reason}), "
+              f"{len(results)} results, {self.tokens_used} tokens in {controller.elapsed():.1f}s")
+        self.metrics.count('research_depth_rounds_total', controller.rounds)
+        self.metrics.count('research_depth_stops_total', reason=controller.stop_reason)
+        yield results
+
+    async def check_gaps(self, query: str, search_results: list[str]) -> CoverageAssessment:
+        """ Rate how well the results so far cover the query and propose follow-up searches """
+        print("Checking coverage...")
+        summaries = "\n\n".join(f"<result {i}>\n{result}\n</result {i}>" for i, result in enumerate(search_results, 1))
+        with self.metrics.span("gap_check"):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.gap_checker,
+                    f"Query: {query}\nSearch results so far:\n{summaries}",
+                    stage="gap_checker",
+                    expected_output_tokens=300,
+                ),
+                self.resilience,
+                timeout=self.resilience.plan_timeout_seconds,
+                on_retry=self._retry_logger("gap_checker"),
+            )
+        assessment = result.final_output_as(CoverageAssessment)
+        print(f"Coverage {assessment.coverage:.2f}, {len(assessment.searches)} follow-up searches proposed")
+        return assessment
+
+    async def plan_searches(self, query: str, count: int | None = None) -> WebSearchPlan:
+        """ Plan the searches to perform for the query, optionally asking for a number of them """
         print("Planning searches...")
-        
-        # Apply domain-specific instructions if configured
-        original_instructions = planner_agent.instructions
-        if self.domain_config and 'agent_instructions' in self.domain_config:
-            planner_agent.instructions = self.domain_config['agent_instructions'].get('planner', original_instructions)
-        
-        try:
-            result = await Runner.run(
-                planner_agent,
-                f"Query: {query}",
+        input = f"Query: {query}"
+        if count:
+            input += f"\nPlan the {count} most important searches."
+        with self.metrics.span("plan"):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.planner,
+                    input,
+                    stage="planner",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=500,
+                ),
+                self.resilience,
+                timeout=self.resilience.plan_timeout_seconds,
+                on_retry=self._retry_logger("planner"),
             )
-            print(f"Will perform {len(result.final_output.searches)} searches")
-            return result.final_output_as(WebSearchPlan)
-        finally:
-            # Always restore original instructions
-            planner_agent.instructions = original_instructions
+        print(f"Will perform {len(result.final_output.searches)} searches")
+        return result.final_output_as(WebSearchPlan)
+
+    async def perform_searches(self, search_plan: WebSearchPlan, deadline: float | None = None) -> list[str]:
+        """ Perform the searches to perform for the query
 
-    async def perform_searches(self, search_plan: WebSearchPlan) -> list[str]:
-        """ Perform the searches to perform for the query """
+        Stops waiting at the search stage deadline (or the given deadline in
+        seconds, if sooner), or once the quorum of searches has finished and
+        quorum_after_seconds have passed; searches still running then are
+        cancelled, and the run is degraded so its report isn't cached.
+        """
         print("Searching...")
+        policy = self.resilience
+        stage_timeout = policy.search_stage_timeout_seconds
+        if deadline is not None:
+            stage_timeout = deadline if stage_timeout is None else min(stage_timeout, deadline)
         num_completed = 0
-        tasks = [asyncio.create_task(self.search(item)) for item in search_plan.searches]
         results = []
-        for task in asyncio.as_completed(tasks):
-            result = await task
-            if result is not None:
-                results.append(result)
-            num_completed += 1
-            print(f"Searching... {num_completed}/{len(tasks)} completed")
+        loop = asyncio.get_running_loop()
+        with self.metrics.span("search", planned=len(search_plan.searches)):
+            tasks = [asyncio.create_task(self.search(item)) for item in search_plan.searches]
+            started = loop.time()
+            quorum = policy.quorum_size(len(tasks))
+            pending = set(tasks)
+            try:
+                while pending:
+                    stop_at = math.inf
+                    if stage_timeout is not None:
+                        stop_at = started + stage_timeout
+                    if quorum is not None and len(results) >= quorum:
+                        stop_at = min(stop_at, started + policy.quorum_after_seconds)
+                    timeout = stop_at - loop.time()
+                    if timeout <= 0:
+                        break
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=None if timeout == math.inf else timeout,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        result = task.result()
+                        if result is not None:
+                            results.append(result)
+                        else:
+                            self.metrics.count('research_searches_dropped_total')
+                        num_completed += 1
+                        print(f"Searching... {num_completed}/{len(tasks)} completed")
+            except asyncio.CancelledError:
+                print(f"Cancelling {len(pending)} unfinished searches")
+                self.metrics.count('research_searches_abandoned_total', len(pending), reason="cancelled")
+                raise
+            finally:
+                for task in pending:
+                    task.cancel()
+            if pending:
+                reason = "quorum" if quorum is not None and len(results) >= quorum else "deadline"
+                print(f"Abandoning {len(pending)} unfinished searches ({reason})")
+                self.degraded = f"{len(pending)} of {len(tasks)} searches abandoned ({reason})"
+                self.metrics.count('research_searches_abandoned_total', len(pending), reason=reason)
+                await asyncio.gather(*pending, return_exceptions=True)
         print("Finished searching")
+        print(f"Search cache: {self.search_cache.stats()}")
         return results
 
     async def search(self, item: WebSearchItem) -> str | None:
-        """ Perform a search for the query """
-        input = f"Search term: {item.query}\nReason for searching: {item.reason}"
-        
-        # Apply domain-specific instructions if configured
-        original_instructions = search_agent.instructions
-        if self.domain_config and 'agent_instructions' in self.domain_config:
-            search_agent.instructions = self.domain_config['agent_instructions'].get('searcher', original_instructions)
-        
+        """ Perform a search for the query, publishing when it starts and how it ends; None if it failed """
+        started = time.perf_counter()
+        self._emit(SearchStarted(item.query, item.reason))
         try:
-            result = await Runner.run(
-                search_agent,
-                input,
-            )
-            return str(result.final_output)
-        except Exception:
+            summary, source = await self._find_summary(item)
+        except asyncio.CancelledError:
+            self._emit(SearchFailed(item.query, "cancelled", time.perf_counter() - started))
+            raise
+        except Exception as e:
+            print(f"Search failed for '{item.query}': {type(e).__name__}: {e}")
+            self.metrics.count('research_search_failures_total', error=type(e).__name__)
+            self._emit(SearchFailed(item.query, f"{type(e).__name__}: {e}", time.perf_counter() - started))
             return None
-        finally:
-            # Always restore original instructions
-            search_agent.instructions = original_instructions
+        self._emit(SearchCompleted(item.query, summary, time.perf_counter() - started, source))
+        return summary
+
+    async def _find_summary(self, item: WebSearchItem) -> tuple[str, str]:
+        """ The summary for a search and where it came from: a checkpoint, the cache, a shared call or a new one """
+        searcher = self.agents.searcher
+
+        checkpointed = self._artifacts.get(SEARCH, {}).get(normalize_query(item.query))
+        if checkpointed is not None:
+            return checkpointed, SOURCE_CHECKPOINT
+
+        # Summaries are cached under the model that wrote them, so while a fallback model is serving, its
+        # summaries are reused, and the preferred model's are again once it is healthy
+        backend = await search_backend_key(self.domain_config)
+        model = self.router.candidates(self._route("searcher", searcher))[0]
+        cache_key = make_search_key(item.query, searcher.instructions, model, backend)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            self.metrics.count('research_cache_events_total', cache='search', result='hit')
+            self.checkpoints.save(self.run_id, SEARCH, normalize_query(item.query), cached)
+            return cached, SOURCE_CACHE
+        self.metrics.count('research_cache_events_total', cache='search', result='miss')
+
+        source = SOURCE_SEARCH
+        if not self.coalesce:
+            summary = await self._search_uncached(item, backend)
+        else:
+            # Identical searches in flight, from this run or another, share one searcher call. Prefetch
+            # searches get flights of their own, so a live run never waits at background priority or
+            # fails on a prefetch's token budget
+            flight_key = cache_key if self.prefetch_budget is None else (cache_key, "prefetch")
+            summary, shared = await get_search_flights().do(flight_key, lambda: self._search_uncached(item, backend))
+            if shared:
+                self.metrics.count('research_coalesced_total', level='search')
+                source = SOURCE_COALESCED
+        self.checkpoints.save(self.run_id, SEARCH, normalize_query(item.query), summary)
+        return summary, source
+
+    async def _search_uncached(self, item: WebSearchItem, backend: str) -> str:
+        """ Call the searcher with retries and hedging and cache the summary under the model that wrote it """
+        input = f"Search term: {item.query}\nReason for searching: {item.reason}"
+        searcher = self.agents.searcher
+        policy = self.resilience
+        latencies = get_latency_tracker("searcher")
+
+        async def run_search():
+            started = time.perf_counter()
+            result = await self._run_agent(searcher, input, stage="searcher")
+            if self.prefetch_budget is None:
+                latencies.observe(time.perf_counter() - started)
+            return result
+
+        def attempt():
+            hedge_after = None
+            if policy.hedge_percentile:
+                hedge_after = latencies.percentile(policy.hedge_percentile, policy.hedge_min_samples)
+            return hedged(run_search, hedge_after)
+
+        with self.metrics.span("search_item", query=item.query):
+            result, winner = await call_with_retries(
+                attempt,
+                policy,
+                timeout=policy.search_timeout_seconds,
+                on_retry=self._retry_logger("searcher", item.query),
+            )
+        if winner is not None:
+            self.metrics.count('research_search_hedges_total', winner=winner)
+        summary = str(result.final_output)
+        cache_key = make_search_key(item.query, searcher.instructions, result.last_agent.model, backend)
+        self.search_cache.set(cache_key, summary, self._search_ttl())
+        return summary
+
+    def _retry_logger(self, stage: str, label: str = ""):
+        """ Build an on_retry callback that logs and counts retries of a stage """
+        def on_retry(attempt: int, error: Exception, delay: float) -> None:
+            target = f" for '{label}'" if label else ""
+            print(f"Retrying {stage}{target} in {delay:.1f}s after attempt {attempt} failed: {type(error).__name__}")
+            self.metrics.count('research_retries_total', stage=stage, error=type(error).__name__)
+        return on_retry
+
+    def _prefetch_ttl(self, report) -> float:
+        """ How long a prefetched question stays usable: while its searches are fresh, or its report cached """
+        ttl = min(self._search_ttl(), self.checkpoints.max_age_seconds)
+        if report is not None:
+            ttl = max(ttl, self._cache_config().get('report_ttl_seconds', DEFAULT_REPORT_TTL_SECONDS))
+        return ttl
+
+    def _search_ttl(self) -> float:
+        """ Resolve how long search summaries stay cached for this domain """
+        return self._cache_config().get('search_ttl_seconds', DEFAULT_SEARCH_TTL_SECONDS)
+
+    def _cache_config(self) -> dict:
+        return (self.domain_config or {}).get('cache', {})
+
+    def _domain_name(self) -> str:
+        return (self.domain_config or {}).get('name', 'general')
 
     async def write_report(self, query: str, search_results: list[str]) -> ReportData:
         """ Write the report for the query """
+        settings = self._writer_settings()
+        if settings.use_map_reduce(len(search_results)):
+            report = None
+            async for update in self.stream_sectioned_report(query, search_results, settings):
+                if isinstance(update, ReportData):
+                    report = update
+            return report
         print("Thinking about report...")
-        input = f"Original query: {query}\nSummarized search results: {search_results}"
-        
-        # Apply domain-specific instructions if configured
-        original_instructions = writer_agent.instructions
-        if self.domain_config and 'agent_instructions' in self.domain_config:
-            writer_agent.instructions = self.domain_config['agent_instructions'].get('writer', original_instructions)
-        
-        try:
-            result = await Runner.run(
-                writer_agent,
-                input,
+        input = self._writer_input(query, search_results)
+        with self.metrics.span("write"):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.writer,
+                    input,
+                    stage="writer",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=4000,
+                ),
+                self.resilience,
+                timeout=self.resilience.write_timeout_seconds,
+                on_retry=self._retry_logger("writer"),
             )
-            print("Finished writing report")
-            return result.final_output_as(ReportData)
-        finally:
-            # Always restore original instructions
-            writer_agent.instructions = original_instructions
+        print("Finished writing report")
+        return result.final_output_as(ReportData)
+
+    async def stream_report(self, query: str, search_results: list[str]):
+        """ Write the report, yielding the partial markdown as it is generated and finally the ReportData """
+        settings = self._writer_settings()
+        if settings.use_map_reduce(len(search_results)):
+            async for update in self.stream_sectioned_report(query, search_results, settings):
+                yield update
+            return
+        async for update in self._stream_single_report(query, search_results):
+            yield update
+
+    async def _stream_single_report(self, query: str, search_results: list[str]):
+        """ stream_report with a single writer call over all the search results """
+        print("Thinking about report...")
+        input = self._writer_input(query, search_results)
+        markdown = JsonStringFieldStream("markdown_report")
+        started = time.monotonic()
+        last_update = 0.0
+        result = None
+        with self.metrics.span("write"):
+            # Retried like the other stages until the first token; after that the run fails and can be resumed
+            async for event, result in stream_with_retries(
+                lambda: self._run_agent_streamed(
+                    self.agents.writer,
+                    input,
+                    stage="writer",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=4000,
+                ),
+                self.resilience,
+                started=lambda item: is_model_output(item[0]),
+                timeout=self.resilience.write_timeout_seconds,
+                on_retry=self._retry_logger("writer"),
+            ):
+                if event.type != "raw_response_event" or not isinstance(event.data, ResponseTextDeltaEvent):
+                    continue
+                if not markdown.feed(event.data.delta):
+                    continue
+                now = time.monotonic()
+                if not last_update:
+                    print(f"First report token after {now - started:.2f}s")
+                    self.metrics.record_stage("first_report_token", now - started)
+                if now - last_update >= REPORT_STREAM_INTERVAL:
+                    last_update = now
+                    yield markdown.value
+        print("Finished writing report")
+        yield result.final_output_as(ReportData)
     
-    async def send_email(self, report: ReportData) -> None:
-        print("Writing email...")
-        result = await Runner.run(
-            email_agent,
-            report.markdown_report,
+    async def stream_sectioned_report(self, query: str, search_results: list[str], settings: WriterSettings):
+        """ Map-reduce writer: outline, sections written in parallel, then a light editing pass
+
+        Yields the partial markdown each time a section is finished and finally the ReportData.
+        A section that still fails after its retries stops the map-reduce pass and the report
+        is written by the single writer instead, so a report is never missing sections.
+        """
+        print(f"Writing report in sections from {len(search_results)} search results...")
+        started = time.monotonic()
+        with self.metrics.span("write", mode=MODE_MAP_REDUCE):
+            outline = await self.outline_report(query, search_results, settings)
+            bodies = {}
+            tasks = {
+                asyncio.create_task(self.write_section(query, outline, index, search_results, settings)): index
+                for index in range(len(outline.sections))
+            }
+            pending = set(tasks)
+            failed = None
+            try:
+                while pending and failed is None:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        section = outline.sections[tasks[task]]
+                        try:
+                            bodies[tasks[task]] = task.result()
+                        except Exception as e:
+                            failed = failed or e
+                            print(f"Section '{section.heading}' failed: {type(e).__name__}: {e}")
+                            self.metrics.count('research_report_sections_total', result='failed')
+                            continue
+                        self.metrics.count('research_report_sections_total', result='ok')
+                        if len(bodies) == 1:
+                            print(f"First report section after {time.monotonic() - started:.2f}s")
+                            self.metrics.record_stage("first_report_token", time.monotonic() - started)
+                        yield assemble_markdown(outline, bodies)
+            finally:
+                for task in pending:
+                    task.cancel()
+            if failed is None:
+                edit = await self.edit_report(query, outline, bodies)
+        if failed is not None:
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f"Falling back to the single writer after a section failed: {type(failed).__name__}")
+            self.metrics.count('research_writer_fallbacks_total', error=type(failed).__name__)
+            async for update in self._stream_single_report(query, search_results):
+                yield update
+            return
+        print("Finished writing report")
+        yield merge_report(outline, bodies, edit)
+
+    async def outline_report(self, query: str, search_results: list[str], settings: WriterSettings) -> ReportOutline:
+        """ Plan the report's sections and which search results each should draw on """
+        if OUTLINE in self._artifacts:
+            return ReportOutline.model_validate(self._artifacts[OUTLINE][""])
+        print("Outlining report...")
+        with self.metrics.span("outline"):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.outliner,
+                    f"Query: {query}\nPlan at most {settings.max_sections} sections.\n"
+                    f"Search results:\n{digest_results(search_results, settings.digest_words)}",
+                    stage="outliner",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=600,
+                ),
+                self.resilience,
+                timeout=self.resilience.plan_timeout_seconds,
+                on_retry=self._retry_logger("outliner"),
+            )
+        outline = result.final_output_as(ReportOutline)
+        outline.sections = outline.sections[:settings.max_sections] or [
+            OutlineSection(heading="Findings", brief=query, results=[])
+        ]
+        print(f"Report outline has {len(outline.sections)} sections")
+        self.checkpoints.save(self.run_id, OUTLINE, "", outline.model_dump())
+        return outline
+
+    async def write_section(self, query: str, outline: ReportOutline, index: int, search_results: list[str],
+                            settings: WriterSettings) -> str:
+        """ Write one section of the outline from the packed search results assigned to it """
+        saved = self._artifacts.get(SECTION, {}).get(str(index))
+        if saved is not None:
+            return saved
+        section = outline.sections[index]
+        context_config = (self.domain_config or {}).get('context', {})
+        packed = pack_search_results(
+            f"{query}\n{section.heading}: {section.brief}",
+            section_results(search_results, section.results),
+            token_budget=settings.section_token_budget,
+            duplicate_threshold=context_config.get('duplicate_threshold', DEFAULT_DUPLICATE_THRESHOLD),
+        )
+        self._record_packing("section_writer", packed)
+        input = (
+            f"Original query: {query}\nReport outline:\n{outline_text(outline)}\n"
+            f"Your section: {section.heading}\nBrief: {section.brief}\n"
+            f"Research for this section:\n{packed.text}"
+        )
+        with self.metrics.span("write_section", heading=section.heading):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.section_writer,
+                    input,
+                    stage="section_writer",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=1200,
+                ),
+                self.resilience,
+                timeout=self.resilience.write_timeout_seconds,
+                on_retry=self._retry_logger("section_writer", section.heading),
+            )
+        body = str(result.final_output)
+        self.checkpoints.save(self.run_id, SECTION, str(index), body)
+        return body
+
+    async def edit_report(self, query: str, outline: ReportOutline, bodies: dict) -> ReportEdit:
+        """ Frame the written sections with an introduction, conclusion, summary and follow-up questions """
+        print("Editing report...")
+        with self.metrics.span("edit"):
+            result = await call_with_retries(
+                lambda: self._run_agent(
+                    self.agents.editor,
+                    f"Original query: {query}\nDraft sections:\n{assemble_markdown(outline, bodies)}",
+                    stage="editor",
+                    priority=Priority.CRITICAL,
+                    expected_output_tokens=800,
+                ),
+                self.resilience,
+                timeout=self.resilience.write_timeout_seconds,
+                on_retry=self._retry_logger("editor"),
+            )
+        return result.final_output_as(ReportEdit)
+
+    def _writer_settings(self) -> WriterSettings:
+        return WriterSettings.from_config((self.domain_config or {}).get('writer'))
+
+    def _writer_input(self, query: str, search_results: list[str]) -> str:
+        """ Build the writer prompt from deduplicated, relevance-ranked and budgeted search results """
+        context_config = (self.domain_config or {}).get('context', {})
+        packed = pack_search_results(
+            query,
+            search_results,
+            token_budget=resolve_token_budget(context_config, self._route("writer", self.agents.writer).models[0]),
+            duplicate_threshold=context_config.get('duplicate_threshold', DEFAULT_DUPLICATE_THRESHOLD),
+        )
+        self._record_packing("writer", packed)
+        return f"Original query: {query}\nSummarized search results:\n{packed.text}"
+
+    def _record_packing(self, stage: str, packed: PackedContext) -> None:
+        """ Count the prompt tokens and paragraphs the context packer saved a writer stage """
+        if packed.tokens_saved:
+            self.metrics.count('research_context_tokens_saved_total', packed.tokens_saved, stage=stage)
+        if packed.duplicates_removed:
+            self.metrics.count('research_context_paragraphs_dropped_total', packed.duplicates_removed,
+                               stage=stage, reason="duplicate")
+        if packed.dropped_for_budget:
+            self.metrics.count('research_context_paragraphs_dropped_total', packed.dropped_for_budget,
+                               stage=stage, reason="budget")
+
+    async def send_email(self, report: ReportData) -> bool:
+        """ Queue the report email in the outbox, rendered locally unless the domain opts into LLM formatting
+
+        Returns False, without composing anything, when no recipient is configured.
+        """
+        email_config = (self.domain_config or {}).get('email', {})
+        outbox = get_email_outbox()
+        if default_recipient() is None:
+            print("No TO_EMAIL configured, skipping the email")
+            return False
+        if email_config.get('mode', 'local') == 'llm':
+            # The email agent's tool queues the message; it writes in the background so the report isn't held up
+            print("Writing email in the background...")
+            outbox.track(self._run_agent(
+                self.agents.email,
+                report.markdown_report,
+                stage="email",
+                priority=Priority.BACKGROUND,
+                expected_output_tokens=estimate_tokens(report.markdown_report),
+            ))
+            return True
+        with self.metrics.span("email"):
+            subject, html_body = render_email(report, self.domain_config)
+            return outbox.enqueue(subject, html_body) is not None
+
+    def _start_prefetch(self, report: ReportData) -> None:
+        """ Research the report's follow-up questions in the background when the domain enables prefetch """
+        settings = PrefetchSettings.from_config((self.domain_config or {}).get('prefetch'))
+        questions = [question for question in report.follow_up_questions if question.strip()][:settings.questions]
+        if not settings.enabled or not questions or self.prefetch_budget is not None:
+            return
+        manager = ResearchManager(
+            domain_config=self.domain_config, search_cache=self.search_cache, scheduler=self.scheduler,
+            report_cache=self.report_cache, run_config=self.run_config, email_enabled=False, agents=self.agents,
+            router=self.router, checkpoints=self.checkpoints, coalesce=self.coalesce,
         )
-        print("Email sent")
-        return report
\ No newline at end of file
+        if get_prefetcher().submit(lambda: manager.prefetch(questions, settings)):
+            print(f"Prefetching {len(questions)} follow-up questions in the background")
+
+    async def prefetch(self, questions: list[str], settings: PrefetchSettings) -> None:
+        """ Plan, search and optionally write up questions ahead of time, within settings.max_tokens
+
+        Each question is left as a resumable checkpoint, and its report, if
+        written, in the report cache. Questions already cached or checkpointed
+        are skipped.
+        """
+        self.prefetch_budget = settings.max_tokens
+        # Prefetches are accounted in the prefetcher's own metrics, not as runs with live latencies
+        self.metrics = NullRunMetrics(self.run_id, self._domain_name())
+        prefetcher = get_prefetcher()
+        cache_config = self._cache_config()
+        domain = self._domain_name()
+        for question in questions:
+            cached = self.report_cache.get(
+                domain,
+                question,
+                max_age=cache_config.get('report_ttl_seconds', DEFAULT_REPORT_TTL_SECONDS),
+                threshold=cache_config.get('similarity_threshold', DEFAULT_SIMILARITY_THRESHOLD),
+            )
+            if cached is not None or self.checkpoints.find_resumable(domain, question):
+                prefetcher.skip()
+                continue
+            spent = self.tokens_used
+            self.run_id = self.metrics.run_id = gen_trace_id()
+            self._artifacts = {}
+            self.degraded = None
+            self.checkpoints.start_run(self.run_id, domain, question)
+            planned, report, status = False, None, "prefetched"
+            print(f"Prefetching follow-up question '{question}'")
+            try:
+                plan = await self.plan_searches(question, settings.searches_per_question)
+                self.checkpoints.save(self.run_id, PLAN, "", plan.model_dump())
+                planned = True
+                # Only start the searches the remaining budget can cover, rather than have the rest refused
+                per_search = estimate_tokens(str(self.agents.searcher.instructions)) + 1100
+                affordable = max(0, settings.max_tokens - self.tokens_used - self._tokens_reserved) // per_search
+                searches = plan.searches[:min(settings.searches_per_question, affordable)]
+                results = await self.perform_searches(WebSearchPlan(searches=searches)) if searches else []
+                if settings.write_reports and results and self.degraded is None:
+                    report = await self.write_report(question, results)
+                    self.checkpoints.save(self.run_id, REPORT, "", report.model_dump())
+                    self.report_cache.set(domain, question, report)
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            except Exception as e:
+                print(f"Prefetch of '{question}' stopped: {type(e).__name__}: {e}")
+            finally:
+                # Anything but "completed" leaves the checkpoint for a later run of the question to resume
+                self.checkpoints.finish(self.run_id, status)
+                if planned:
+                    prefetcher.record(self.run_id, report, self.tokens_used - spent, self._prefetch_ttl(report))
+            if self.tokens_used >= settings.max_tokens:
+                break
+
+    def _route(self, stage: str, agent):
+        return self.router.route(stage, self.domain_config, agent.model)
+
+    def _agent_for(self, agent, model):
+        """ The agent itself, or a clone of it running on another model """
+        if model == agent.model:
+            return agent
+        key = (id(agent), model)
+        if key not in self._routed_agents:
+            self._routed_agents[key] = agent.clone(model=model)
+        return self._routed_agents[key]
+
+    def _fall_over(self, stage: str, model, next_model, error: Exception) -> None:
+        print(f"{stage} call on {model or 'default'} failed ({type(error).__name__}), falling back to {next_model}")
+        self.metrics.count('research_model_fallbacks_total', stage=stage,
+                           from_model=str(model or "default"), to_model=str(next_model or "default"))
+
+    @asynccontextmanager
+    async def _reserve_tokens(self, estimated: int):
+        """ Hold a call's estimated tokens against the prefetch budget while it runs """
+        if self.prefetch_budget is not None:
+            committed = self.tokens_used + self._tokens_reserved
+            if committed + estimated > self.prefetch_budget:
+                raise PrefetchBudgetExceeded(
+                    f"{committed} of {self.prefetch_budget} prefetch tokens committed, call needs ~{estimated}"
+                )
+        self._tokens_reserved += estimated
+        try:
+            yield
+        finally:
+            self._tokens_reserved -= estimated
+
+    async def _run_agent(self, agent, input: str, stage: str, priority: Priority = Priority.NORMAL,
+                         expected_output_tokens: int = 1000):
+        """ Run an agent on the models routed for its stage, falling back to the next model on transient errors """
+        route = self._route(stage, agent)
+        models = self.router.candidates(route)
+        for index, model in enumerate(models):
+            try:
+                return await self._run_agent_on(self._agent_for(agent, model), input, stage, priority,
+                                                expected_output_tokens, route.timeout_seconds)
+            except Exception as e:
+                if index == len(models) - 1 or not is_retryable(e):
+                    raise
+                self._fall_over(stage, model, models[index + 1], e)
+
+    async def _run_agent_on(self, agent, input: str, stage: str, priority: Priority, expected_output_tokens: int,
+                            timeout: float | None):
+        """ Run an agent through the shared scheduler so all runs stay within the model quotas """
+        estimated = estimate_tokens(str(agent.instructions)) + estimate_tokens(input) + expected_output_tokens
+        model = str(agent.model or "default")
+        if self.prefetch_budget is not None:
+            priority = Priority.BACKGROUND
+        async with self._reserve_tokens(estimated), self.scheduler.slot(agent.model, self.run_id, priority,
+                                                                       estimated) as grant:
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    result = await Runner.run(agent, input, run_config=self.run_config)
+            except asyncio.CancelledError:
+                self.metrics.record_model_call(stage, model, time.perf_counter() - started, error="CancelledError")
+                raise
+            except Exception as e:
+                self.router.record(agent.model, time.perf_counter() - started, ok=False)
+                self.metrics.record_model_call(stage, model, time.perf_counter() - started, error=type(e).__name__)
+                raise
+            usage = result.context_wrapper.usage
+            self.router.record(agent.model, time.perf_counter() - started, ok=True)
+            self.metrics.record_model_call(stage, model, time.perf_counter() - started, usage)
+            grant.record_usage(usage.total_tokens)
+            self.tokens_used += usage.total_tokens
+        return result
+
+    async def _run_agent_streamed(self, agent, input: str, stage: str, priority: Priority = Priority.NORMAL,
+                                  expected_output_tokens: int = 1000):
+        """ Streaming variant of _run_agent, yielding (event, streamed result) pairs
+
+        Falls back to the next model only if the call fails before the model's
+        first output event, since later output has already been passed on.
+        """
+        route = self._route(stage, agent)
+        models = self.router.candidates(route)
+        for index, model in enumerate(models):
+            streaming = False
+            try:
+                async for event, result in self._run_agent_streamed_on(
+                    self._agent_for(agent, model), input, stage, priority, expected_output_tokens, route.timeout_seconds
+                ):
+                    streaming = streaming or is_model_output(event)
+                    yield event, result
+                return
+            except Exception as e:
+                if streaming or index == len(models) - 1 or not is_retryable(e):
+                    raise
+                self._fall_over(stage, model, models[index + 1], e)
+
+    async def _run_agent_streamed_on(self, agent, input: str, stage: str, priority: Priority,
+                                     expected_output_tokens: int, first_event_timeout: float | None):
+        """ Streaming variant of _run_agent_on, with an optional deadline for the model's first output event """
+        estimated = estimate_tokens(str(agent.instructions)) + estimate_tokens(input) + expected_output_tokens
+        model = str(agent.model or "default")
+        if self.prefetch_budget is not None:
+            priority = Priority.BACKGROUND
+        async with self._reserve_tokens(estimated), self.scheduler.slot(agent.model, self.run_id, priority,
+                                                                       estimated) as grant:
+            started = time.perf_counter()
+            result = None
+            try:
+                result = Runner.run_streamed(agent, input, run_config=self.run_config)
+                events = result.stream_events()
+                # The SDK announces the agent before calling the model, so wait for actual output
+                opening = []
+                async with asyncio.timeout(first_event_timeout) as waiting:
+                    async for event in events:
+                        opening.append(event)
+                        if is_model_output(event):
+                            break
+                if waiting.expired():
+                    # stream_events swallows the timeout's cancellation and just stops
+                    raise TimeoutError(f"No output from {model} within {first_event_timeout}s")
+                for event in opening:
+                    yield event, result
+                async for event in events:
+                    yield event, result
+                if asyncio.current_task().cancelling():
+                    # stream_events ends quietly when cancelled; don't mistake that for a finished report
+                    raise asyncio.CancelledError
+            except (asyncio.CancelledError, GeneratorExit):
+                # The SDK streams from a background task of its own, which would otherwise keep running
+                if result is not None:
+                    result.cancel()
+                self.metrics.record_model_call(stage, model, time.perf_counter() - started, error="CancelledError")
+                raise
+            except Exception as e:
+                if result is not None:
+                    result.cancel()
+                self.router.record(agent.model, time.perf_counter() - started, ok=False)
+                self.metrics.record_model_call(stage, model, time.perf_counter() - started, error=type(e).__name__)
+                raise
+            usage = result.context_wrapper.usage
+            self.router.record(agent.model, time.perf_counter() - started, ok=True)
+            self.metrics.record_model_call(stage, model, time.perf_counter() - started, usage)
+            grant.record_usage(usage.total_tokens)
+            self.tokens_used += usage.total_tokens
@@ -0,0 +1,201 @@
+"""Deadlines, retries and hedged requests for agent calls.
+
+A ResiliencePolicy is resolved from a domain's optional ``resilience``
+section; keys left out keep their ResiliencePolicy defaults, which leave
+hedging and the quorum off. For example:
+
+    "resilience": {
+        "search_timeout_seconds": 90,        # per search attempt
+        "search_stage_timeout_seconds": 300, # whole search fan-out
+        "plan_timeout_seconds": 120,         # per planner attempt
+        "write_timeout_seconds": 600,        # per writer attempt, streamed or not
+        "run_timeout_seconds": 900,          # whole run; None (the default) for no limit
+        "max_attempts": 3,                   # retries only for retryable errors
+        "backoff_base_seconds": 1.0,
+        "backoff_max_seconds": 10.0,
+        "hedge_percentile": 0.95,            # None disables hedging
+        "hedge_min_samples": 20,
+        "quorum": 0.6,                       # None waits for every search
+        "quorum_after_seconds": 30,
+    }
+
+Hedging sends a duplicate search once the first attempt has been running
+longer than the given percentile of recent search latencies, and takes
+whichever answers first. With a quorum, the writer starts as soon as that
+fraction of the planned searches has finished and quorum_after_seconds
+have passed, instead of waiting for the slowest search. A report written
+without the searches a quorum or deadline cut off is not cached.
+"""
+import asyncio
+import math
+import random
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, fields
+
+# Errors worth retrying, matched by class name so provider SDKs stay optional imports
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "TimeoutError", "ConnectionError",
+}
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    search_timeout_seconds: float | None = 90.0
+    search_stage_timeout_seconds: float | None = 300.0
+    plan_timeout_seconds: float | None = 120.0
+    write_timeout_seconds: float | None = 600.0
+    run_timeout_seconds: float | None = None
+    max_attempts: int = 3
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 10.0
+    hedge_percentile: float | None = None
+    hedge_min_samples: int = 20
+    quorum: float | None = None
+    quorum_after_seconds: float = 30.0
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "ResiliencePolicy":
+        """Build a policy from a domain's ``resilience`` section, raising ValueError on unknown keys."""
+        unknown = sorted(set(config or {}) - {field.name for field in fields(cls)})
+        if unknown:
+            raise ValueError(f"Unknown resilience setting(s): {', '.join(unknown)}")
+        return cls(**(config or {}))
+
+    def quorum_size(self, planned: int) -> int | None:
+        """Number of finished searches that lets the writer start early, or None."""
+        if not self.quorum or planned == 0:
+            return None
+        return max(1, math.ceil(self.quorum * planned))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient: timeouts, connection problems, 429s and 5xx responses."""
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random | None = None) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    return (rng or random).uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def call_with_retries(make_call, policy: ResiliencePolicy, timeout: float | None = None, on_retry=None):
+    """Await make_call() with a per-attempt timeout, retrying retryable errors with backoff.
+
+    on_retry(attempt, error, delay) is called before each retry.
+    """
+    attempt = 1
+    while True:
+        try:
+            if timeout is None:
+                return await make_call()
+            async with asyncio.timeout(timeout):
+                return await make_call()
+        except Exception as e:
+            if attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, policy.backoff_base_seconds, policy.backoff_max_seconds)
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def stream_with_retries(make_stream, policy: ResiliencePolicy, started, timeout: float | None = None,
+                             on_retry=None):
+    """Iterate make_stream(), retrying retryable errors with backoff until output has started.
+
+    started(item) tells whether an item is output the caller will use; once
+    one has been yielded, errors are raised rather than retried. timeout is
+    a deadline for each attempt's whole stream, raising TimeoutError.
+    """
+    attempt = 1
+    while True:
+        streaming = False
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        try:
+            async with aclosing(make_stream()) as stream:
+                while True:
+                    # Only waits for the stream are bounded, so the deadline never fires inside the caller's code
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            item = await anext(stream)
+                    except StopAsyncIteration:
+                        break
+                    streaming = streaming or started(item)
+                    yield item
+            return
+        except Exception as e:
+            if streaming or attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, policy.backoff_base_seconds, policy.backoff_max_seconds)
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def hedged(make_call, hedge_after: float | None):
+    """Run make_call(); if it hasn't answered after hedge_after seconds, race a second copy.
+
+    Returns (result, winner): winner is None when no hedge was sent, otherwise
+    "primary" or "hedge". The loser is cancelled. If one copy fails, the
+    other is still awaited.
+    """
+    primary = asyncio.ensure_future(make_call())
+    if hedge_after is None:
+        return await primary, None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        return primary.result(), None
+
+    hedge = asyncio.ensure_future(make_call())
+    names = {primary: "primary", hedge: "hedge"}
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), names[task]
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int = 1) -> float | None:
+        """Nearest-rank percentile, or None until min_samples latencies have been seen."""
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+_latency_trackers = {}
+
+
+def get_latency_tracker(stage: str) -> LatencyTracker:
+    """Return the process-wide latency tracker for a stage, shared by every run."""
+    if stage not in _latency_trackers:
+        _latency_trackers[stage] = LatencyTracker()
+    return _latency_trackers[stage]
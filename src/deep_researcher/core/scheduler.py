@@ -0,0 +1,245 @@
+"""Process-wide scheduler for model calls.
+
+Every agent call made by a ResearchManager waits here for a slot. The
+scheduler enforces a global concurrency cap and per-model requests-per-minute
+and tokens-per-minute token buckets, serves higher priority calls first and
+round-robins between runs at the same priority so one large run cannot
+starve the others.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+    CRITICAL = 0    # planner and writer calls that gate a whole run
+    NORMAL = 1      # individual searches and email
+    BACKGROUND = 2  # speculative work nobody is waiting on
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate.
+
+    A rate of None means unlimited. The level may go negative when actual
+    usage exceeds what was reserved, which delays later callers accordingly.
+    """
+
+    def __init__(self, per_minute: float | None, capacity: float | None = None):
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else (per_minute or 0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until amount can be consumed, 0 if it can be consumed now."""
+        if not self.per_minute:
+            return 0.0
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60.0 / self.per_minute
+
+    def consume(self, amount: float) -> None:
+        if not self.per_minute:
+            return
+        self._refill()
+        self.level -= amount
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reported a rate limit."""
+        if not self.per_minute:
+            return
+        self._refill()
+        self.level = min(self.level, 0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+
+class _Waiter:
+    def __init__(self, future, model: str, run_id: str, priority: Priority, estimated_tokens: int):
+        self.future = future
+        self.model = model
+        self.run_id = run_id
+        self.priority = priority
+        self.estimated_tokens = estimated_tokens
+
+
+class Grant:
+    """Handle for a granted slot, used to report the tokens a call actually used."""
+
+    def __init__(self, scheduler, model: str, estimated_tokens: int):
+        self._scheduler = scheduler
+        self.model = model
+        self.estimated_tokens = estimated_tokens
+
+    def record_usage(self, total_tokens: int) -> None:
+        """Charge the difference between actual and estimated tokens to the model's bucket."""
+        self._scheduler._buckets_for(self.model)[1].consume(total_tokens - self.estimated_tokens)
+
+
+class ModelScheduler:
+    """Bounded, rate-limited and fair scheduler for model calls."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        model_limits: dict | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self._active = 0
+        self._queues = {priority: OrderedDict() for priority in Priority}
+        self._buckets = {}
+        self._timer = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, model, run_id: str, priority: Priority = Priority.NORMAL, estimated_tokens: int = 0):
+        """Wait for a slot for one model call and hold it for the duration of the block."""
+        model = model or "default"
+        started = time.monotonic()
+        await self._acquire(model, run_id, priority, estimated_tokens)
+        self.total_wait_seconds += time.monotonic() - started
+        try:
+            yield Grant(self, model, estimated_tokens)
+        except Exception as e:
+            if type(e).__name__ == "RateLimitError":
+                # The provider disagrees with our accounting: back off this model
+                self.rate_limited += 1
+                for bucket in self._buckets_for(model):
+                    bucket.drain()
+            raise
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": sum(len(q) for runs in self._queues.values() for q in runs.values()),
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+    async def _acquire(self, model: str, run_id: str, priority: Priority, estimated_tokens: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(future, model, run_id, priority, estimated_tokens)
+        self._queues[priority].setdefault(run_id, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before we were cancelled: hand the slot back
+                self._active -= 1
+                self._dispatch()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        runs = self._queues[waiter.priority]
+        queue = runs.get(waiter.run_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del runs[waiter.run_id]
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        next_delay = None
+        progress = True
+        while progress and self._active < self.max_concurrency:
+            progress = False
+            # Models already blocked for a higher priority caller stay blocked for lower ones
+            blocked_models = set()
+            for priority in Priority:
+                runs = self._queues[priority]
+                for run_id in list(runs):
+                    if self._active >= self.max_concurrency:
+                        return
+                    queue = runs[run_id]
+                    waiter = queue[0]
+                    if waiter.model in blocked_models:
+                        continue
+                    delay = self._delay_for(waiter)
+                    if delay > 0:
+                        blocked_models.add(waiter.model)
+                        next_delay = delay if next_delay is None else min(next_delay, delay)
+                        continue
+                    queue.popleft()
+                    if queue:
+                        runs.move_to_end(run_id)
+                    else:
+                        del runs[run_id]
+                    self._grant(waiter)
+                    progress = True
+
+        if next_delay is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_delay, self._dispatch)
+
+    def _delay_for(self, waiter: _Waiter) -> float:
+        requests, tokens = self._buckets_for(waiter.model)
+        return max(requests.delay_for(1), tokens.delay_for(waiter.estimated_tokens))
+
+    def _grant(self, waiter: _Waiter) -> None:
+        requests, tokens = self._buckets_for(waiter.model)
+        requests.consume(1)
+        tokens.consume(waiter.estimated_tokens)
+        self._active += 1
+        self.granted += 1
+        waiter.future.set_result(None)
+
+    def _buckets_for(self, model: str) -> tuple:
+        if model not in self._buckets:
+            limits = self.model_limits.get(model, {})
+            self._buckets[model] = (
+                TokenBucket(limits.get("rpm", self.requests_per_minute)),
+                TokenBucket(limits.get("tpm", self.tokens_per_minute)),
+            )
+        return self._buckets[model]
+
+
+def _env_number(name: str) -> float | None:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+_scheduler = None
+
+
+def get_scheduler() -> ModelScheduler:
+    """Return the process-wide scheduler, configured from the environment."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ModelScheduler(
+            max_concurrency=int(os.environ.get("SCHEDULER_MAX_CONCURRENCY", "16")),
+            requests_per_minute=_env_number("SCHEDULER_REQUESTS_PER_MINUTE"),
+            tokens_per_minute=_env_number("SCHEDULER_TOKENS_PER_MINUTE"),
+            model_limits=json.loads(os.environ.get("SCHEDULER_MODEL_LIMITS") or "{}"),
+        )
+    return _scheduler
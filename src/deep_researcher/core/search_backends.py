@@ -0,0 +1,106 @@
+"""Search backends the search agent can use, selected per domain.
+
+A domain picks its backend in an optional ``search`` section:
+
+    "search": {
+        "backend": "corpus",            # "web" (default) or "corpus"
+        "corpus_dir": "data/fares",     # documents to index, relative to the working directory
+        "index_dir": "data/.fares-index",  # optional, defaults to <corpus_dir>/.index
+        "top_k": 5,                     # passages returned per search
+        "passage_words": 120,
+    }
+
+"web" gives the searcher OpenAI's hosted WebSearchTool. "corpus" gives it a
+search_documents function tool answering from a local BM25 index (see
+corpus_index.py), so searches need no external round trip.
+"""
+import asyncio
+
+from agents import WebSearchTool, function_tool
+
+from ..agents.search_agent import CORPUS_INSTRUCTIONS
+from .corpus_index import DEFAULT_PASSAGE_WORDS, get_corpus_index
+
+WEB = "web"
+CORPUS = "corpus"
+SEARCH_BACKENDS = (WEB, CORPUS)
+DEFAULT_TOP_K = 5
+
+
+def search_settings(domain_config: dict | None) -> dict:
+    settings = {"backend": WEB, "top_k": DEFAULT_TOP_K, "passage_words": DEFAULT_PASSAGE_WORDS}
+    settings.update((domain_config or {}).get("search", {}))
+    return settings
+
+
+def validate_search_settings(settings: dict) -> str | None:
+    """The problem with a domain's search section, or None if it is valid."""
+    backend = settings.get("backend", WEB)
+    if backend not in SEARCH_BACKENDS:
+        return f"unknown search backend '{backend}' (expected one of {', '.join(SEARCH_BACKENDS)})"
+    if backend == CORPUS and not isinstance(settings.get("corpus_dir"), str):
+        return "'search.corpus_dir' must be a path when the search backend is 'corpus'"
+    return None
+
+
+def corpus_index_for(domain_config: dict | None):
+    """The domain's corpus index, or None when it searches the web."""
+    settings = search_settings(domain_config)
+    if settings["backend"] != CORPUS:
+        return None
+    return get_corpus_index(settings["corpus_dir"], settings.get("index_dir"), settings["passage_words"])
+
+
+def search_tools(domain_config: dict | None) -> list:
+    """The tools the domain's search agent searches with."""
+    index = corpus_index_for(domain_config)
+    if index is None:
+        return [WebSearchTool(search_context_size="low")]
+    top_k = search_settings(domain_config)["top_k"]
+
+    @function_tool
+    async def search_documents(query: str) -> str:
+        """Search the document collection and return the most relevant passages with their source files.
+
+        Args:
+            query: Keywords to search for.
+        """
+        # Scanning for changed files and scoring run off the event loop
+        passages = await asyncio.to_thread(index.search, query, top_k)
+        if not passages:
+            return "No matching passages found."
+        return "\n\n".join(f"[{passage.path}]\n{passage.text}" for passage in passages)
+
+    return [search_documents]
+
+
+def search_instructions(domain_config: dict | None, default: str) -> str:
+    """Searcher instructions for the domain's backend.
+
+    A domain's own searcher prompt replaces the default, but on the corpus
+    backend the corpus rules always come first: domain prompts are written
+    for web search and would otherwise send the agent looking for a tool it
+    doesn't have.
+    """
+    prompt = (domain_config or {}).get("agent_instructions", {}).get("searcher")
+    if search_settings(domain_config)["backend"] != CORPUS:
+        return prompt or default
+    if not prompt:
+        return CORPUS_INSTRUCTIONS
+    return (f"{CORPUS_INSTRUCTIONS}\n\nWithin those rules, follow the domain's guidance below; where it "
+            f"mentions the web, use the document collection instead:\n{prompt}")
+
+
+async def search_backend_key(domain_config: dict | None) -> str:
+    """Identifies what a search summary was made from, for the search cache key.
+
+    Corpus keys include the index generation, so summaries cached before a
+    reindex are not served afterwards. The index is refreshed first when a
+    rescan is due, so a cache hit can't stand in for a change to the corpus
+    for longer than the reindex interval.
+    """
+    index = corpus_index_for(domain_config)
+    if index is None:
+        return WEB
+    await asyncio.to_thread(index.refresh_if_stale)
+    return f"{CORPUS}:{index.corpus_dir}@{index.generation}"
@@ -0,0 +1,126 @@
+"""Two-tier cache for per-item web search summaries."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_SEARCH_TTL_SECONDS = 3600
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.lower().split())
+
+
+def make_search_key(query: str, instructions, model, backend: str = "web") -> str:
+    """Build a cache key from the normalized query, searcher instructions, model and search backend."""
+    parts = [normalize_query(query), str(instructions), str(model)]
+    # Web search keys keep their original form, so summaries cached before backends existed still hit
+    if backend != "web":
+        parts.append(backend)
+    payload = json.dumps(parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """In-memory LRU cache of search summaries with an optional SQLite tier."""
+
+    def __init__(self, max_entries: int = 1024, db_path: str | None = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached summary for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: float = DEFAULT_SEARCH_TTL_SECONDS) -> None:
+        """Store value under key for ttl seconds. A ttl of 0 disables caching."""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._db.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current in-memory size."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_search_cache = None
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache, configured from the environment."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(
+            max_entries=int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+            db_path=os.environ.get("SEARCH_CACHE_DB") or None,
+        )
+    return _search_cache
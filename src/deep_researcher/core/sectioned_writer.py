@@ -0,0 +1,100 @@
+"""Map-reduce report writing for runs with many search results.
+
+Instead of one writer call over every summary, an outline agent plans the
+report's sections and assigns search results to each. The sections are then
+written in parallel, each from its own packed subset of the results, and an
+editor adds the introduction, conclusion and summary. The slowest section,
+not the whole document, sets the report latency, and each prompt only holds
+the results its section needs.
+
+Enabled per domain through the optional ``writer`` section:
+
+    "writer": {
+        "mode": "map_reduce",            # "single" (default) writes the report in one call
+        "min_results": 8,                # fewer search results than this use the single writer
+        "max_sections": 6,
+        "section_token_budget": 3000,    # packed research per section
+        "digest_words": 60,              # words of each result the outline agent sees
+    }
+"""
+import re
+from dataclasses import dataclass, fields
+
+from ..agents.outline_agent import ReportOutline
+from ..agents.report_editor_agent import ReportEdit
+from ..agents.writer_agent import ReportData
+
+MODE_SINGLE = "single"
+MODE_MAP_REDUCE = "map_reduce"
+
+
+@dataclass(frozen=True)
+class WriterSettings:
+    mode: str = MODE_SINGLE
+    min_results: int = 8
+    max_sections: int = 6
+    section_token_budget: int = 3000
+    digest_words: int = 60
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "WriterSettings":
+        """Build settings from a domain's ``writer`` section, raising ValueError on unknown keys or modes."""
+        unknown = sorted(set(config or {}) - {field.name for field in fields(cls)})
+        if unknown:
+            raise ValueError(f"Unknown writer setting(s): {', '.join(unknown)}")
+        settings = cls(**(config or {}))
+        if settings.mode not in (MODE_SINGLE, MODE_MAP_REDUCE):
+            raise ValueError(f"Unknown writer mode '{settings.mode}' (expected '{MODE_SINGLE}' or '{MODE_MAP_REDUCE}')")
+        return settings
+
+    def use_map_reduce(self, result_count: int) -> bool:
+        return self.mode == MODE_MAP_REDUCE and result_count >= self.min_results
+
+
+def digest_results(search_results: list[str], words: int) -> str:
+    """Numbered opening excerpts of every result, enough for planning an outline."""
+    excerpts = []
+    for number, result in enumerate(search_results, start=1):
+        tokens = result.split()
+        excerpt = " ".join(tokens[:words]) + (" ..." if len(tokens) > words else "")
+        excerpts.append(f"<result {number}>\n{excerpt}\n</result {number}>")
+    return "\n\n".join(excerpts)
+
+
+def section_results(search_results: list[str], numbers: list[int]) -> list[str]:
+    """The results assigned to a section, or all of them if the outline assigned none that exist."""
+    chosen = [search_results[number - 1] for number in dict.fromkeys(numbers) if 1 <= number <= len(search_results)]
+    return chosen or search_results
+
+
+def outline_text(outline: ReportOutline) -> str:
+    return "\n".join(f"{i}. {section.heading}: {section.brief}" for i, section in enumerate(outline.sections, 1))
+
+
+def strip_heading(body: str, heading: str) -> str:
+    """Drop a leading markdown heading repeating the section heading, which section writers sometimes add."""
+    first, _, rest = body.strip().partition("\n")
+    if re.match(r"#+\s", first) and first.lstrip("#").strip().lower() == heading.strip().lower():
+        return rest.strip()
+    return body.strip()
+
+
+def assemble_markdown(outline: ReportOutline, bodies: dict, edit: ReportEdit | None = None) -> str:
+    """The report from its written sections, in outline order, framed by the editor's introduction and conclusion."""
+    parts = [f"# {outline.title}"]
+    if edit is not None:
+        parts.append(edit.introduction.strip())
+    for index, section in enumerate(outline.sections):
+        if index in bodies:
+            parts.append(f"## {section.heading}\n\n{strip_heading(bodies[index], section.heading)}")
+    if edit is not None:
+        parts.append(f"## Conclusion\n\n{edit.conclusion.strip()}")
+    return "\n\n".join(parts)
+
+
+def merge_report(outline: ReportOutline, bodies: dict, edit: ReportEdit) -> ReportData:
+    return ReportData(
+        short_summary=edit.short_summary,
+        markdown_report=assemble_markdown(outline, bodies, edit),
+        follow_up_questions=edit.follow_up_questions,
+    )
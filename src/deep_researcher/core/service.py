@@ -0,0 +1,291 @@
+"""Headless HTTP service for running research jobs concurrently.
+
+Jobs are submitted over HTTP and run as tasks on the server's event loop.
+Progress is streamed back to clients as Server-Sent Events, one event type
+per progress event: status, plan, search_started, search_completed,
+search_failed, report_progress, email_queued or email_skipped and report,
+then done. report_progress carries the text appended to the report since
+the previous one as "delta", or the whole partial report as "markdown"
+when it was rewritten, e.g. by a writer fallback.
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from .research_manager import ResearchManager
+from .domain_registry import get_domain_registry
+from .metrics import get_metrics_registry
+from .email_outbox import get_email_outbox
+from .progress import (
+    StatusUpdate, PlanReady, SearchStarted, SearchCompleted, SearchFailed, ReportProgress, ReportReady, EmailQueued,
+    EmailSkipped,
+)
+
+# How long shutdown waits for queued emails; unsent ones stay in EMAIL_OUTBOX_DB for the next start
+EMAIL_DRAIN_SECONDS = 10
+
+
+class ResearchRequest(BaseModel):
+    query: str
+    domain: str | None = None
+    refresh: bool = False
+    # Resume an earlier unfinished run for the same query from its checkpoints
+    resume: bool = True
+    # Optional per-run depth budget, see DepthBudget
+    max_seconds: float | None = None
+    max_tokens: int | None = None
+    # Hard limit on the whole run, after which it is cancelled; defaults to the domain's run_timeout_seconds
+    deadline_seconds: float | None = None
+
+
+class ResearchJob:
+    """A single research run and the progress events it has produced so far.
+
+    Report progress is not logged: the job keeps only the latest partial
+    report, and each follower is sent what was appended since its last update.
+    """
+
+    def __init__(self, job_id: str, query: str, domain: str | None):
+        self.job_id = job_id
+        self.query = query
+        self.domain = domain
+        self.events: list = []
+        self.partial_report = ""
+        self.status = "running"
+        self.error: str | None = None
+        self.task: asyncio.Task | None = None
+        self.metrics: dict = {}
+        self._changed = asyncio.Condition()
+        self._partial_version = 0
+
+    @property
+    def report(self) -> str | None:
+        """The final markdown report, once the run has produced it."""
+        for event in reversed(self.events):
+            if isinstance(event, ReportReady):
+                return event.report.markdown_report
+        return None
+
+    async def publish(self, event) -> None:
+        async with self._changed:
+            if isinstance(event, ReportProgress):
+                self.partial_report = event.markdown
+                self._partial_version += 1
+            else:
+                if isinstance(event, ReportReady):
+                    self.partial_report = ""
+                self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self, status: str, error: str | None = None) -> None:
+        async with self._changed:
+            self.status = status
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Yield (SSE event name, data) for every event from the start of the job, then new ones as they arrive."""
+        sent, version, report = 0, 0, ""
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: len(self.events) > sent or self._partial_version != version or self.status != "running"
+                )
+                pending = self.events[sent:]
+                partial, version = self.partial_report, self._partial_version
+                finished = self.status != "running"
+            # The partial report comes first: it was written before anything logged after it
+            if partial and partial != report:
+                if partial.startswith(report):
+                    yield "report_progress", {"delta": partial[len(report):]}
+                else:
+                    yield "report_progress", {"markdown": partial, "replace": True}
+                report = partial
+            for event in pending:
+                yield event_data(event)
+            sent += len(pending)
+            if finished and sent == len(self.events):
+                return
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "query": self.query,
+            "domain": self.domain,
+            "status": self.status,
+            "error": self.error,
+            "progress": [event.text for event in self.events
+                         if event.text is not None and not isinstance(event, (ReportReady, EmailQueued, EmailSkipped))],
+            "report": self.report,
+            "metrics": self.metrics,
+        }
+
+
+def event_data(event) -> tuple[str, dict]:
+    """The SSE event name and JSON data for a progress event other than ReportProgress."""
+    if isinstance(event, StatusUpdate):
+        return "status", {"message": event.message}
+    if isinstance(event, PlanReady):
+        return "plan", {"searches": [item.model_dump() for item in event.searches]}
+    if isinstance(event, SearchStarted):
+        return "search_started", {"query": event.query, "reason": event.reason}
+    if isinstance(event, SearchCompleted):
+        return "search_completed", {"query": event.query, "summary": event.summary,
+                                    "seconds": round(event.seconds, 3), "source": event.source}
+    if isinstance(event, SearchFailed):
+        return "search_failed", {"query": event.query, "error": event.error, "seconds": round(event.seconds, 3)}
+    if isinstance(event, EmailQueued):
+        return "email_queued", {}
+    if isinstance(event, EmailSkipped):
+        return "email_skipped", {"reason": event.reason}
+    if isinstance(event, ReportReady):
+        return "report", {"report": event.report.model_dump(), "cached": event.cached}
+    raise TypeError(f"Unexpected progress event {type(event).__name__}")
+
+
+class JobStore:
+    """Tracks running and recently finished jobs for the service."""
+
+    def __init__(self, max_finished_jobs: int = 256):
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: OrderedDict[str, ResearchJob] = OrderedDict()
+
+    def submit(self, request: ResearchRequest) -> ResearchJob:
+        entry = get_domain_registry().get(request.domain) if request.domain is not None else None
+        job = ResearchJob(uuid.uuid4().hex, request.query, request.domain)
+        job.task = asyncio.create_task(self._run(job, entry, request))
+        self._jobs[job.job_id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> ResearchJob | None:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job: ResearchJob) -> bool:
+        """Cancel a running job, and with it the run's in-flight work unless other jobs share it."""
+        if job.status != "running" or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def _run(self, job: ResearchJob, entry, request: ResearchRequest) -> None:
+        # Each job gets its own manager; agents are shared per domain through the registry
+        if entry is None:
+            manager = ResearchManager()
+        else:
+            manager = ResearchManager(domain_config=entry.config, agents=entry.agents)
+        try:
+            budget = manager.depth_budget(max_seconds=request.max_seconds, max_tokens=request.max_tokens)
+            async for event in manager.run_events(job.query, refresh=request.refresh, budget=budget,
+                                                  resume=request.resume, deadline_seconds=request.deadline_seconds):
+                await job.publish(event)
+            job.metrics = manager.metrics.summary()
+            await job.finish("completed")
+        except asyncio.CancelledError:
+            job.metrics = manager.metrics.summary()
+            await job.finish("cancelled")
+            raise
+        except Exception as e:
+            print(f"Research job {job.job_id} failed: {e}")
+            job.metrics = manager.metrics.summary()
+            await job.finish("failed", str(e))
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status != "running"]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(max_finished_jobs: int = 256) -> FastAPI:
+    """Create the ASGI application serving the research API."""
+    @asynccontextmanager
+    async def lifespan(app):
+        get_email_outbox().start()
+        yield
+        await get_email_outbox().drain(timeout=EMAIL_DRAIN_SECONDS)
+        await get_email_outbox().stop()
+
+    app = FastAPI(title="Deep Researcher", lifespan=lifespan)
+    jobs = JobStore(max_finished_jobs=max_finished_jobs)
+
+    def get_job(job_id: str) -> ResearchJob:
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+        return job
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(get_metrics_registry().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/domains")
+    async def domains():
+        return [
+            {"name": entry.name, "display_name": entry.config["display_name"],
+             "description": entry.config["description"], "examples": entry.config["ui"].get("examples", [])}
+            for entry in get_domain_registry().entries()
+        ]
+
+    @app.post("/research", status_code=202)
+    async def submit_research(request: ResearchRequest):
+        try:
+            job = jobs.submit(request)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return {"job_id": job.job_id, "events_url": f"/research/{job.job_id}/events"}
+
+    @app.get("/research/{job_id}")
+    async def research_status(job_id: str):
+        return get_job(job_id).to_dict()
+
+    @app.delete("/research/{job_id}")
+    async def cancel_research(job_id: str):
+        job = get_job(job_id)
+        return {"job_id": job_id, "cancelled": jobs.cancel(job)}
+
+    @app.get("/research/{job_id}/events")
+    async def research_events(job_id: str):
+        job = get_job(job_id)
+
+        async def stream():
+            async for event, data in job.follow():
+                yield _sse(event, data)
+            yield _sse("done", {"status": job.status, "error": job.error})
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    """Main entry point for the research service."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Deep Researcher HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    print(f"Serving research API on http://{args.host}:{args.port}")
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
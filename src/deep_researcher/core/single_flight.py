@@ -0,0 +1,162 @@
+"""Coalescing of identical concurrent work.
+
+SingleFlight.do() runs one coroutine per key at a time. Concurrent callers
+with the same key await the same task. SingleFlight.stream() does the same
+for async generators. The first caller's generator runs in a background
+task, and every caller gets its full output from the start, including
+callers that join late.
+
+The shared work runs in its own task behind asyncio.shield. A caller that
+is cancelled or stops iterating only detaches itself, and the work keeps
+going for the others. Once the last caller has gone, the work is cancelled.
+"""
+import asyncio
+
+
+class Broadcast:
+    """Every item produced by one shared generator, replayable by any number of followers.
+
+    Publishing never awaits, so a cancelled flight is always interrupted
+    inside its generator and the generator's own cleanup runs.
+    """
+
+    def __init__(self, on_abandoned=None):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.followers = 0
+        self._on_abandoned = on_abandoned
+        self._updated = asyncio.Event()
+
+    def publish(self, item) -> None:
+        self.items.append(item)
+        self._wake()
+
+    def close(self, error: BaseException | None = None) -> None:
+        self.finished = True
+        self.error = error
+        self._wake()
+
+    def _wake(self) -> None:
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def follow(self, deadline: float | None = None):
+        """Yield every item from the start, then new ones as they arrive; re-raise the generator's error.
+
+        deadline is an event loop time after which waiting for the next item
+        raises TimeoutError. Close the generator (e.g. with contextlib.aclosing)
+        when stopping early, so an abandoned flight is cancelled right away.
+        """
+        self.followers += 1
+        sent = 0
+        try:
+            while True:
+                if len(self.items) == sent and not self.finished:
+                    async with asyncio.timeout_at(deadline):
+                        await self._updated.wait()
+                    continue
+                pending = self.items[sent:]
+                finished = self.finished
+                for item in pending:
+                    yield item
+                sent += len(pending)
+                if finished and sent == len(self.items):
+                    break
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.finished and self._on_abandoned is not None:
+                self._on_abandoned()
+        if self.error is not None:
+            raise self.error
+
+
+class _Flight:
+    def __init__(self, task, broadcast=None):
+        self.task = task
+        self.broadcast = broadcast
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent work by key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key, make_coro):
+        """Await make_coro() or the identical call already in flight; returns (result, shared)."""
+        flight = self._calls.get(key)
+        if flight is not None and flight.task.done():
+            flight = None
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(make_coro()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._abandon(self._calls, key, flight)
+
+    def stream(self, key, make_generator) -> tuple[Broadcast, bool]:
+        """Start make_generator(publish) in the background, or join the identical one in flight.
+
+        Besides yielding items, the generator may hand publish to work it
+        starts, e.g. tasks reporting their own progress. Returns
+        (broadcast, shared); iterate broadcast.follow() for the items.
+        """
+        flight = self._streams.get(key)
+        if flight is not None and not flight.broadcast.finished:
+            return flight.broadcast, True
+        broadcast = Broadcast(on_abandoned=lambda: self._abandon(self._streams, key, flight))
+        flight = _Flight(asyncio.ensure_future(self._pump(make_generator(broadcast.publish), broadcast)), broadcast)
+        self._streams[key] = flight
+        flight.task.add_done_callback(lambda _: self._forget(self._streams, key, flight))
+        return broadcast, False
+
+    async def _pump(self, generator, broadcast: Broadcast) -> None:
+        try:
+            async for item in generator:
+                broadcast.publish(item)
+        except BaseException as e:
+            broadcast.close(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            broadcast.close()
+
+    def _abandon(self, flights: dict, key, flight: _Flight) -> None:
+        """Cancel work nobody is waiting for; a new caller starts it afresh."""
+        if flights.get(key) is flight:
+            del flights[key]
+        flight.task.cancel()
+
+    @staticmethod
+    def _forget(flights: dict, key, flight: _Flight) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+        # A failed task may have no one left awaiting it; mark its exception as retrieved
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+
+_run_flights = SingleFlight()
+_search_flights = SingleFlight()
+
+
+def get_run_flights() -> SingleFlight:
+    """Process-wide coalescing of identical research runs."""
+    return _run_flights
+
+
+def get_search_flights() -> SingleFlight:
+    """Process-wide coalescing of identical searches, within and across runs."""
+    return _search_flights
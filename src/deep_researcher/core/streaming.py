@@ -0,0 +1,74 @@
+"""Helpers for surfacing structured agent output while it is still being generated."""
+import json
+import re
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def is_model_output(event) -> bool:
+    """Whether a Runner.run_streamed event comes from the model, rather than the SDK announcing the agent."""
+    return event.type == "raw_response_event"
+
+
+class JsonStringFieldStream:
+    """Incrementally decode one string field out of a JSON object being streamed.
+
+    Agents with a structured output type stream their answer as JSON text.
+    Feeding the raw text deltas to this class returns the newly decoded
+    characters of the requested field, so e.g. the markdown report can be
+    shown before the whole ReportData object has been generated.
+    """
+
+    def __init__(self, field: str):
+        self._start_pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._position = None
+        self.done = False
+        self.value = ""
+
+    def feed(self, delta: str) -> str:
+        """Add a chunk of raw JSON text and return any newly decoded field text."""
+        self._buffer += delta
+        if self.done:
+            return ""
+        if self._position is None:
+            match = self._start_pattern.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        decoded = []
+        buffer, i = self._buffer, self._position
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != '\\':
+                decoded.append(char)
+                i += 1
+                continue
+            # Escape sequences may be split across deltas: wait for the rest
+            if i + 1 >= len(buffer):
+                break
+            code = buffer[i + 1]
+            if code == 'u':
+                # A high surrogate is only decodable together with the low surrogate after it
+                length = 12 if i + 6 <= len(buffer) and _is_high_surrogate(buffer[i + 2:i + 6]) else 6
+                if i + length > len(buffer):
+                    break
+                decoded.append(json.loads(f'"{buffer[i:i + length]}"'))
+                i += length
+                continue
+            decoded.append(_ESCAPES.get(code, code))
+            i += 2
+
+        self._position = i
+        text = "".join(decoded)
+        self.value += text
+        return text
+
+
+def _is_high_surrogate(hex_digits: str) -> bool:
+    return 0xD800 <= int(hex_digits, 16) <= 0xDBFF
@@ -47,5 +47,19 @@ DOMAIN_CONFIG = {
             "- Best value assessment "
             "Use markdown formatting with clear sections and comparison tables."
         )
+    },
+    
+    "cache": {
+        # Fares and availability move daily
+        "search_ttl_seconds": 6 * 3600,
+        "report_ttl_seconds": 6 * 3600,
+        # Minimum character n-gram similarity for reusing a report from a reworded query
+        "similarity_threshold": 0.85
+    },
+    
+    "email": {
+        # "local" renders the report to HTML without a model call; "llm" uses the email agent
+        "mode": "local",
+        "footer": "Cruise Finder - prices and availability change quickly, confirm with the cruise line before booking."
     }
 }
\ No newline at end of file
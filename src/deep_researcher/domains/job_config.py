@@ -48,5 +48,19 @@ DOMAIN_CONFIG = {
             "- Job search strategy tips "
             "Use markdown formatting with clear sections and data tables."
         )
+    },
+    
+    "cache": {
+        # Job postings and salary data change slowly
+        "search_ttl_seconds": 12 * 3600,
+        "report_ttl_seconds": 24 * 3600,
+        # Minimum character n-gram similarity for reusing a report from a reworded query
+        "similarity_threshold": 0.85
+    },
+    
+    "email": {
+        # "local" renders the report to HTML without a model call; "llm" uses the email agent
+        "mode": "local",
+        "footer": "Job Market Analyzer - salary figures are estimates based on public sources."
     }
 }
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# The agent modules build OpenAI clients at import time; tests never call them
+os.environ.setdefault("OPENAI_API_KEY", "test")
+# Runs under test open traces, which would otherwise be exported to OpenAI
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+# Keep the default checkpoint and outbox files out of the home directory
+os.environ.setdefault("DEEP_RESEARCHER_DATA_DIR", tempfile.mkdtemp(prefix="deep_researcher_"))
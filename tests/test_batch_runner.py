@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from deep_researcher.agents.writer_agent import ReportData
+from deep_researcher.core.batch_runner import BatchRunner, load_completed, record_key
+from deep_researcher.core.metrics import NullRunMetrics
+
+
+class FakeManager:
+    """Researches a query instantly, failing for queries in `failing`."""
+
+    def __init__(self, researched: list, failing: set):
+        self.researched = researched
+        self.failing = failing
+        self.report = None
+        self.metrics = NullRunMetrics()
+
+    def depth_budget(self, **limits):
+        return None
+
+    async def run(self, query, **options):
+        self.researched.append(query)
+        yield f"Researching {query}"
+        if query in self.failing:
+            raise ConnectionError("search backend down")
+        self.report = ReportData(short_summary=query, markdown_report=f"# {query}", follow_up_questions=[])
+
+
+@pytest.fixture
+def batch(tmp_path):
+    researched, failing = [], set()
+
+    def run(lines):
+        input_path = tmp_path / "queries.jsonl"
+        input_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        runner = BatchRunner(tmp_path / "reports.jsonl", parallelism=2)
+        runner._manager = lambda domain: FakeManager(researched, failing)
+        asyncio.run(runner.run(input_path))
+        return runner
+
+    run.researched, run.failing, run.output = researched, failing, tmp_path / "reports.jsonl"
+    return run
+
+
+def results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_record_key():
+    assert record_key({"id": 7, "query": "q"}) == "7"
+    assert record_key({"domain": "job", "query": "q"}) == record_key({"domain": "job", "query": "q"})
+    assert record_key({"domain": "job", "query": "q"}) != record_key({"domain": "cruise", "query": "q"})
+
+
+def test_malformed_lines_fail_without_stopping_the_batch(batch):
+    runner = batch([
+        json.dumps({"query": "first"}),
+        '{"query": "cut short',
+        json.dumps({"domain": "job"}),
+        json.dumps(["not", "a", "record"]),
+        json.dumps({"query": "last"}),
+    ])
+    assert sorted(batch.researched) == ["first", "last"]
+    assert (runner.completed, runner.failed) == (2, 3)
+    failed = [result for result in results(batch.output) if result["status"] == "failed"]
+    assert sorted(result["key"] for result in failed) == ["queries.jsonl:2", "queries.jsonl:3", "queries.jsonl:4"]
+
+
+def test_rerun_resumes_with_the_records_that_did_not_complete(batch):
+    lines = [json.dumps({"id": n, "query": f"query {n}"}) for n in range(4)]
+    batch.failing.add("query 2")
+    runner = batch(lines)
+    assert (runner.completed, runner.failed) == (3, 1)
+    assert load_completed(batch.output) == {"0", "1", "3"}
+
+    batch.researched.clear()
+    batch.failing.clear()
+    runner = batch(lines)
+    assert batch.researched == ["query 2"]
+    assert load_completed(batch.output) == {"0", "1", "2", "3"}
+
+
+def test_line_cut_short_by_a_crash_is_rerun(batch):
+    batch([json.dumps({"id": "a", "query": "a"})])
+    with batch.output.open("a", encoding="utf-8") as output:
+        output.write('{"key": "b", "status": "compl')
+    batch.researched.clear()
+    batch([json.dumps({"id": "a", "query": "a"}), json.dumps({"id": "b", "query": "b"})])
+    assert batch.researched == ["b"]
+    assert json.loads(batch.output.read_text(encoding="utf-8").splitlines()[-1])["key"] == "b"
@@ -0,0 +1,144 @@
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from deep_researcher.core import checkpoints as checkpoints_module
+from deep_researcher.core.checkpoints import PLAN, REPORT, SEARCH, CheckpointStore, get_checkpoint_store
+
+DOMAIN = "job"
+QUERY = "Senior Python developer remote jobs in Germany"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(checkpoints_module, "time", clock)
+    return clock
+
+
+def test_artifacts_round_trip():
+    store = CheckpointStore()
+    store.start_run("run", DOMAIN, QUERY)
+    store.save("run", PLAN, "", {"searches": ["a", "b"]})
+    store.save("run", SEARCH, "a", "Summary of a")
+    store.save("run", SEARCH, "a", "Newer summary of a")
+    assert store.load("run") == {PLAN: {"": {"searches": ["a", "b"]}}, SEARCH: {"a": "Newer summary of a"}}
+    assert store.load("another run") == {}
+
+
+def test_unfinished_runs_are_resumable_by_normalized_query():
+    store = CheckpointStore()
+    for run_id, status in [("failed", "failed"), ("completed", "completed")]:
+        store.start_run(run_id, DOMAIN, QUERY)
+        store.finish(run_id, status)
+    assert store.find_resumable(DOMAIN, "  " + QUERY.upper()) == "failed"
+    assert store.find_resumable("cruise", QUERY) is None
+    assert store.find_resumable(DOMAIN, "Something else") is None
+
+
+@pytest.mark.parametrize("status", ["failed", "cancelled", "degraded", "prefetched"])
+def test_every_status_but_completed_is_resumable(status):
+    store = CheckpointStore()
+    store.start_run("run", DOMAIN, QUERY)
+    store.finish("run", status)
+    assert store.find_resumable(DOMAIN, QUERY) == "run"
+
+
+def test_the_most_recent_run_is_resumed(clock):
+    store = CheckpointStore()
+    for run_id in ("older", "newer"):
+        store.start_run(run_id, DOMAIN, QUERY)
+        store.finish(run_id, "failed")
+        clock.now += 1
+    assert store.find_resumable(DOMAIN, QUERY) == "newer"
+
+
+def test_running_runs_are_not_resumed():
+    store = CheckpointStore()
+    store.start_run("run", DOMAIN, QUERY)
+    assert store.find_resumable(DOMAIN, QUERY) is None
+
+
+def test_run_left_running_by_an_earlier_process_is_resumed(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    CheckpointStore(path).start_run("run", DOMAIN, QUERY)
+    # A new store is a new owner, as after a restart
+    assert CheckpointStore(path).find_resumable(DOMAIN, QUERY) == "run"
+
+
+def test_run_left_running_by_a_live_process_is_not_resumed(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    CheckpointStore(path).start_run("run", DOMAIN, QUERY)
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        for owner, resumable in [(f"{socket.gethostname()}:{other.pid}:1.0", False),
+                                 ("another-host:1:1.0", True)]:
+            store = CheckpointStore(path)
+            store._db.execute("UPDATE checkpoint_runs SET owner = ?", (owner,))
+            store._db.commit()
+            assert (store.find_resumable(DOMAIN, QUERY) == "run") is resumable
+    finally:
+        other.kill()
+        other.wait()
+    # The process has exited, so its run is resumable again
+    store._db.execute("UPDATE checkpoint_runs SET owner = ?", (f"{socket.gethostname()}:{other.pid}:1.0",))
+    assert store.find_resumable(DOMAIN, QUERY) == "run"
+
+
+def test_expire_drops_only_old_artifacts_of_the_kind(clock):
+    store = CheckpointStore()
+    store.start_run("run", DOMAIN, QUERY)
+    store.save("run", PLAN, "", "plan")
+    store.save("run", SEARCH, "old", "old summary")
+    clock.now += 100
+    store.save("run", SEARCH, "new", "new summary")
+    assert store.expire("run", SEARCH, 50) == 1
+    assert store.load("run") == {PLAN: {"": "plan"}, SEARCH: {"new": "new summary"}}
+
+
+def test_discard():
+    store = CheckpointStore()
+    store.start_run("run", DOMAIN, QUERY)
+    store.save("run", SEARCH, "a", "summary")
+    store.save("run", REPORT, "", "report")
+    store.discard("run", (REPORT,))
+    assert store.load("run") == {SEARCH: {"a": "summary"}}
+
+
+def test_old_runs_are_pruned_as_runs_start(clock):
+    store = CheckpointStore(max_age_seconds=100)
+    store.start_run("old", DOMAIN, "old query")
+    store.save("old", SEARCH, "a", "summary")
+    store.finish("old", "failed")
+    clock.now += 101
+    assert store.find_resumable(DOMAIN, "old query") is None
+    store.start_run("new", DOMAIN, QUERY)
+    assert store.stats() == {"runs": {"running": 1}, "artifacts": 0}
+
+
+def test_runs_beyond_max_runs_are_pruned(clock):
+    store = CheckpointStore(max_runs=2)
+    for index in range(4):
+        store.start_run(f"run {index}", DOMAIN, f"query {index}")
+        store.finish(f"run {index}", "failed")
+        clock.now += 1
+    assert store.find_resumable(DOMAIN, "query 0") is None
+    assert store.find_resumable(DOMAIN, "query 3") == "run 3"
+
+
+def test_default_store_is_a_file_in_the_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints_module, "_checkpoint_store", None)
+    monkeypatch.delenv("CHECKPOINT_DB", raising=False)
+    monkeypatch.setenv("DEEP_RESEARCHER_DATA_DIR", str(tmp_path / "data"))
+    assert get_checkpoint_store().db_path == str(tmp_path / "data" / "checkpoints.db")
+    assert (tmp_path / "data" / "checkpoints.db").exists()
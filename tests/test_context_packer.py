@@ -0,0 +1,50 @@
+from deep_researcher.core.context_packer import pack_search_results, resolve_token_budget
+from deep_researcher.core.metrics import MetricsRegistry, RunMetrics
+from deep_researcher.core.research_manager import ResearchManager
+
+QUERY = "Mediterranean cruise prices in June"
+
+PRICES = "Mediterranean cruise prices in June start at 899 euros for an inside cabin on a seven night sailing."
+PORTS = "Most June sailings call at Barcelona, Marseille, Genoa, Naples and Palma."
+WEATHER = "Weather along the route is warm and dry, with sea temperatures around 22 degrees."
+
+
+def test_near_duplicate_paragraphs_are_dropped():
+    packed = pack_search_results(QUERY, [f"{PRICES}\n\n{PORTS}", f"{PRICES} \n\n{WEATHER}"])
+    assert packed.duplicates_removed == 1
+    assert packed.text.count("899 euros") == 1
+    assert PORTS in packed.text and WEATHER in packed.text
+    assert packed.tokens_saved > 0
+
+
+def test_budget_keeps_the_most_relevant_paragraphs():
+    packed = pack_search_results(QUERY, [WEATHER, PORTS, PRICES], token_budget=30)
+    assert packed.dropped_for_budget == 2
+    assert packed.text == f"<result 1>\n{PRICES}\n</result 1>"
+    assert packed.packed_tokens <= packed.original_tokens
+
+
+def test_distinct_results_within_budget_are_all_kept():
+    packed = pack_search_results(QUERY, [PRICES, PORTS])
+    assert (packed.duplicates_removed, packed.dropped_for_budget) == (0, 0)
+    assert "<result 2>" in packed.text
+
+
+def test_token_budget_per_model():
+    config = {"token_budget": {"gpt-4o-mini": 4000, "default": 12000}}
+    assert resolve_token_budget(config, "gpt-4o-mini") == 4000
+    assert resolve_token_budget(config, "gpt-4.1") == 12000
+    assert resolve_token_budget({"token_budget": 6000}, "gpt-4.1") == 6000
+    assert resolve_token_budget({}, "gpt-4.1") == 8000
+
+
+def test_savings_are_recorded_in_the_run_metrics():
+    manager = ResearchManager(email_enabled=False)
+    manager.metrics = RunMetrics("run", "default", MetricsRegistry())
+    prompt = manager._writer_input(QUERY, [f"{PRICES}\n\n{PORTS}", PRICES])
+    assert prompt.count("899 euros") == 1
+
+    counters = manager.metrics.summary()["counters"]
+    assert counters["research_context_tokens_saved_total[stage=writer]"] > 0
+    assert counters["research_context_paragraphs_dropped_total[reason=duplicate,stage=writer]"] == 1
+    assert "research_context_tokens_saved_total" in manager.metrics.registry.render_prometheus()
@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+
+from deep_researcher.core.corpus_index import MAX_SEGMENTS, CorpusIndex, split_passages, tokenize
+from deep_researcher.core.search_backends import search_backend_key
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    # Make every write visible to the scan, even within one mtime tick
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = tmp_path / "corpus"
+    write(directory / "fares.md", "Lisbon to Porto train fares start at 25 euros.")
+    write(directory / "hotels" / "porto.txt", "Porto hotels near the river cost about 90 euros a night.")
+    return directory
+
+
+def open_index(corpus, **options):
+    return CorpusIndex(corpus, reindex_interval=-1, **options)
+
+
+def paths(passages):
+    return [passage.path for passage in passages]
+
+
+def test_tokenize_drops_stopwords_and_keeps_numbers():
+    assert tokenize("The fare is 25 EUR, and it's cheap") == ["fare", "25", "eur", "s", "cheap"]
+
+
+def test_split_passages_groups_paragraphs():
+    text = "one two three\n\nfour five\n\nsix"
+    assert split_passages(text, passage_words=4) == ["one two three\n\nfour five", "six"]
+
+
+def test_search_ranks_matching_passages(corpus):
+    index = open_index(corpus)
+    assert index.refresh()
+    assert paths(index.search("train fares")) == ["fares.md"]
+    assert paths(index.search("porto hotels river")) == ["hotels/porto.txt", "fares.md"]
+    assert index.search("unknown words") == []
+
+
+def test_unchanged_directory_is_not_reindexed(corpus):
+    index = open_index(corpus)
+    index.refresh()
+    generation = index.generation
+    assert not index.refresh()
+    assert index.generation == generation
+
+
+def test_changed_and_deleted_files_are_reindexed_incrementally(corpus):
+    index = open_index(corpus)
+    index.refresh()
+    generation = index.generation
+    write(corpus / "fares.md", "Lisbon to Porto buses cost 15 euros.")
+    (corpus / "hotels" / "porto.txt").unlink()
+    write(corpus / "ferries.txt", "Ferries cross the Tagus every twenty minutes.")
+    assert index.refresh()
+
+    assert index.generation == generation + 1
+    assert index.search("train") == []
+    assert paths(index.search("buses")) == ["fares.md"]
+    assert index.search("hotels river") == []
+    assert paths(index.search("ferries tagus")) == ["ferries.txt"]
+    assert index.stats()["files"] == 2 and index.stats()["passages"] == 2
+
+
+def test_many_small_updates_are_merged_into_one_segment(corpus):
+    index = open_index(corpus)
+    index.refresh()
+    for version in range(MAX_SEGMENTS + 1):
+        write(corpus / "fares.md", f"Fares version {version}" + " padding" * version)
+        index.refresh()
+        assert index.stats()["segments"] <= MAX_SEGMENTS
+    assert paths(index.search(f"version {MAX_SEGMENTS}")) == ["fares.md"]
+    assert len(list(corpus.joinpath(".index").glob("*.lex"))) == index.stats()["segments"]
+
+
+def test_index_persists_across_processes(corpus):
+    first = open_index(corpus)
+    first.refresh()
+    reopened = open_index(corpus)
+    assert reopened.generation == first.generation
+    assert paths(reopened.search("train fares")) == ["fares.md"]
+    assert not reopened.refresh()
+
+
+def test_index_dir_is_not_indexed(corpus):
+    index = open_index(corpus, index_dir=corpus / "index")
+    index.refresh()
+    index.refresh()
+    assert index.stats()["files"] == 2
+
+
+def test_search_refreshes_when_due(corpus):
+    index = CorpusIndex(corpus, reindex_interval=0)
+    assert paths(index.search("train")) == ["fares.md"]
+    write(corpus / "fares.md", "Only buses now.")
+    assert index.search("train") == []
+
+
+def test_search_backend_key_follows_corpus_changes(corpus, monkeypatch):
+    monkeypatch.setenv("CORPUS_REINDEX_INTERVAL", "0")
+    domain = {"search": {"backend": "corpus", "corpus_dir": str(corpus)}}
+    first = asyncio.run(search_backend_key(domain))
+    assert asyncio.run(search_backend_key(domain)) == first
+    # No search has run since the change, the key alone notices it
+    write(corpus / "fares.md", "Only buses now.")
+    assert asyncio.run(search_backend_key(domain)) != first
+    assert asyncio.run(search_backend_key(None)) == "web"
@@ -0,0 +1,104 @@
+import pytest
+
+from deep_researcher.core import depth_controller as depth_module
+from deep_researcher.core.depth_controller import (
+    STOP_BUDGET, STOP_COVERAGE, STOP_MAX_ROUNDS, STOP_NO_GAPS, DepthBudget, DepthController,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(depth_module, "time", clock)
+    return clock
+
+
+class Tokens:
+    def __init__(self):
+        self.used = 0
+
+    def __call__(self) -> int:
+        return self.used
+
+
+def run_round(controller, clock, tokens, size=3, seconds=10.0, spent=3000):
+    controller.start_round(size)
+    clock.now += seconds
+    tokens.used += spent
+    controller.end_round()
+
+
+def test_default_is_a_single_round_of_the_planners_searches():
+    budget = DepthBudget()
+    assert budget.initial_searches is None
+    assert budget.max_rounds == 1
+
+
+def test_default_budget_stops_after_the_first_round(clock):
+    tokens = Tokens()
+    controller = DepthController(DepthBudget(), tokens)
+    run_round(controller, clock, tokens)
+    assert not controller.should_continue()
+    assert controller.stop_reason == STOP_MAX_ROUNDS
+
+
+def test_domain_settings_and_run_overrides():
+    budget = DepthBudget.from_config({"max_rounds": 3, "initial_searches": 4}, max_seconds=60, max_tokens=None)
+    assert (budget.max_rounds, budget.initial_searches, budget.max_seconds) == (3, 4, 60)
+    assert budget.max_tokens is None
+
+
+def test_rounds_continue_until_coverage_is_reached(clock):
+    tokens = Tokens()
+    controller = DepthController(DepthBudget(max_rounds=3), tokens)
+    run_round(controller, clock, tokens)
+    assert controller.should_continue()
+    assert controller.record_assessment(0.5, proposed=2)
+    run_round(controller, clock, tokens, size=2)
+    assert controller.should_continue()
+    assert not controller.record_assessment(0.9, proposed=1)
+    assert controller.stop_reason == STOP_COVERAGE
+
+
+def test_no_proposed_searches_stops(clock):
+    tokens = Tokens()
+    controller = DepthController(DepthBudget(max_rounds=3), tokens)
+    run_round(controller, clock, tokens)
+    assert not controller.record_assessment(0.4, proposed=0)
+    assert controller.stop_reason == STOP_NO_GAPS
+
+
+def test_round_is_skipped_when_the_time_left_wont_cover_it(clock):
+    tokens = Tokens()
+    controller = DepthController(DepthBudget(max_rounds=3, max_seconds=60, reserve_seconds=30), tokens)
+    run_round(controller, clock, tokens, seconds=20)
+    # 10 seconds left before the writer's reserve, and the last round took 20
+    assert not controller.should_continue()
+    assert controller.stop_reason == STOP_BUDGET
+
+
+def test_follow_ups_are_capped_by_the_tokens_left(clock):
+    tokens = Tokens()
+    budget = DepthBudget(max_rounds=3, max_tokens=20000, reserve_tokens=8000, searches_per_round=5)
+    controller = DepthController(budget, tokens)
+    run_round(controller, clock, tokens, size=3, spent=6000)
+    # 6000 tokens left at 2000 a search
+    assert controller.should_continue()
+    assert controller.next_round_size(5) == 3
+    assert controller.next_round_size(2) == 2
+
+
+def test_overspent_budget_doesnt_cut_the_first_round_short(clock):
+    tokens = Tokens()
+    controller = DepthController(DepthBudget(max_seconds=20, reserve_seconds=30), tokens)
+    assert controller.search_deadline() is None
+    run_round(controller, clock, tokens)
+    assert controller.search_deadline() == 0.0
@@ -0,0 +1,143 @@
+import copy
+import os
+import threading
+
+import pytest
+
+from deep_researcher.core.depth_controller import DepthBudget
+from deep_researcher.core.domain_registry import DomainRegistry, validate_domain_config
+from deep_researcher.core.prefetch import PrefetchSettings
+from deep_researcher.core.resilience import ResiliencePolicy
+from deep_researcher.core.sectioned_writer import WriterSettings
+
+CONFIG = {
+    "name": "fares",
+    "display_name": "Fare Finder",
+    "description": "Train fares",
+    "ui": {"theme_color": "blue", "input_label": "Route", "input_placeholder": "Lisbon to Porto",
+           "button_text": "Search", "output_label": "Fares"},
+    "agent_instructions": {"planner": "Plan fare searches."},
+}
+
+TOML = """
+name = "fares"
+display_name = "{display_name}"
+description = "Train fares"
+
+[ui]
+theme_color = "blue"
+input_label = "Route"
+input_placeholder = "Lisbon to Porto"
+button_text = "Search"
+output_label = "Fares"
+
+[agent_instructions]
+planner = "Plan fare searches."
+"""
+
+
+def with_section(section, value):
+    config = copy.deepcopy(CONFIG)
+    config[section] = value
+    return config
+
+
+def test_valid_config_passes():
+    config = with_section("depth", {"max_rounds": 2})
+    assert validate_domain_config(config, "test") is config
+
+
+@pytest.mark.parametrize("section, value, problem", [
+    ("cache", [], "'cache' must be a mapping"),
+    ("cache", {"report_ttl": 60}, "unknown key 'report_ttl' in 'cache'"),
+    ("cache", {"report_ttl_seconds": "a day"}, "'cache.report_ttl_seconds' must be a non-negative number"),
+    ("context", {"budget": 4000}, "unknown key 'budget' in 'context'"),
+    ("email", {"mode": "smtp"}, "'email.mode' must be one of"),
+    ("models", {"summariser": "gpt-4o"}, "unknown key 'summariser' in 'models'"),
+    ("models", {"writer": {"timeout_seconds": 90}}, "'models.writer': Invalid model route"),
+    ("search", {"backend": "corpus"}, "'search.corpus_dir' must be a path"),
+    ("depth", {"max_round": 2}, "'depth': Unknown depth setting(s): max_round"),
+    ("resilience", {"quorom": 0.6}, "'resilience': Unknown resilience setting(s): quorom"),
+    ("writer", {"mode": "parallel"}, "'writer': Unknown writer mode 'parallel'"),
+    ("prefetch", {"enable": True}, "'prefetch': Unknown prefetch setting(s): enable"),
+])
+def test_invalid_sections_are_rejected(section, value, problem):
+    with pytest.raises(ValueError) as error:
+        validate_domain_config(with_section(section, value), "test")
+    assert problem in str(error.value)
+
+
+@pytest.mark.parametrize("settings", [ResiliencePolicy, DepthBudget, WriterSettings, PrefetchSettings])
+def test_settings_reject_unknown_keys(settings):
+    assert settings.from_config(None) == settings()
+    with pytest.raises(ValueError, match="typo"):
+        settings.from_config({"typo": 1})
+
+
+def test_shipped_domains_are_valid():
+    registry = DomainRegistry(reload_interval=-1)
+    assert {"cruise", "job"} <= set(registry.names())
+
+
+def write_toml(directory, display_name):
+    path = directory / "fares.toml"
+    path.write_text(TOML.format(display_name=display_name), encoding="utf-8")
+    # A new mtime for every write, however quickly they follow each other
+    mtime = path.stat().st_mtime + len(display_name)
+    os.utime(path, (mtime, mtime))
+
+
+def wait_for_rescan(registry):
+    if registry._rescanning is not None:
+        registry._rescanning.join(timeout=5)
+
+
+def test_files_are_loaded_and_reloaded_in_the_background(tmp_path):
+    write_toml(tmp_path, "Fares")
+    registry = DomainRegistry(config_dir=tmp_path, reload_interval=0)
+    assert registry.get("fares").config["display_name"] == "Fares"
+
+    write_toml(tmp_path, "Fares v2")
+    # Starts the rescan, which swaps the new entry in once it's built
+    registry.get("fares")
+    wait_for_rescan(registry)
+    assert registry.get("fares").config["display_name"] == "Fares v2"
+
+
+def test_broken_edit_keeps_the_last_good_version(tmp_path):
+    write_toml(tmp_path, "Fares")
+    registry = DomainRegistry(config_dir=tmp_path, reload_interval=-1)
+    first = registry.get("fares")
+    (tmp_path / "fares.toml").write_text(TOML.format(display_name="Broken") + "\n[depth]\nmax_round = 2\n",
+                                         encoding="utf-8")
+    registry.refresh()
+    assert registry.get("fares") is first
+
+
+def test_lookups_do_not_wait_for_a_rescan(tmp_path):
+    write_toml(tmp_path, "Fares")
+    registry = DomainRegistry(config_dir=tmp_path, reload_interval=0)
+    registry.get("fares")
+
+    release = threading.Event()
+    refresh = registry.refresh
+
+    def slow_refresh():
+        release.wait(timeout=5)
+        refresh()
+
+    registry.refresh = slow_refresh
+    try:
+        for _ in range(3):
+            assert registry.get("fares").config["display_name"] == "Fares"
+        # Only one rescan runs at a time
+        rescans = [thread for thread in threading.enumerate() if thread.name == "domain-rescan"]
+        assert rescans == [registry._rescanning]
+    finally:
+        release.set()
+        wait_for_rescan(registry)
+
+
+def test_unknown_domain():
+    with pytest.raises(ValueError, match="nowhere"):
+        DomainRegistry(reload_interval=-1).get("nowhere")
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from deep_researcher.core import email_outbox as outbox_module
+from deep_researcher.core.email_outbox import EmailOutbox, digest_email, drain_before_exit, get_email_outbox
+
+
+class Provider:
+    """Records posted emails and answers with the queued status codes, then 202."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.sent = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.sent.append(json.loads(request.content))
+        return httpx.Response(self.statuses.pop(0) if self.statuses else 202)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = Provider()
+    client = httpx.AsyncClient
+    monkeypatch.setattr(outbox_module.httpx, "AsyncClient",
+                        lambda **options: client(transport=httpx.MockTransport(provider.handle), **options))
+    return provider
+
+
+def outbox(**options):
+    return EmailOutbox(backoff_base=0, backoff_cap=0, **options)
+
+
+def send(outbox, *subjects, recipient="to@example.com"):
+    async def main():
+        for subject in subjects:
+            outbox.enqueue(subject, f"<html><body><p>{subject}</p></body></html>", recipient, "from@example.com")
+        drained = await outbox.drain(timeout=5)
+        await outbox.stop()
+        return drained
+
+    return asyncio.run(main())
+
+
+def test_queued_email_is_sent(provider):
+    box = outbox()
+    assert send(box, "Report")
+    assert len(provider.sent) == 1
+    email = provider.sent[0]
+    assert email["subject"] == "Report" and email["personalizations"][0]["to"] == [{"email": "to@example.com"}]
+    assert box.stats()["sent"] == 1
+
+
+def test_nothing_is_queued_without_a_recipient(monkeypatch):
+    monkeypatch.delenv("TO_EMAIL", raising=False)
+    assert outbox().enqueue("Report", "<p>Report</p>") is None
+
+
+def test_server_errors_are_retried(provider):
+    provider.statuses = [500, 429]
+    box = outbox()
+    assert send(box, "Report")
+    assert len(provider.sent) == 3 and box.stats()["sent"] == 1
+
+
+def test_client_errors_fail_at_once(provider):
+    provider.statuses = [400]
+    box = outbox()
+    assert send(box, "Report")
+    assert len(provider.sent) == 1 and box.stats()["failed"] == 1
+
+
+def test_retries_stop_after_max_attempts(provider):
+    provider.statuses = [503] * 5
+    box = outbox(max_attempts=2)
+    assert send(box, "Report")
+    assert len(provider.sent) == 2 and box.stats()["failed"] == 1
+
+
+def test_digest_sends_one_email_per_recipient(provider):
+    box = outbox(digest_seconds=3600)
+    assert send(box, "First", "Second")
+    assert len(provider.sent) == 1
+    assert provider.sent[0]["subject"] == "Research digest (2 reports): First; Second"
+
+
+def test_digest_email_joins_the_bodies():
+    subject, body = digest_email(["A", "B"], ["<html><body>one</body></html>", "two"])
+    assert subject == "Research digest (2 reports): A; B"
+    assert body == "<html><body>one<hr>two</body></html>"
+    assert digest_email(["A"], ["only"]) == ("A", "only")
+
+
+def test_processes_sharing_the_file_claim_each_message_once(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    first, second = outbox(db_path=path), outbox(db_path=path)
+    first.enqueue("Report", "<p>Report</p>", "to@example.com")
+    assert first._claim() is not None
+    assert second._claim() is None
+    # Restarting doesn't resend a message another process is still sending
+    assert outbox(db_path=path)._claim() is None
+
+
+def test_message_left_mid_send_is_sent_once_its_claim_expires(tmp_path, provider, monkeypatch):
+    path = str(tmp_path / "outbox.db")
+    stopped = outbox(db_path=path, timeout=0)
+    monkeypatch.setattr(outbox_module, "CLAIM_MARGIN_SECONDS", 0)
+    stopped.enqueue("Report", "<p>Report</p>", "to@example.com")
+    assert stopped._claim() is not None
+
+    box = outbox(db_path=path)
+    assert asyncio.run(box.drain(timeout=5))
+    assert len(provider.sent) == 1 and box.stats()["sent"] == 1
+
+
+def test_drain_before_exit_sends_what_is_left(provider, monkeypatch):
+    box = outbox()
+    monkeypatch.setattr(outbox_module, "_email_outbox", box)
+    box.enqueue("Report", "<p>Report</p>", "to@example.com")
+    drain_before_exit(timeout=5)
+    assert len(provider.sent) == 1 and box.stats()["sent"] == 1
+
+
+def test_default_outbox_is_a_file_in_the_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox_module, "_email_outbox", None)
+    monkeypatch.delenv("EMAIL_OUTBOX_DB", raising=False)
+    monkeypatch.setenv("DEEP_RESEARCHER_DATA_DIR", str(tmp_path))
+    assert get_email_outbox().db_path == str(tmp_path / "email_outbox.db")
@@ -0,0 +1,34 @@
+import pytest
+
+from deep_researcher.core.email_renderer import render_markdown
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/a?b=1&c=2",
+    "http://example.com",
+    "mailto:someone@example.com",
+    "HTTPS://EXAMPLE.COM",
+])
+def test_allowed_schemes_are_linked(url):
+    assert '<a href="' in render_markdown(f"See [the source]({url}).", "#000")
+
+
+@pytest.mark.parametrize("url", [
+    "javascript:alert(1)",
+    "JavaScript:alert(1)",
+    "data:text/html;base64,PHNjcmlwdD4=",
+    "vbscript:msgbox(1)",
+    "java&#x09;script:alert(1)",
+    "//example.com/a",
+    "relative/path",
+])
+def test_other_links_render_as_text(url):
+    rendered = render_markdown(f"See [the source]({url}).", "#000")
+    assert "<a " not in rendered
+    assert "the source" in rendered
+
+
+def test_link_text_is_still_escaped():
+    rendered = render_markdown("[<b>x</b>](javascript:alert(1))", "#000")
+    assert "<b>" not in rendered
+    assert "&lt;b&gt;x&lt;/b&gt;" in rendered
@@ -0,0 +1,141 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from deep_researcher.agents.planner_agent import WebSearchItem
+from deep_researcher.core import model_router as router_module
+from deep_researcher.core.checkpoints import CheckpointStore
+from deep_researcher.core.model_router import ModelRouter, Route, parse_route
+from deep_researcher.core.research_manager import ResearchManager
+from deep_researcher.core.search_cache import SearchCache, make_search_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(router_module, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize("value, route", [
+    (None, None),
+    ([], None),
+    ("gpt-4o", Route(("gpt-4o",))),
+    (["gpt-4.1", "gpt-4o"], Route(("gpt-4.1", "gpt-4o"))),
+    ({"models": "gpt-4o", "timeout_seconds": 90}, Route(("gpt-4o",), timeout_seconds=90)),
+    ({"models": ["a", "b"], "max_p95_seconds": 60}, Route(("a", "b"), max_p95_seconds=60)),
+])
+def test_parse_route(value, route):
+    assert parse_route(value) == route
+
+
+@pytest.mark.parametrize("value", [{"timeout_seconds": 90}, 42])
+def test_invalid_routes_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_route(value)
+
+
+def test_domain_routes_override_process_defaults_and_the_agents_model():
+    router = ModelRouter(default_routes={"searcher": "default-model", "writer": "default-writer"})
+    domain = {"models": {"searcher": ["domain-model", "fallback"]}}
+    assert router.route("searcher", domain, "agent-model").models == ("domain-model", "fallback")
+    assert router.route("writer", domain, "agent-model").models == ("default-writer",)
+    assert router.route("planner", domain, "agent-model").models == ("agent-model",)
+
+
+def test_failing_model_cools_down_then_recovers(clock):
+    router = ModelRouter(error_threshold=0.5, min_samples=4, cooldown_seconds=30)
+    route = Route(("primary", "fallback"))
+    for ok in (True, False, True):
+        router.record("primary", 1.0, ok=ok)
+    assert router.candidates(route) == ["primary", "fallback"]
+    router.record("primary", 1.0, ok=False)
+    assert router.candidates(route) == ["fallback", "primary"]
+    assert router.stats()["primary"]["cooling_down"]
+
+    clock.now += 31
+    assert router.candidates(route) == ["primary", "fallback"]
+
+
+def test_errors_below_min_samples_do_not_cool_down(clock):
+    router = ModelRouter(min_samples=5)
+    for _ in range(4):
+        router.record("primary", 1.0, ok=False)
+    assert router.candidates(Route(("primary", "fallback"))) == ["primary", "fallback"]
+
+
+def test_slow_model_is_tried_after_healthy_ones(clock):
+    router = ModelRouter(min_samples=3)
+    route = Route(("slow", "fast"), max_p95_seconds=10)
+    for _ in range(3):
+        router.record("slow", 20.0, ok=True)
+        router.record("fast", 1.0, ok=True)
+    assert router.candidates(route) == ["fast", "slow"]
+    # Without a latency limit the route's order stands
+    assert router.candidates(Route(("slow", "fast"))) == ["slow", "fast"]
+
+
+def test_p95_ignores_failed_calls():
+    router = ModelRouter()
+    router.record("model", 100.0, ok=False)
+    for seconds in range(1, 21):
+        router.record("model", float(seconds), ok=True)
+    assert router.stats()["model"]["p95_seconds"] == 19.0
+
+
+def fallback_manager(router, search_cache):
+    manager = ResearchManager({"name": "jobs", "models": {"searcher": ["primary", "fallback"]}},
+                              email_enabled=False, search_cache=search_cache, router=router,
+                              checkpoints=CheckpointStore())
+    calls = []
+
+    async def run_agent_on(agent, input, stage, priority, expected_output_tokens, timeout):
+        calls.append(agent.model)
+        ok = agent.model != "primary"
+        router.record(agent.model, 1.0, ok=ok)
+        if not ok:
+            raise ConnectionError("primary down")
+        return SimpleNamespace(final_output=f"Summary by {agent.model}", last_agent=agent)
+
+    manager._run_agent_on = run_agent_on
+    return manager, calls
+
+
+def test_search_falls_back_and_is_cached_under_the_serving_model():
+    router, cache = ModelRouter(), SearchCache()
+    manager, calls = fallback_manager(router, cache)
+    item = WebSearchItem(query="python jobs germany", reason="r")
+    summary = asyncio.run(manager._search_uncached(item, "web"))
+    assert summary == "Summary by fallback" and calls == ["primary", "fallback"]
+
+    instructions = manager.agents.searcher.instructions
+    assert cache.get(make_search_key(item.query, instructions, "fallback", "web")) == summary
+    assert cache.get(make_search_key(item.query, instructions, "primary", "web")) is None
+
+
+def test_cached_fallback_summary_is_used_only_while_the_fallback_serves(clock):
+    router, cache = ModelRouter(min_samples=1, cooldown_seconds=30), SearchCache()
+    manager, calls = fallback_manager(router, cache)
+    item = WebSearchItem(query="python jobs germany", reason="r")
+
+    async def find():
+        manager.run_id = "run"
+        return await manager._find_summary(item)
+
+    assert asyncio.run(find()) == ("Summary by fallback", "search")
+    # The primary is cooling down, so the fallback's summary is served from the cache
+    assert asyncio.run(find()) == ("Summary by fallback", "cache")
+    assert calls == ["primary", "fallback"]
+
+    clock.now += 31
+    asyncio.run(find())
+    assert calls == ["primary", "fallback", "primary", "fallback"]
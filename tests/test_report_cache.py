@@ -0,0 +1,74 @@
+import pytest
+
+from deep_researcher.agents.writer_agent import ReportData
+from deep_researcher.core.report_cache import ReportCache
+
+
+def report(summary: str) -> ReportData:
+    return ReportData(short_summary=summary, markdown_report=f"# {summary}", follow_up_questions=[])
+
+
+@pytest.fixture
+def cache():
+    cache = ReportCache()
+    cache.set("jobs", "Senior Python developer remote jobs in Germany", report("senior"))
+    cache.set("cruise", "7-day Caribbean cruise under $2000 departing from Miami", report("caribbean"))
+    return cache
+
+
+@pytest.mark.parametrize("domain, query", [
+    ("jobs", "senior python developer remote jobs in germany"),
+    ("jobs", "I want senior Python developer remote jobs in Germany"),
+    ("jobs", "Senior Python developer remote job in Germany"),
+    ("jobs", "Germany remote jobs, senior Python developer"),
+    ("cruise", "7-day Caribean cruise < $2000 departing from Miami"),
+])
+def test_rephrasings_and_typos_hit(cache, domain, query):
+    assert cache.get(domain, query) is not None
+
+
+@pytest.mark.parametrize("domain, query", [
+    ("jobs", "Junior Python developer remote jobs in Germany"),
+    ("jobs", "Senior Java developer remote jobs in Germany"),
+    ("jobs", "Senior Python developer remote jobs in Austria"),
+    ("jobs", "Senior Python developer onsite jobs in Germany"),
+    ("jobs", "Senior Python developer remote jobs in Germany for startups"),
+    ("jobs", "Senior Python developer jobs in Germany"),
+    ("cruise", "7-day Caribbean cruise under $3000 departing from Miami"),
+    ("cruise", "10-day Caribbean cruise under $2000 departing from Miami"),
+    ("cruise", "7-day Caribbean cruise under $2000 departing from Tampa"),
+    ("jobs", "7-day Caribbean cruise under $2000 departing from Miami"),
+])
+def test_queries_with_different_meanings_miss(cache, domain, query):
+    # Even a loose similarity threshold must not serve a report for a different question
+    assert cache.get(domain, query) is None
+    assert cache.get(domain, query, threshold=0.5) is None
+
+
+@pytest.mark.parametrize("query", [
+    "Senior Python develper remote jobs in Germany",
+    "Senior Python developer remote jobs in Germnay",
+])
+def test_typos_in_longer_words_pass_the_word_check(cache, query):
+    assert cache.get("jobs", query, threshold=0.75) is not None
+
+
+def test_expired_reports_are_not_served(cache):
+    assert cache.get("jobs", "Senior Python developer remote jobs in Germany", max_age=-1) is None
+
+
+def test_returns_copies(cache):
+    first = cache.get("jobs", "Senior Python developer remote jobs in Germany")
+    first.short_summary = "changed"
+    assert cache.get("jobs", "Senior Python developer remote jobs in Germany").short_summary == "senior"
+
+
+def test_evicts_least_recently_used():
+    cache = ReportCache(max_entries=2)
+    cache.set("jobs", "data engineer salaries", report("a"))
+    cache.set("jobs", "machine learning engineer salaries", report("b"))
+    cache.get("jobs", "data engineer salaries")
+    cache.set("jobs", "frontend developer salaries", report("c"))
+    assert cache.get("jobs", "data engineer salaries") is not None
+    assert cache.get("jobs", "machine learning engineer salaries") is None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,24 @@
+from deep_researcher.core.research_agents import build_research_agents
+
+
+def test_models_are_read_when_agents_are_built(monkeypatch):
+    # As when main() loads .env after the agent modules were imported
+    monkeypatch.setenv("OPENAI_MEDIUM_MODEL", "medium-model")
+    monkeypatch.setenv("OPENAI_SMALL_MODEL", "small-model")
+    agents = build_research_agents()
+    assert agents.planner.model == agents.searcher.model == agents.writer.model == "medium-model"
+    assert agents.gap_checker.model == agents.editor.model == agents.email.model == "small-model"
+
+
+def test_small_model_falls_back_to_the_medium_one(monkeypatch):
+    monkeypatch.setenv("OPENAI_MEDIUM_MODEL", "medium-model")
+    monkeypatch.delenv("OPENAI_SMALL_MODEL", raising=False)
+    agents = build_research_agents()
+    assert agents.gap_checker.model == agents.editor.model == "medium-model"
+    assert agents.email.model == "gpt-4o-mini"
+
+
+def test_domain_instructions_do_not_touch_the_templates():
+    agents = build_research_agents({"agent_instructions": {"planner": "Plan cruises."}})
+    assert agents.planner.instructions == "Plan cruises."
+    assert build_research_agents().planner.instructions != "Plan cruises."
@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+from deep_researcher.agents.gap_check_agent import CoverageAssessment
+from deep_researcher.agents.planner_agent import WebSearchItem, WebSearchPlan
+from deep_researcher.agents.writer_agent import ReportData
+from deep_researcher.core.checkpoints import CheckpointStore
+from deep_researcher.core.model_router import ModelRouter
+from deep_researcher.core.progress import ReportReady, SearchCompleted, SearchFailed, StatusUpdate
+from deep_researcher.core.report_cache import ReportCache
+from deep_researcher.core.research_manager import ResearchManager
+from deep_researcher.core.scheduler import ModelScheduler
+from deep_researcher.core.search_cache import SearchCache
+
+QUERY = "Senior Python developer remote jobs in Germany"
+SEARCHES = ["python jobs germany", "remote python salaries", "senior python hiring"]
+
+
+class Stubs:
+    """Stands in for the model calls of a ResearchManager: searches fail until told otherwise."""
+
+    def __init__(self):
+        self.failing = set(SEARCHES)
+        self.hanging = set()
+        self.searched = []
+        self.reports = 0
+        self.writer_failures = 0
+        self.plan_counts = []
+        self.gap_checks = 0
+        self.coverage = 1.0
+        self.follow_ups = []
+
+    def install(self, manager: ResearchManager) -> ResearchManager:
+        async def plan_searches(query, count=None):
+            self.plan_counts.append(count)
+            return WebSearchPlan(searches=[WebSearchItem(query=search, reason="r") for search in SEARCHES])
+
+        async def search_uncached(item, backend):
+            self.searched.append(item.query)
+            if item.query in self.hanging:
+                await asyncio.Event().wait()
+            if item.query in self.failing:
+                raise ConnectionError("search backend down")
+            return f"Summary of {item.query}"
+
+        async def check_gaps(query, results):
+            self.gap_checks += 1
+            return CoverageAssessment(coverage=self.coverage, gaps=[], searches=[
+                WebSearchItem(query=search, reason="gap") for search in self.follow_ups
+            ])
+
+        async def stream_report(query, results):
+            self.reports += 1
+            if self.writer_failures:
+                self.writer_failures -= 1
+                raise RuntimeError("writer down")
+            yield ReportData(short_summary=f"{len(results)} results", markdown_report=f"# {len(results)} results",
+                             follow_up_questions=[])
+
+        manager.plan_searches = plan_searches
+        manager._search_uncached = search_uncached
+        manager.check_gaps = check_gaps
+        manager.stream_report = stream_report
+        return manager
+
+
+@pytest.fixture
+def stores():
+    return {"search_cache": SearchCache(), "report_cache": ReportCache(), "checkpoints": CheckpointStore(),
+            "scheduler": ModelScheduler(), "router": ModelRouter()}
+
+
+def research(stores, stubs, query=QUERY, domain_config=None, **options):
+    async def main():
+        manager = stubs.install(ResearchManager(domain_config, email_enabled=False, coalesce=False, **stores))
+        return [event async for event in manager.run_events(query, **options)]
+    return asyncio.run(main())
+
+
+def resumed(events) -> bool:
+    return any(isinstance(event, StatusUpdate) and event.message.startswith("Resuming") for event in events)
+
+
+def run_statuses(checkpoints: CheckpointStore) -> dict:
+    return checkpoints.stats()["runs"]
+
+
+def test_report_without_search_results_is_served_but_not_cached(stores):
+    stubs = Stubs()
+    events = research(stores, stubs)
+    assert sum(isinstance(event, SearchFailed) for event in events) == 3
+    assert isinstance(events[-1], ReportReady) and not events[-1].cached
+    assert run_statuses(stores["checkpoints"]) == {"degraded": 1}
+
+    # A near-identical query researches again rather than being served the empty report
+    stubs.failing.clear()
+    events = research(stores, stubs, QUERY.lower() + "?")
+    assert sum(isinstance(event, SearchCompleted) for event in events) == 3
+    assert not events[-1].cached
+    assert events[-1].report.short_summary == "3 results"
+    assert stubs.reports == 2
+
+
+def test_degraded_run_is_resumed_with_a_new_report(stores):
+    stubs = Stubs()
+    stubs.failing = {SEARCHES[0]}
+    research(stores, stubs)
+    assert run_statuses(stores["checkpoints"]) == {"completed": 1}
+
+    stubs = Stubs()
+    research(stores, stubs, "Junior Python developer remote jobs in Germany")
+    assert run_statuses(stores["checkpoints"]) == {"completed": 1, "degraded": 1}
+
+    stubs.failing.clear()
+    events = research(stores, stubs, "Junior Python developer remote jobs in Germany")
+    assert resumed(events)
+    assert events[-1].report.short_summary == "3 results"
+    assert run_statuses(stores["checkpoints"]) == {"completed": 2}
+
+
+def test_report_with_some_results_is_cached(stores):
+    stubs = Stubs()
+    stubs.failing = {SEARCHES[0]}
+    research(stores, stubs)
+    events = research(stores, Stubs())
+    assert [type(event) for event in events] == [StatusUpdate, ReportReady]
+    assert events[-1].cached and events[-1].report.short_summary == "2 results"
+
+
+def test_report_without_the_searches_a_quorum_cut_off_is_not_cached(stores):
+    quorum = {"name": "jobs", "resilience": {"quorum": 0.6, "quorum_after_seconds": 0.05}}
+    stubs = Stubs()
+    stubs.failing.clear()
+    stubs.hanging = {SEARCHES[2]}
+    events = research(stores, stubs, domain_config=quorum)
+    assert events[-1].report.short_summary == "2 results"
+    assert run_statuses(stores["checkpoints"]) == {"degraded": 1}
+
+    stubs.hanging.clear()
+    events = research(stores, stubs, domain_config=quorum)
+    assert not events[-1].cached
+    assert events[-1].report.short_summary == "3 results"
+    # Resumed: only the abandoned search ran again
+    assert stubs.searched == SEARCHES + [SEARCHES[2]]
+    assert run_statuses(stores["checkpoints"]) == {"completed": 1}
+
+
+def failed_run(stores, stubs, domain_config=None):
+    """A run whose writer failed after every search finished."""
+    stubs.failing.clear()
+    stubs.writer_failures = 1
+    with pytest.raises(RuntimeError):
+        research(stores, stubs, domain_config=domain_config)
+    stubs.searched.clear()
+
+
+def test_failed_run_resumes_without_repeating_searches(stores):
+    stubs = Stubs()
+    failed_run(stores, stubs)
+    events = research(stores, stubs)
+    assert resumed(events) and stubs.searched == []
+    assert run_statuses(stores["checkpoints"]) == {"completed": 1}
+
+
+def test_refresh_starts_over_instead_of_resuming(stores):
+    stubs = Stubs()
+    failed_run(stores, stubs)
+    events = research(stores, stubs, refresh=True)
+    assert not resumed(events)
+    assert run_statuses(stores["checkpoints"]) == {"failed": 1, "completed": 1}
+
+
+def test_resumed_run_redoes_searches_older_than_the_search_ttl(stores):
+    stale = {"name": "jobs", "cache": {"search_ttl_seconds": 0}}
+    stubs = Stubs()
+    failed_run(stores, stubs, stale)
+    events = research(stores, stubs, domain_config=stale)
+    assert resumed(events)
+    assert sorted(stubs.searched) == sorted(SEARCHES)
+
+
+def test_default_depth_is_one_round_of_the_planners_searches(stores):
+    stubs = Stubs()
+    stubs.failing.clear()
+    events = research(stores, stubs)
+    assert stubs.plan_counts == [None]
+    assert stubs.searched == SEARCHES and stubs.gap_checks == 0
+    assert events[-1].report.short_summary == "3 results"
+
+
+def test_domain_opts_into_follow_up_rounds(stores):
+    deep = {"name": "jobs", "depth": {"max_rounds": 2, "initial_searches": 2}}
+    stubs = Stubs()
+    stubs.failing.clear()
+    stubs.coverage = 0.5
+    stubs.follow_ups = [SEARCHES[0], "python visa sponsorship germany"]
+    events = research(stores, stubs, domain_config=deep)
+    assert stubs.plan_counts == [2]
+    # The follow-up already searched is skipped, and no gap check runs after the last round
+    assert stubs.searched == SEARCHES[:2] + ["python visa sponsorship germany"]
+    assert stubs.gap_checks == 1
+    assert events[-1].report.short_summary == "3 results"
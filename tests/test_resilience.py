@@ -0,0 +1,195 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from deep_researcher.core.resilience import (LatencyTracker, ResiliencePolicy, call_with_retries, hedged,
+                                             is_retryable, stream_with_retries)
+
+POLICY = ResiliencePolicy(max_attempts=3, backoff_base_seconds=0)
+
+
+class Flaky:
+    """A call or stream that fails with `error` for its first `failures` attempts."""
+
+    def __init__(self, failures, error=ConnectionError("reset"), items=("plan", "out 1", "out 2"), fail_after=0):
+        self.failures = failures
+        self.error = error
+        self.items = items
+        self.fail_after = fail_after
+        self.attempts = 0
+
+    async def call(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise self.error
+        return "result"
+
+    async def stream(self):
+        self.attempts += 1
+        for index, item in enumerate(self.items):
+            if index == self.fail_after and self.attempts <= self.failures:
+                raise self.error
+            yield item
+
+
+def started(item):
+    return item.startswith("out")
+
+
+async def collect(stream):
+    async with aclosing(stream) as items:
+        return [item async for item in items]
+
+
+def test_retryable_errors():
+    assert is_retryable(ConnectionError()) and is_retryable(TimeoutError())
+    assert not is_retryable(ValueError())
+
+    class ServerError(Exception):
+        status_code = 503
+
+    assert is_retryable(ServerError())
+
+
+def test_call_retries_retryable_errors():
+    flaky, retries = Flaky(failures=2), []
+    result = asyncio.run(call_with_retries(flaky.call, POLICY, on_retry=lambda *args: retries.append(args[0])))
+    assert result == "result" and flaky.attempts == 3 and retries == [1, 2]
+
+
+def test_call_gives_up_after_max_attempts():
+    flaky = Flaky(failures=5)
+    with pytest.raises(ConnectionError):
+        asyncio.run(call_with_retries(flaky.call, POLICY))
+    assert flaky.attempts == 3
+
+
+def test_call_does_not_retry_other_errors():
+    flaky = Flaky(failures=1, error=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_retries(flaky.call, POLICY))
+    assert flaky.attempts == 1
+
+
+def test_call_timeout_is_per_attempt():
+    attempts = 0
+
+    async def slow_then_fast():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(1 if attempts == 1 else 0)
+        return "result"
+
+    assert asyncio.run(call_with_retries(slow_then_fast, POLICY, timeout=0.05)) == "result"
+    assert attempts == 2
+
+
+def test_stream_retries_before_output_starts():
+    flaky = Flaky(failures=1, fail_after=1)
+    items = asyncio.run(collect(stream_with_retries(flaky.stream, POLICY, started)))
+    # The first attempt's non-output item is yielded again by the retry
+    assert items == ["plan", "plan", "out 1", "out 2"]
+    assert flaky.attempts == 2
+
+
+def test_stream_does_not_retry_once_output_started():
+    flaky = Flaky(failures=1, fail_after=2)
+    seen = []
+
+    async def main():
+        async with aclosing(stream_with_retries(flaky.stream, POLICY, started)) as items:
+            async for item in items:
+                seen.append(item)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
+    assert seen == ["plan", "out 1"] and flaky.attempts == 1
+
+
+def test_stream_timeout_bounds_the_whole_stream():
+    attempts = 0
+
+    async def trickle():
+        nonlocal attempts
+        attempts += 1
+        # Each item arrives well within the timeout, but the stream as a whole doesn't
+        for index in range(20):
+            await asyncio.sleep(0.01)
+            yield f"out {index}"
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(collect(stream_with_retries(trickle, POLICY, started, timeout=0.05)))
+    assert attempts == 1
+
+
+def test_hedge_is_not_sent_for_fast_calls():
+    calls = 0
+
+    async def fast():
+        nonlocal calls
+        calls += 1
+        return "result"
+
+    assert asyncio.run(hedged(fast, 0.05)) == ("result", None)
+    assert calls == 1
+
+
+def test_hedge_wins_over_a_slow_primary():
+    calls, cancelled = 0, []
+
+    async def slow_once():
+        nonlocal calls
+        calls += 1
+        copy = calls
+        try:
+            await asyncio.sleep(1 if copy == 1 else 0)
+        except asyncio.CancelledError:
+            cancelled.append(copy)
+            raise
+        return copy
+
+    async def main():
+        result = await hedged(slow_once, 0.02)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == (2, "hedge")
+    assert cancelled == [1]
+
+
+def test_hedge_falls_back_to_the_copy_that_succeeds():
+    calls = 0
+
+    async def failing_hedge():
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise ConnectionError("reset")
+        await asyncio.sleep(0.05)
+        return "primary result"
+
+    assert asyncio.run(hedged(failing_hedge, 0.01)) == ("primary result", "primary")
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(0.95) is None
+    for seconds in range(1, 101):
+        tracker.observe(float(seconds))
+    assert tracker.percentile(0.95) == 95.0
+    assert tracker.percentile(0.5, min_samples=200) is None
+
+
+def test_latency_window_keeps_recent_samples():
+    tracker = LatencyTracker(window=3)
+    for seconds in (100.0, 1.0, 2.0, 3.0):
+        tracker.observe(seconds)
+    assert tracker.percentile(1.0) == 3.0
+
+
+def test_quorum_size():
+    assert ResiliencePolicy().quorum_size(5) is None
+    assert ResiliencePolicy(quorum=0.6).quorum_size(5) == 3
+    assert ResiliencePolicy(quorum=0.1).quorum_size(3) == 1
+    assert ResiliencePolicy(quorum=0.6).quorum_size(0) is None
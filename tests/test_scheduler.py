@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from deep_researcher.core import scheduler as scheduler_module
+from deep_researcher.core.scheduler import ModelScheduler, Priority, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler_module, "time", clock)
+    return clock
+
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(None)
+    bucket.consume(1_000_000)
+    assert bucket.delay_for(1_000_000) == 0.0
+
+
+def test_bucket_starts_full_and_refills_per_minute(clock):
+    bucket = TokenBucket(60)
+    assert bucket.delay_for(60) == 0.0
+    bucket.consume(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+    assert bucket.delay_for(30) == pytest.approx(30.0)
+    clock.now += 15
+    assert bucket.delay_for(15) == 0.0
+    assert bucket.delay_for(30) == pytest.approx(15.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(60, capacity=10)
+    bucket.consume(10)
+    clock.now += 3600
+    bucket.consume(10)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+
+
+def test_requests_larger_than_capacity_wait_for_a_full_bucket(clock):
+    bucket = TokenBucket(60, capacity=10)
+    assert bucket.delay_for(100) == 0.0
+    bucket.consume(5)
+    assert bucket.delay_for(100) == pytest.approx(5.0)
+
+
+def test_overuse_goes_negative_and_delays_later_callers(clock):
+    bucket = TokenBucket(60)
+    bucket.consume(90)
+    assert bucket.delay_for(1) == pytest.approx(31.0)
+
+
+def test_drain_empties_but_keeps_debt(clock):
+    bucket = TokenBucket(60)
+    bucket.drain()
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+    bucket.consume(10)
+    bucket.drain()
+    assert bucket.level == pytest.approx(-10)
+
+
+async def hold_then_release(scheduler, calls, release):
+    """Hold the only slot while `calls` queue up behind it, and return the order they were served in."""
+    served = []
+
+    async def call(name, run_id, priority):
+        async with scheduler.slot("model", run_id, priority):
+            served.append(name)
+
+    async with scheduler.slot("model", "holder", Priority.CRITICAL):
+        tasks = [asyncio.create_task(call(*spec)) for spec in calls]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == len(calls)
+        await release()
+    await asyncio.gather(*tasks)
+    return served
+
+
+def test_higher_priority_is_served_first():
+    async def main():
+        scheduler = ModelScheduler(max_concurrency=1)
+        return await hold_then_release(scheduler, [
+            ("background", "a", Priority.BACKGROUND),
+            ("normal", "b", Priority.NORMAL),
+            ("critical", "c", Priority.CRITICAL),
+            ("normal 2", "d", Priority.NORMAL),
+        ], release=lambda: asyncio.sleep(0))
+
+    assert asyncio.run(main()) == ["critical", "normal", "normal 2", "background"]
+
+
+def test_runs_at_the_same_priority_take_turns():
+    async def main():
+        scheduler = ModelScheduler(max_concurrency=1)
+        return await hold_then_release(scheduler, [
+            ("a1", "a", Priority.NORMAL),
+            ("a2", "a", Priority.NORMAL),
+            ("a3", "a", Priority.NORMAL),
+            ("b1", "b", Priority.NORMAL),
+            ("c1", "c", Priority.NORMAL),
+        ], release=lambda: asyncio.sleep(0))
+
+    assert asyncio.run(main()) == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_concurrency_cap():
+    async def main():
+        scheduler = ModelScheduler(max_concurrency=2)
+        active = peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with scheduler.slot("model", "run"):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak, scheduler.stats()
+
+    peak, stats = asyncio.run(main())
+    assert peak == 2
+    assert stats["granted"] == 6 and stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_rate_limited_model_does_not_block_other_models():
+    async def main():
+        # An empty 600 rpm bucket has the next request after 0.1s
+        scheduler = ModelScheduler(model_limits={"slow": {"rpm": 600}})
+        scheduler._buckets_for("slow")[0].consume(600)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        finished = {}
+
+        async def call(model, run_id):
+            async with scheduler.slot(model, run_id):
+                finished[model] = loop.time() - started
+
+        await asyncio.gather(call("slow", "a"), call("fast", "b"))
+        return finished
+
+    finished = asyncio.run(main())
+    assert finished["fast"] < 0.05
+    assert finished["slow"] >= 0.08
+
+
+def test_rate_limit_error_drains_the_models_buckets():
+    class RateLimitError(Exception):
+        pass
+
+    async def main():
+        scheduler = ModelScheduler(requests_per_minute=60)
+        with pytest.raises(RateLimitError):
+            async with scheduler.slot("model", "run"):
+                raise RateLimitError()
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.stats()["rate_limited"] == 1
+    assert scheduler._buckets_for("model")[0].delay_for(1) > 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = ModelScheduler(max_concurrency=1)
+        async with scheduler.slot("model", "holder"):
+            waiter = asyncio.create_task(scheduler.slot("model", "run").__aenter__())
+            await asyncio.sleep(0)
+            assert scheduler.stats()["queued"] == 1
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert stats["queued"] == 0 and stats["active"] == 0
@@ -0,0 +1,214 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from deep_researcher.core.single_flight import SingleFlight
+
+
+class Work:
+    """A controllable piece of shared work that records how often it ran and whether it was cancelled."""
+
+    def __init__(self, result="result"):
+        self.result = result
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def call(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    async def generate(self, publish, items=("a", "b", "c")):
+        self.calls += 1
+        try:
+            for item in items:
+                yield item
+                await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def collect(broadcast):
+    async with aclosing(broadcast.follow()) as items:
+        return [item async for item in items]
+
+
+def test_do_runs_concurrent_calls_once():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        callers = [asyncio.create_task(flights.do("key", work.call)) for _ in range(3)]
+        await settle()
+        work.release.set()
+        return await asyncio.gather(*callers), work.calls, flights.in_flight()
+
+    results, calls, in_flight = asyncio.run(main())
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert {result for result, _ in results} == {"result"}
+    assert in_flight == 0
+
+
+def test_do_runs_again_once_finished():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        work.release.set()
+        await flights.do("key", work.call)
+        _, shared = await flights.do("key", work.call)
+        return shared, work.calls
+
+    assert asyncio.run(main()) == (False, 2)
+
+
+def test_do_shares_errors():
+    async def main():
+        flights, work = SingleFlight(), Work(result=ValueError("boom"))
+        callers = [asyncio.create_task(flights.do("key", work.call)) for _ in range(2)]
+        await settle()
+        work.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True), work.calls
+
+    results, calls = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_do_keeps_running_while_a_caller_remains():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        leaving = asyncio.create_task(flights.do("key", work.call))
+        staying = asyncio.create_task(flights.do("key", work.call))
+        await settle()
+        leaving.cancel()
+        await settle()
+        assert not work.cancelled
+        work.release.set()
+        return await staying, leaving.cancelled()
+
+    (result, _), leaving_cancelled = asyncio.run(main())
+    assert result == "result"
+    assert leaving_cancelled
+
+
+def test_do_cancels_the_work_when_every_caller_leaves():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        callers = [asyncio.create_task(flights.do("key", work.call)) for _ in range(2)]
+        await settle()
+        for caller in callers:
+            caller.cancel()
+        await settle()
+        assert work.cancelled and flights.in_flight() == 0
+
+        # A new caller starts the work afresh
+        work.release.set()
+        return await flights.do("key", work.call), work.calls
+
+    (result, shared), calls = asyncio.run(main())
+    assert (result, shared, calls) == ("result", False, 2)
+
+
+def test_stream_late_followers_get_every_item():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        first, shared_first = flights.stream("key", work.generate)
+        early = asyncio.create_task(collect(first))
+        await settle()
+        late, shared_late = flights.stream("key", work.generate)
+        late_task = asyncio.create_task(collect(late))
+        await settle()
+        work.release.set()
+        return await early, await late_task, (shared_first, shared_late), work.calls, late is first
+
+    early, late, shared, calls, same = asyncio.run(main())
+    assert early == late == ["a", "b", "c"]
+    assert shared == (False, True) and calls == 1 and same
+
+
+def test_stream_re_raises_the_generators_error_to_every_follower():
+    async def main():
+        flights, work = SingleFlight(), Work(result=ValueError("boom"))
+        broadcast, _ = flights.stream("key", work.generate)
+        followers = [asyncio.create_task(collect(broadcast)) for _ in range(2)]
+        await settle()
+        work.release.set()
+        return await asyncio.gather(*followers, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_stream_keeps_running_while_a_follower_remains():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        broadcast, _ = flights.stream("key", work.generate)
+        staying = asyncio.create_task(collect(broadcast))
+        async with aclosing(broadcast.follow()) as leaving:
+            assert await anext(leaving) == "a"
+        await settle()
+        assert not work.cancelled
+        work.release.set()
+        return await staying
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+
+def test_stream_cancels_the_generator_when_the_last_follower_leaves():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        broadcast, _ = flights.stream("key", work.generate)
+        async with aclosing(broadcast.follow()) as items:
+            assert await anext(items) == "a"
+        await settle()
+        assert work.cancelled and flights.in_flight() == 0
+
+        restarted, shared = flights.stream("key", work.generate)
+        work.release.set()
+        return restarted is broadcast, shared, await collect(restarted), work.calls
+
+    assert asyncio.run(main()) == (False, False, ["a", "b", "c"], 2)
+
+
+def test_stream_follower_cancelled_while_waiting_detaches():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        broadcast, _ = flights.stream("key", work.generate)
+        leaving = asyncio.create_task(collect(broadcast))
+        staying = asyncio.create_task(collect(broadcast))
+        await settle()
+        leaving.cancel()
+        await settle()
+        assert not work.cancelled and broadcast.followers == 1
+        work.release.set()
+        return await staying
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+
+def test_follow_deadline():
+    async def main():
+        flights, work = SingleFlight(), Work()
+        broadcast, _ = flights.stream("key", work.generate)
+        deadline = asyncio.get_running_loop().time() + 0.05
+        async with aclosing(broadcast.follow(deadline)) as items:
+            assert await anext(items) == "a"
+            with pytest.raises(TimeoutError):
+                await anext(items)
+        await settle()
+        return work.cancelled
+
+    assert asyncio.run(main())
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from deep_researcher.core.streaming import JsonStringFieldStream
+
+REPORT = {
+    "short_summary": 'Not the field: "markdown_report": "decoy"',
+    "markdown_report": 'Line one\nA "quoted" path C:\\tmp\\x, a/b\ttab, caf\u00e9, emoji \U0001F600 and \u2603.',
+    "follow_up_questions": ["What next?"],
+}
+RAW = json.dumps(REPORT, ensure_ascii=False)
+RAW_ASCII = json.dumps(REPORT)
+
+
+def decode(chunks, field="markdown_report"):
+    stream = JsonStringFieldStream(field)
+    text = "".join(stream.feed(chunk) for chunk in chunks)
+    assert text == stream.value
+    return stream, text
+
+
+@pytest.mark.parametrize("raw", [RAW, RAW_ASCII])
+def test_whole_document(raw):
+    stream, text = decode([raw])
+    assert text == REPORT["markdown_report"]
+    assert stream.done
+
+
+@pytest.mark.parametrize("raw", [RAW, RAW_ASCII])
+def test_one_character_at_a_time(raw):
+    stream, text = decode(list(raw))
+    assert text == REPORT["markdown_report"]
+    assert stream.done
+
+
+@pytest.mark.parametrize("raw", [RAW, RAW_ASCII])
+def test_every_split_point(raw):
+    for split in range(len(raw) + 1):
+        _, text = decode([raw[:split], raw[split:]])
+        assert text == REPORT["markdown_report"], split
+
+
+def test_every_escape():
+    raw = r'{"markdown_report": "\" \\ \/ \b \f \n \r \t \u00e9"}'
+    for split in range(len(raw) + 1):
+        _, text = decode([raw[:split], raw[split:]])
+        assert text == json.loads(raw)["markdown_report"], split
+
+
+def test_surrogate_pair_split_inside_either_half():
+    raw = '{"markdown_report": "a\\ud83d\\ude00b"}'
+    for split in range(raw.index("\\ud83d"), raw.index("b\"}") + 1):
+        _, text = decode([raw[:split], raw[split:]])
+        assert text == "a\U0001F600b", split
+
+
+def test_nothing_is_returned_before_the_field_starts():
+    stream = JsonStringFieldStream("markdown_report")
+    assert stream.feed('{"short_summary": "s", "markdown_') == ""
+    assert stream.feed('report": "Hel') == "Hel"
+    assert stream.feed('lo\\') == "lo"
+    assert stream.feed('n"') == "\n"
+    assert stream.done
+
+
+def test_text_after_the_field_is_ignored():
+    stream = JsonStringFieldStream("markdown_report")
+    stream.feed('{"markdown_report": "done", "follow_up_questions": ["more"]}')
+    assert stream.feed(', "extra": "text"}') == ""
+    assert stream.value == "done"
+
+
+def test_missing_field_decodes_nothing():
+    stream, text = decode(list(json.dumps({"short_summary": "s"})))
+    assert text == ""
+    assert not stream.done